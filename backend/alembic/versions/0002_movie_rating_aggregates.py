@@ -0,0 +1,48 @@
+"""rating aggregates on movies
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COUNTERS = ["review_count", "rating_sum"] + [f"rating_{n}_count" for n in range(1, 6)]
+
+
+def upgrade() -> None:
+    for name in COUNTERS:
+        op.add_column("movies", sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("movies", sa.Column("avg_rating", sa.Float(), nullable=False, server_default="0"))
+    op.create_index("ix_movies_avg_rating_id", "movies", ["avg_rating", "id"])
+    op.create_index("ix_movies_review_count_id", "movies", ["review_count", "id"])
+
+    # Remplissage initial à partir des reviews existantes
+    buckets = ", ".join(
+        f"rating_{n}_count = (SELECT count(*) FROM reviews r WHERE r.movie_id = movies.id AND r.rating = {n})"
+        for n in range(1, 6)
+    )
+    op.execute(
+        "UPDATE movies SET "
+        "review_count = (SELECT count(*) FROM reviews r WHERE r.movie_id = movies.id), "
+        "rating_sum = (SELECT coalesce(sum(r.rating), 0) FROM reviews r WHERE r.movie_id = movies.id), "
+        + buckets
+    )
+    op.execute(
+        "UPDATE movies SET avg_rating = CASE WHEN review_count > 0 "
+        "THEN CAST(rating_sum AS FLOAT) / review_count ELSE 0 END"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_movies_review_count_id", table_name="movies")
+    op.drop_index("ix_movies_avg_rating_id", table_name="movies")
+    with op.batch_alter_table("movies") as batch:
+        for name in COUNTERS + ["avg_rating"]:
+            batch.drop_column(name)
@@ -0,0 +1,43 @@
+"""secondary indexes on reviews and watchlists, unique (user_id, movie_id) watchlist entries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+REVIEW_INDEXES = {
+    # Listes de reviews paginées par curseur, plus récentes d'abord
+    "ix_reviews_created_at_id": ["created_at", "id"],
+    "ix_reviews_movie_id_created_at": ["movie_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    "ix_reviews_user_id_created_at": ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY sur PostgreSQL : pas de verrou d'écriture sur une grosse table de reviews
+    with op.get_context().autocommit_block():
+        for name, columns in REVIEW_INDEXES.items():
+            op.create_index(name, "reviews", columns, postgresql_concurrently=True)
+
+    # Supprimer les doublons avant d'imposer l'unicité
+    op.execute(
+        "DELETE FROM watchlists WHERE id NOT IN "
+        "(SELECT min(id) FROM watchlists GROUP BY user_id, movie_id)"
+    )
+    op.create_index("uq_watchlists_user_id_movie_id", "watchlists", ["user_id", "movie_id"], unique=True)
+    op.create_index("ix_watchlists_movie_id", "watchlists", ["movie_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_watchlists_movie_id", table_name="watchlists")
+    op.drop_index("uq_watchlists_user_id_movie_id", table_name="watchlists")
+    for name in REVIEW_INDEXES:
+        op.drop_index(name, table_name="reviews")
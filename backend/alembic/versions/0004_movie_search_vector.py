@@ -0,0 +1,38 @@
+"""full-text search vector on movies (PostgreSQL only)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Titre (poids A) et description (poids B), racinisés en français et en anglais :
+# les descriptions du seed sont en français, une partie des titres en anglais
+SEARCH_VECTOR = """
+    setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('french', coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+"""
+
+
+def upgrade() -> None:
+    # Les autres bases utilisent l'index en mémoire de app.core.search
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(f"ALTER TABLE movies ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_movies_search_vector ON movies USING gin (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_movies_search_vector")
+    op.execute("ALTER TABLE movies DROP COLUMN IF EXISTS search_vector")
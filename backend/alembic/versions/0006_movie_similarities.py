@@ -0,0 +1,27 @@
+"""top-K item-item similarities for the recommendations
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "movie_similarities",
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("neighbor_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("score", sa.Float(precision=24), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("movie_similarities")
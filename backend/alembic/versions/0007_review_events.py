@@ -0,0 +1,52 @@
+"""review events outbox and the statistics of the incremental similarities
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "review_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("review_id", sa.Integer(), nullable=False),
+        sa.Column("movie_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("old_rating", sa.Integer()),
+        sa.Column("new_rating", sa.Integer()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_review_events_user_id", "review_events", ["user_id", "id"])
+    op.create_table(
+        "movie_cooccurrences",
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("other_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("dot", sa.BigInteger(), nullable=False),
+    )
+    op.create_table(
+        "movie_norms",
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("norm_sq", sa.BigInteger(), nullable=False),
+        sa.Column("norm", sa.Float(), nullable=False),
+        sa.Column("cutoff", sa.Float()),
+        sa.Column("cutoff_id", sa.Integer()),
+    )
+    op.create_index("ix_movie_similarities_neighbor_id", "movie_similarities", ["neighbor_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_movie_similarities_neighbor_id", table_name="movie_similarities")
+    op.drop_table("movie_norms")
+    op.drop_table("movie_cooccurrences")
+    op.drop_index("ix_review_events_user_id", table_name="review_events")
+    op.drop_table("review_events")
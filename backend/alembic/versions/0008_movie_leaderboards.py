@@ -0,0 +1,51 @@
+"""leaderboard scores on movies (trending, Bayesian rating)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Valeurs par défaut des réglages à la création de la révision, figées : une migration
+# produit le même schéma quel que soit l'environnement. Après avoir changé ces réglages,
+# reconstruire les scores avec app.tools.recompute_ratings
+TOP_RATED_PRIOR_MEAN = 3.0
+TOP_RATED_PRIOR_WEIGHT = 10
+TRENDING_EPOCH = 1767225600.0  # 2026-01-01T00:00:00Z
+TRENDING_HALF_LIFE_HOURS = 72.0
+
+
+def upgrade() -> None:
+    op.add_column("movies", sa.Column("trending_score", sa.Float(), nullable=False, server_default="0"))
+    op.add_column("movies", sa.Column("bayesian_rating", sa.Float(), nullable=False,
+                                      server_default=str(TOP_RATED_PRIOR_MEAN)))
+    op.create_index("ix_movies_trending_score_id", "movies", ["trending_score", "id"])
+    op.create_index("ix_movies_bayesian_rating_id", "movies", ["bayesian_rating", "id"])
+
+    # Remplissage initial à partir des agrégats et des reviews existantes (app.core.ranking)
+    weight, mean = TOP_RATED_PRIOR_WEIGHT, TOP_RATED_PRIOR_MEAN
+    op.execute(f"UPDATE movies SET bayesian_rating = ({weight * mean} + rating_sum) / ({weight} + review_count)")
+    if op.get_bind().dialect.name == "postgresql":
+        seconds = "extract(epoch FROM r.created_at)"
+    else:
+        seconds = "(julianday(r.created_at) - 2440587.5) * 86400"
+    exponent = f"({seconds} - {TRENDING_EPOCH}) / {TRENDING_HALF_LIFE_HOURS * 3600}"
+    op.execute(
+        "UPDATE movies SET trending_score = "
+        f"(SELECT coalesce(sum(power(2.0, {exponent})), 0) FROM reviews r WHERE r.movie_id = movies.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_movies_bayesian_rating_id", table_name="movies")
+    op.drop_index("ix_movies_trending_score_id", table_name="movies")
+    with op.batch_alter_table("movies") as batch:
+        batch.drop_column("bayesian_rating")
+        batch.drop_column("trending_score")
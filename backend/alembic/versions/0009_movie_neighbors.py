@@ -0,0 +1,31 @@
+"""heads of the similarity rankings kept by the incremental consumer
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "movie_neighbors",
+        sa.Column("movie_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("neighbor_id", sa.Integer(), sa.ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("score", sa.Float(), nullable=False),
+    )
+    op.create_index("ix_movie_neighbors_neighbor_id", "movie_neighbors", ["neighbor_id"])
+    # Têtes vides : seuils inconnus, chaque liste est recalculée à son premier changement
+    op.execute("UPDATE movie_norms SET cutoff = NULL, cutoff_id = NULL")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_movie_neighbors_neighbor_id", table_name="movie_neighbors")
+    op.drop_table("movie_neighbors")
@@ -1,20 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import Annotated
+from typing import Annotated, Callable, Literal, Optional, Tuple
 from app.db.session import get_db
-from app.crud.movie import create_movie, get_movie, get_movies, update_movie, delete_movie
-from app.crud.review import create_review, get_review, get_reviews, get_reviews_by_movie, get_reviews_by_user, update_review, delete_review
-from app.crud.watchlist import add_to_watchlist, get_user_watchlist, remove_from_watchlist, is_in_watchlist
+from app.db.replicas import get_db_read
+from app.core.instrumentation import TimedRoute, timed_serialization
+from app.core import export
+from app.core.review_feed import review_feed
+from app.core.config import settings
+from app.core.http_cache import current_versions, json_response, not_modified, version_etag
+from app.core.result_cache import result_cache
+from app.crud.bulk import BulkLoader
+from app.crud.pagination import Page
+from app.crud.movie import create_movie, insert_movies, get_movie, get_movies, get_movies_by_ids, get_top_rated_movies, get_trending_movies, search_movies, suggest_titles, update_movie, delete_movie
+from app.crud.review import create_review, check_review_references, insert_reviews, get_review, get_reviews, get_reviews_by_movie, get_reviews_by_user, update_review, delete_review
+from app.crud.watchlist import add_to_watchlist, get_user_watchlist, remove_from_watchlist, is_in_watchlist, watchlist_membership
+from app.crud.recommendation import get_recommendations
 from app.crud.user import create_user, get_user, get_user_by_username, get_user_by_email, get_users, update_user, delete_user
-from app.schemas.movie import MovieCreate, MovieUpdate, MovieResponse
+from app.schemas.movie import MovieCreate, MovieUpdate, MovieResponse, MovieRecommendation, MovieSuggestion
 from app.schemas.review import ReviewCreate, ReviewUpdate, ReviewResponse
-from app.schemas.watchlist import WatchlistCreate, WatchlistResponse, WatchlistWithMovie
+from app.schemas.watchlist import WatchlistCreate, WatchlistResponse, WatchlistWithMovie, WatchlistContains, WatchlistMembership
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.schemas.bulk import BulkResult
 from app.api.v1 import auth
 from app.api.v1.auth import get_current_user, get_current_active_admin
 from app.models.user import User
 
-api_router = APIRouter()
+api_router = APIRouter(route_class=TimedRoute)
+
+# Les handlers qui utilisent la session SQLAlchemy (synchrone) sont déclarés en `def` :
+# FastAPI les exécute dans son thread pool (taille : settings.DB_THREADPOOL_SIZE)
+# au lieu de bloquer la boucle d'événements pendant les requêtes SQL.
+# Les lectures du catalogue, des reviews et des watchlists passent par get_db_read
+# (réplicas si configurés) ; l'autocomplétion reste sur le primaire, dont elle
+# suit la version du catalogue.
+
+def with_next_cursor(response: Response, page: Page) -> Page:
+    """Expose the cursor of the next page (keyset pagination) in a response header"""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page
+
+# Réponses du catalogue sérialisées une fois puis servies depuis le cache de résultats
+MOVIE = TypeAdapter(MovieResponse)
+MOVIE_LIST = TypeAdapter(list[MovieResponse])
+REVIEW_LIST = TypeAdapter(list[ReviewResponse])
+
+def serialize(adapter: TypeAdapter, value) -> Optional[bytes]:
+    if value is None:
+        return None
+    with timed_serialization():
+        return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+def versioned_key(key: str, versions: dict) -> str:
+    """Result cache key bound to the entity versions the ETag was computed from"""
+    return key + "@" + ",".join(str(versions[name]) for name in sorted(versions))
+
+def cached_page(key: str, tags: list, adapter: TypeAdapter, fetch: Callable[[], Page]) -> Tuple[bytes, dict]:
+    """Serialized page from the result cache, with its X-Next-Cursor header"""
+    def compute():
+        page = fetch()
+        return (page.next_cursor or "").encode() + b"\n" + serialize(adapter, page)
+    cursor, _, body = result_cache.get_or_set(key, tags, compute).partition(b"\n")
+    return body, ({"X-Next-Cursor": cursor.decode()} if cursor else {})
+
+# Corps NDJSON : un élément JSON par ligne, lu au fil de l'eau
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+def decode_line(line: bytes):
+    """JSON value of an NDJSON line, or the decoding error (reported by the loader)"""
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        return error
+
+async def load_bulk(request: Request, loader: BulkLoader) -> dict:
+    """
+    Feed `loader` with the items of the request body, an NDJSON stream or a
+    JSON array, a batch at a time in the thread pool (SQLAlchemy is synchronous).
+    Batches already inserted stay committed if the body turns out too large.
+    """
+    too_many = HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        pending, rest = [], b""
+        async for chunk in request.stream():
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            pending.extend(decode_line(line) for line in lines if line.strip())
+            if loader.received + len(pending) > settings.BULK_MAX_ITEMS:
+                raise too_many
+            if len(pending) >= loader.batch_size:
+                await run_in_threadpool(loader.add_many, pending)
+                pending = []
+        if rest.strip():
+            pending.append(decode_line(rest))
+        if loader.received + len(pending) > settings.BULK_MAX_ITEMS:
+            raise too_many
+        await run_in_threadpool(loader.add_many, pending)
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail="Body must be a JSON array or NDJSON")
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise too_many
+        for start in range(0, len(items), loader.batch_size):
+            await run_in_threadpool(loader.add_many, items[start:start + loader.batch_size])
+    return await run_in_threadpool(loader.finish)
+
+BULK_BODY = {
+    "description": "NDJSON (one item per line) or a JSON array",
+    "content": {"application/x-ndjson": {}, "application/json": {}},
+}
 
 # ============ AUTHENTICATION ENDPOINTS ============
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -27,7 +130,7 @@ async def test_endpoint():
 # ============ USER ENDPOINTS ============
 
 @api_router.post("/users", response_model=UserResponse)
-async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
+def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     """Create a new user"""
     # Vérifier si l'utilisateur existe déjà
     existing_user = get_user_by_username(db, user.username)
@@ -41,17 +144,19 @@ async def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
     return create_user(db, user)
 
 @api_router.get("/users", response_model=list[UserResponse])
-async def list_users(
+def list_users(
     current_admin: Annotated[User, Depends(get_current_active_admin)],
+    response: Response,
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get all users with pagination (Admin only)"""
-    return get_users(db, skip=skip, limit=limit)
+    return with_next_cursor(response, get_users(db, skip=skip, limit=limit, cursor=cursor))
 
 @api_router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
+def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
     """Get a specific user by ID"""
     db_user = get_user(db, user_id)
     if not db_user:
@@ -59,7 +164,7 @@ async def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
     return db_user
 
 @api_router.get("/users/username/{username}", response_model=UserResponse)
-async def get_user_by_username_endpoint(username: str, db: Session = Depends(get_db)):
+def get_user_by_username_endpoint(username: str, db: Session = Depends(get_db)):
     """Get a user by username"""
     db_user = get_user_by_username(db, username)
     if not db_user:
@@ -67,7 +172,7 @@ async def get_user_by_username_endpoint(username: str, db: Session = Depends(get
     return db_user
 
 @api_router.put("/users/{user_id}", response_model=UserResponse)
-async def update_existing_user(
+def update_existing_user(
     user_id: int,
     user: UserUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
@@ -84,7 +189,7 @@ async def update_existing_user(
     return db_user
 
 @api_router.delete("/users/{user_id}", response_model=UserResponse)
-async def delete_existing_user(
+def delete_existing_user(
     user_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Session = Depends(get_db)
@@ -102,7 +207,7 @@ async def delete_existing_user(
 # ============ MOVIE ENDPOINTS ============
 
 @api_router.post("/movies", response_model=MovieResponse)
-async def create_new_movie(
+def create_new_movie(
     movie: MovieCreate,
     current_admin: Annotated[User, Depends(get_current_active_admin)],
     db: Session = Depends(get_db)
@@ -110,21 +215,126 @@ async def create_new_movie(
     """Create a new movie (Admin only)"""
     return create_movie(db, movie)
 
+@api_router.post("/movies/bulk", response_model=BulkResult, openapi_extra={"requestBody": BULK_BODY})
+async def bulk_create_movies(
+    request: Request,
+    current_admin: Annotated[User, Depends(get_current_active_admin)],
+    batch_size: Annotated[int, Query(ge=1, le=10_000, description="movies per transaction")] = settings.BULK_BATCH_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    Import up to BULK_MAX_ITEMS movies (Admin only). Invalid items are reported
+    by position in `errors` without stopping the import.
+    """
+    return await load_bulk(request, BulkLoader(db, MovieCreate, insert_movies, batch_size=batch_size))
+
 @api_router.get("/movies", response_model=list[MovieResponse])
-async def list_movies(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """Get all movies with pagination"""
-    return get_movies(db, skip=skip, limit=limit)
+def list_movies(
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort_by: Literal["id", "avg_rating", "review_count"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    ids: Annotated[Optional[str], Query(pattern=r"^\d+(,\d+)*$", description="comma-separated movie ids")] = None,
+    db: Session = Depends(get_db_read)
+):
+    """
+    Get all movies with pagination, optionally sorted by rating aggregates.
+    With `ids`, get those movies (in that order, unknown ids skipped) in one query instead.
+    """
+    if ids is not None:
+        return movies_by_ids(request, list(dict.fromkeys(int(movie_id) for movie_id in ids.split(","))), db)
+    body, headers = cached_page(
+        f"movies:{sort_by}:{order}:{skip}:{limit}:{cursor}", ["movies"], MOVIE_LIST,
+        lambda: get_movies(db, skip=skip, limit=limit, sort_by=sort_by, descending=order == "desc", cursor=cursor),
+    )
+    # La liste contient les agrégats de tous les films : ETag calculé sur le contenu
+    # plutôt qu'une version globale que chaque review devrait incrémenter
+    return json_response(request, body, headers=headers)
+
+def movies_by_ids(request: Request, ids: list, db: Session) -> Response:
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    tags = [f"movie:{movie_id}" for movie_id in ids]
+    versions = current_versions(db, tags)
+    etag = version_etag(request, versions)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    body = result_cache.get_or_set(versioned_key("movies:ids:" + ",".join(map(str, ids)), versions), tags,
+                                   lambda: serialize(MOVIE_LIST, get_movies_by_ids(db, ids)))
+    return json_response(request, body, etag=etag)
+
+@api_router.get("/movies/trending", response_model=list[MovieResponse])
+def trending_movies(
+    request: Request,
+    skip: int = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_read)
+):
+    """Movies with the most reviews lately: each review counts half as much every TRENDING_HALF_LIFE_HOURS"""
+    body, headers = cached_page(
+        f"movies:trending:{skip}:{limit}:{cursor}", ["movies"], MOVIE_LIST,
+        lambda: get_trending_movies(db, skip=skip, limit=limit, cursor=cursor),
+    )
+    return json_response(request, body, headers=headers)
+
+@api_router.get("/movies/top-rated", response_model=list[MovieResponse])
+def top_rated_movies(
+    request: Request,
+    min_reviews: Annotated[int, Query(ge=0)] = 0,
+    skip: int = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_read)
+):
+    """
+    Movies with at least `min_reviews` reviews, best first by Bayesian average:
+    the ratings plus TOP_RATED_PRIOR_WEIGHT ratings of TOP_RATED_PRIOR_MEAN
+    """
+    body, headers = cached_page(
+        f"movies:top-rated:{min_reviews}:{skip}:{limit}:{cursor}", ["movies"], MOVIE_LIST,
+        lambda: get_top_rated_movies(db, min_reviews=min_reviews, skip=skip, limit=limit, cursor=cursor),
+    )
+    return json_response(request, body, headers=headers)
+
+@api_router.get("/movies/search", response_model=list[MovieResponse])
+def search_movies_endpoint(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    db: Session = Depends(get_db_read)
+):
+    """Full-text search on titles and descriptions, each word matched as a prefix"""
+    return search_movies(db, q, limit=limit)
+
+@api_router.get("/movies/suggest", response_model=list[MovieSuggestion])
+def suggest_movies(
+    prefix: Annotated[str, Query(min_length=1, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=20)] = 10,
+    db: Session = Depends(get_db)
+):
+    """Title autocomplete from the in-memory typeahead index"""
+    return [{"id": movie_id, "title": title} for movie_id, title in suggest_titles(db, prefix, limit=limit)]
 
 @api_router.get("/movies/{movie_id}", response_model=MovieResponse)
-async def get_movie_by_id(movie_id: int, db: Session = Depends(get_db)):
+def get_movie_by_id(movie_id: int, request: Request, db: Session = Depends(get_db_read)):
     """Get a specific movie by ID"""
-    db_movie = get_movie(db, movie_id)
-    if not db_movie:
+    tags = [f"movie:{movie_id}"]
+    versions = current_versions(db, tags)
+    etag = version_etag(request, versions)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    body = result_cache.get_or_set(versioned_key(f"movie:{movie_id}", versions), tags,
+                                   lambda: serialize(MOVIE, get_movie(db, movie_id)))
+    if body is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return db_movie
+    return json_response(request, body, etag=etag)
 
 @api_router.put("/movies/{movie_id}", response_model=MovieResponse)
-async def update_existing_movie(
+def update_existing_movie(
     movie_id: int,
     movie: MovieUpdate,
     current_admin: Annotated[User, Depends(get_current_active_admin)],
@@ -137,7 +347,7 @@ async def update_existing_movie(
     return db_movie
 
 @api_router.delete("/movies/{movie_id}", response_model=MovieResponse)
-async def delete_existing_movie(
+def delete_existing_movie(
     movie_id: int,
     current_admin: Annotated[User, Depends(get_current_active_admin)],
     db: Session = Depends(get_db)
@@ -151,7 +361,7 @@ async def delete_existing_movie(
 # ============ REVIEW ENDPOINTS ============
 
 @api_router.post("/reviews", response_model=ReviewResponse)
-async def create_new_review(
+def create_new_review(
     review: ReviewCreate,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Session = Depends(get_db)
@@ -162,13 +372,54 @@ async def create_new_review(
         raise HTTPException(status_code=403, detail="You can only create reviews for yourself")
     return create_review(db, review)
 
+@api_router.post("/reviews/bulk", response_model=BulkResult, openapi_extra={"requestBody": BULK_BODY})
+async def bulk_create_reviews(
+    request: Request,
+    current_admin: Annotated[User, Depends(get_current_active_admin)],
+    batch_size: Annotated[int, Query(ge=1, le=10_000, description="reviews per transaction")] = settings.BULK_BATCH_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    Import up to BULK_MAX_ITEMS reviews for any users (Admin only), e.g. from
+    another site. Invalid items and unknown movies or users are reported by
+    position in `errors` without stopping the import.
+    """
+    loader = BulkLoader(db, ReviewCreate, insert_reviews, check=check_review_references, batch_size=batch_size)
+    return await load_bulk(request, loader)
+
 @api_router.get("/reviews", response_model=list[ReviewResponse])
-async def list_reviews(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """Get all reviews with pagination"""
-    return get_reviews(db, skip=skip, limit=limit)
+def list_reviews(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_read)
+):
+    """Get all reviews with pagination, most recent first"""
+    return with_next_cursor(response, get_reviews(db, skip=skip, limit=limit, cursor=cursor))
+
+@api_router.get("/reviews/recent", response_model=list[ReviewResponse])
+def recent_reviews(
+    request: Request,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_read)
+):
+    """
+    Activity feed: the latest reviews, most recent first. The first page comes
+    from the in-memory buffer of the last REVIEW_FEED_SIZE reviews; follow
+    X-Next-Cursor for older ones.
+    """
+    page = review_feed.first_page(db, limit) if cursor is None else None
+    if page is not None:
+        body, next_cursor = page
+    else:
+        reviews = get_reviews(db, limit=limit, cursor=cursor)
+        body, next_cursor = serialize(REVIEW_LIST, reviews), reviews.next_cursor
+    return json_response(request, body, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
 @api_router.get("/reviews/{review_id}", response_model=ReviewResponse)
-async def get_review_by_id(review_id: int, db: Session = Depends(get_db)):
+def get_review_by_id(review_id: int, db: Session = Depends(get_db_read)):
     """Get a specific review by ID"""
     db_review = get_review(db, review_id)
     if not db_review:
@@ -176,17 +427,58 @@ async def get_review_by_id(review_id: int, db: Session = Depends(get_db)):
     return db_review
 
 @api_router.get("/movies/{movie_id}/reviews", response_model=list[ReviewResponse])
-async def get_movie_reviews(movie_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """Get all reviews for a specific movie"""
-    return get_reviews_by_movie(db, movie_id, skip=skip, limit=limit)
+def get_movie_reviews(
+    movie_id: int,
+    request: Request,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_read)
+):
+    """Get all reviews for a specific movie, most recent first"""
+    # Les reviews affichent le nom de leur auteur : dépendent aussi de la version "users"
+    tags = [f"movie:{movie_id}:reviews", "users"]
+    versions = current_versions(db, tags)
+    etag = version_etag(request, versions)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    body, headers = cached_page(
+        versioned_key(f"movie:{movie_id}:reviews:{skip}:{limit}:{cursor}", versions), tags, REVIEW_LIST,
+        lambda: get_reviews_by_movie(db, movie_id, skip=skip, limit=limit, cursor=cursor),
+    )
+    return json_response(request, body, etag=etag, headers=headers)
 
 @api_router.get("/users/{user_id}/reviews", response_model=list[ReviewResponse])
-async def get_user_reviews(user_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """Get all reviews by a specific user"""
-    return get_reviews_by_user(db, user_id, skip=skip, limit=limit)
+def get_user_reviews(
+    user_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db_read)
+):
+    """Get all reviews by a specific user, most recent first"""
+    return with_next_cursor(response, get_reviews_by_user(db, user_id, skip=skip, limit=limit, cursor=cursor))
+
+@api_router.get("/users/{user_id}/recommendations", response_model=list[MovieRecommendation])
+def get_user_recommendations(
+    user_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    db: Session = Depends(get_db_read)
+):
+    """Movies recommended from the user's ratings, excluding reviewed and watchlisted ones (Owner or Admin only)"""
+    # La watchlist entre dans le calcul : mêmes droits que pour la consulter
+    if current_user.id != user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to view these recommendations")
+    return [
+        MovieRecommendation(**MovieResponse.model_validate(movie).model_dump(), score=score)
+        for movie, score in get_recommendations(db, user_id, limit=limit)
+    ]
 
 @api_router.put("/reviews/{review_id}", response_model=ReviewResponse)
-async def update_existing_review(
+def update_existing_review(
     review_id: int,
     review: ReviewUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
@@ -205,7 +497,7 @@ async def update_existing_review(
     return update_review(db, review_id, review)
 
 @api_router.delete("/reviews/{review_id}", response_model=ReviewResponse)
-async def delete_existing_review(
+def delete_existing_review(
     review_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Session = Depends(get_db)
@@ -225,7 +517,7 @@ async def delete_existing_review(
 # ============ WATCHLIST ENDPOINTS ============
 
 @api_router.post("/watchlist", response_model=WatchlistResponse)
-async def add_movie_to_watchlist(
+def add_movie_to_watchlist(
     watchlist: WatchlistCreate,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Session = Depends(get_db)
@@ -237,10 +529,10 @@ async def add_movie_to_watchlist(
     return add_to_watchlist(db, watchlist)
 
 @api_router.get("/watchlist/{user_id}", response_model=list[WatchlistWithMovie])
-async def get_watchlist(
+def get_watchlist(
     user_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_read)
 ):
     """Get user's watchlist (Owner or Admin only)"""
     # Vérifier que l'utilisateur accède à sa propre watchlist ou est admin
@@ -248,8 +540,20 @@ async def get_watchlist(
         raise HTTPException(status_code=403, detail="Not authorized to view this watchlist")
     return get_user_watchlist(db, user_id)
 
+@api_router.post("/watchlist/{user_id}/contains", response_model=WatchlistMembership)
+def check_many_in_watchlist(
+    user_id: int,
+    batch: WatchlistContains,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Session = Depends(get_db_read)
+):
+    """Which of the given movies are in user's watchlist, in one query (Owner or Admin only)"""
+    if current_user.id != user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to view this watchlist")
+    return {"movie_ids": batch.movie_ids, "in_watchlist": watchlist_membership(db, user_id, batch.movie_ids)}
+
 @api_router.delete("/watchlist/{user_id}/{movie_id}", response_model=WatchlistResponse)
-async def remove_movie_from_watchlist(
+def remove_movie_from_watchlist(
     user_id: int,
     movie_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
@@ -266,7 +570,49 @@ async def remove_movie_from_watchlist(
     return db_watchlist
 
 @api_router.get("/watchlist/{user_id}/{movie_id}")
-async def check_in_watchlist(user_id: int, movie_id: int, db: Session = Depends(get_db)):
+def check_in_watchlist(user_id: int, movie_id: int, db: Session = Depends(get_db_read)):
     """Check if a movie is in user's watchlist"""
     in_watchlist = is_in_watchlist(db, user_id, movie_id)
-    return {"in_watchlist": in_watchlist}
\ No newline at end of file
+    return {"in_watchlist": in_watchlist}
+
+# ============ EXPORT ENDPOINTS ============
+
+# Avec FastAPI 0.104, la session de get_db_read n'est fermée qu'une fois la réponse envoyée :
+# le générateur de StreamingResponse peut lire la base pendant tout le transfert
+def export_response(request: Request, db: Session, name: str, fmt: str, since_id: int,
+                    limit: Optional[int]) -> StreamingResponse:
+    gzip = export.accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+        "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no",  # nginx transmet au fil de l'eau au lieu de tout mettre en tampon
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    body = export.export(db, name, fmt, since_id, limit, gzip=gzip, chunk_size=settings.EXPORT_CHUNK_SIZE)
+    return StreamingResponse(body, media_type=export.MEDIA_TYPES[fmt], headers=headers)
+
+@api_router.get("/export/movies")
+def export_movies(
+    request: Request,
+    current_admin: Annotated[User, Depends(get_current_active_admin)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since_id: Annotated[int, Query(ge=0, description="resume after this movie id")] = 0,
+    limit: Annotated[Optional[int], Query(ge=1)] = None,
+    db: Session = Depends(get_db_read)
+):
+    """Stream the whole catalogue in id order as NDJSON or CSV, gzipped if accepted (Admin only)"""
+    return export_response(request, db, "movies", format, since_id, limit)
+
+@api_router.get("/export/reviews")
+def export_reviews(
+    request: Request,
+    current_admin: Annotated[User, Depends(get_current_active_admin)],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since_id: Annotated[int, Query(ge=0, description="resume after this review id")] = 0,
+    limit: Annotated[Optional[int], Query(ge=1)] = None,
+    db: Session = Depends(get_db_read)
+):
+    """Stream every review in id order as NDJSON or CSV, gzipped if accepted (Admin only)"""
+    return export_response(request, db, "reviews", format, since_id, limit)
@@ -12,21 +12,26 @@ from app.crud.user import authenticate_user, get_user_by_username, get_user_by_e
 from app.schemas.user import Token, UserCreate, UserResponse
 from app.core.security import create_access_token, decode_access_token
 from app.core.config import settings
+from app.core.instrumentation import TimedRoute
+from app.core.principals import principal_cache
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-async def get_current_user(
+def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Session = Depends(get_db)
 ) -> User:
     """
     Dependency to get the current authenticated user from JWT token
     
+    The user is looked up in the principal cache first, the database is only
+    queried on a miss.
+    
     Raises:
         HTTPException: 401 if token is invalid or user not found
     """
@@ -44,9 +49,12 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = get_user_by_username(db, username=username)
+    user = principal_cache.get(username)
     if user is None:
-        raise credentials_exception
+        user = get_user_by_username(db, username=username)
+        if user is None:
+            raise credentials_exception
+        principal_cache.set(user)
     
     if not user.is_active:
         raise HTTPException(
@@ -75,7 +83,7 @@ async def get_current_active_admin(
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user
     
@@ -109,7 +117,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(
+def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db)
 ):
@@ -0,0 +1,260 @@
+"""
+Cache backends shared by the API
+
+- TTLCache: thread-safe in-process LRU whose entries expire after a TTL
+- RedisCache: same interface on top of any client speaking the Redis protocol
+  (redis-py API), values are stored as JSON (or as-is for bytes with raw=True)
+- ResultCache: cache of serialized results (bytes) with tag invalidation and
+  single-flight computation of missing entries, on either backend
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from app.core.metrics import Counter
+
+cache_requests_total = Counter(
+    "cineverse_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+
+
+def cache_hit_ratio(name: str) -> float:
+    """Share of lookups on cache `name` that were hits since startup"""
+    hits = cache_requests_total.value(cache=name, result="hit")
+    total = hits + cache_requests_total.value(cache=name, result="miss")
+    return hits / total if total else 0.0
+
+
+class TTLCache:
+    """
+    In-process LRU cache, entries expire after `ttl` seconds. With `max_bytes`,
+    values must be bytes and the total of their lengths is bounded too.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "default", max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _weight(self, value) -> int:
+        return len(value) if self.max_bytes is not None else 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] < time.monotonic():
+                del self._data[key]
+                self.size_bytes -= self._weight(item[0])
+                item = None
+            if item is not None:
+                self._data.move_to_end(key)
+        cache_requests_total.inc(cache=self.name, result="miss" if item is None else "hit")
+        return default if item is None else item[0]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        if self.max_bytes is not None and self._weight(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= self._weight(previous[0])
+            self._data[key] = (value, time.monotonic() + ttl)
+            self.size_bytes += self._weight(value)
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.size_bytes > self.max_bytes
+            ):
+                _, (evicted, _) = self._data.popitem(last=False)
+                self.size_bytes -= self._weight(evicted)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                item = self._data.pop(key, None)
+                if item is not None:
+                    self.size_bytes -= self._weight(item[0])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache:
+    """Cache stored in Redis (or anything implementing get/set/delete like redis-py)"""
+
+    def __init__(self, client, ttl: float, prefix: str = "cineverse:", name: str = "default",
+                 raw: bool = False):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.name = name
+        self.raw = raw
+
+    def get(self, key: str, default=None):
+        raw = self.client.get(self.prefix + key)
+        cache_requests_total.inc(cache=self.name, result="miss" if raw is None else "hit")
+        if raw is None:
+            return default
+        return raw if self.raw else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self.client.set(self.prefix + key, value if self.raw else json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls: while `do(key, fn)` runs for a key, other
+    threads asking for the same key wait for its result instead of calling `fn`.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class LocalTags:
+    """Current token of each invalidation tag, in process memory"""
+
+    def __init__(self):
+        self._tokens: Dict[str, str] = {}
+
+    def get_many(self, tags: Sequence[str]) -> list:
+        return [self._tokens.get(tag, "0") for tag in tags]
+
+    def renew(self, *tags: str):
+        for tag in tags:
+            self._tokens[tag] = uuid.uuid4().hex
+
+    def clear(self):
+        self._tokens.clear()
+
+
+class RedisTags:
+    """Current token of each invalidation tag, shared by every worker through Redis"""
+
+    def __init__(self, client, prefix: str = "cineverse:tag:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, tags: Sequence[str]) -> list:
+        if not tags:
+            return []
+        values = self.client.mget([self.prefix + tag for tag in tags])
+        return [value.decode() if isinstance(value, bytes) else (value or "0") for value in values]
+
+    def renew(self, *tags: str):
+        # Pas d'expiration : un tag disparu ferait revivre les entrées d'avant l'invalidation
+        for tag in tags:
+            self.client.set(self.prefix + tag, uuid.uuid4().hex)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResultCache:
+    """
+    Cache of serialized results (bytes), invalidated by tags
+
+    Each tag has a token that changes when the tag is invalidated, and entries
+    are stored under their key plus the tokens of their tags: invalidating a
+    tag makes every entry tagged with it unreachable (they then age out of the
+    backend). A result computed concurrently with an invalidation is stored
+    under the old tokens, so it can never be served afterwards.
+    """
+
+    def __init__(self, entries, tags, name: str = "result"):
+        self.entries = entries
+        self.tags = tags
+        self.name = name
+        self._flight = SingleFlight()
+
+    def _entry_key(self, key: str, tags: Sequence[str]) -> str:
+        return key + "|" + ",".join(self.tags.get_many(list(tags)))
+
+    def get_or_set(self, key: str, tags: Iterable[str], compute: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """Cached result of `key`, or `compute()` stored under `tags` (None is not cached)"""
+        tags = sorted(set(tags))
+        entry_key = self._entry_key(key, tags)
+        value = self.entries.get(entry_key)
+        if value is not None:
+            return value
+
+        def load():
+            result = compute()
+            if result is not None:
+                self.entries.set(entry_key, result)
+            return result
+
+        return self._flight.do(entry_key, load)
+
+    def invalidate(self, *tags: str):
+        if tags:
+            self.tags.renew(*tags)
+
+    def clear(self):
+        self.entries.clear()
+        self.tags.clear()
+
+
+def redis_client(url: str):
+    """Create a redis-py client (optional dependency, only needed when configured)"""
+    try:
+        import redis
+    except ImportError as exc:  # pragma: no cover
+        raise RuntimeError("the 'redis' package is required to use a Redis cache URL") from exc
+    return redis.Redis.from_url(url)
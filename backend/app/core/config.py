@@ -1,8 +1,10 @@
+from datetime import datetime, timezone
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List, Union
+from typing import List, Literal, Optional, Union
 from dotenv import load_dotenv
 import os
+import tempfile
 
 # Charger explicitement le fichier .env depuis le dossier backend
 env_path = os.path.join(os.path.dirname(__file__), '..', '..', '.env')
@@ -16,11 +18,88 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
     TEST_DATABASE_URL: str
+    # Threads disponibles pour les handlers synchrones (requêtes SQLAlchemy)
+    DB_THREADPOOL_SIZE: int = 40
+    # Pool de connexions de chaque worker : workers × (taille + débordement) doit rester
+    # sous max_connections de PostgreSQL. Mode "null" : une connexion par session,
+    # derrière PgBouncer en mode transaction qui fait le pooling.
+    DB_POOL_MODE: Literal["queue", "null"] = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # secondes, -1 : jamais (sous l'idle timeout du serveur ou de PgBouncer)
+    # Un aller-retour par checkout ; désactivé : les connexions coupées sont invalidées à la première erreur
+    DB_POOL_PRE_PING: bool = False
+    # Réplicas en lecture (liste séparée par des virgules) : lectures du catalogue et des reviews
+    # en round-robin, sauf réplica en retard ou en panne, et sauf juste après une écriture du client
+    DATABASE_REPLICA_URLS: Union[List[str], str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_SECONDS: float = 1.0
+    REPLICA_RETRY_SECONDS: float = 30.0
+    READ_YOUR_WRITES_SECONDS: float = 5.0
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Pool bcrypt : threads dédiés et nombre de jobs en attente avant de répondre 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 8
+    # Cache des utilisateurs authentifiés (Redis optionnel, sinon en mémoire) et des tokens vérifiés
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAXSIZE: int = 10000
+    PRINCIPAL_CACHE_REDIS_URL: Optional[str] = None
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_MAXSIZE: int = 10000
+    # Autocomplétion des titres : index chargé au démarrage, version vérifiée toutes les N secondes
+    TYPEAHEAD_PRELOAD: bool = True
+    TYPEAHEAD_SYNC_SECONDS: float = 1.0
+    # Cache HTTP du catalogue : fraîcheur dans les caches partagés (s-maxage) et durée des versions connues localement
+    HTTP_CACHE_SHARED_MAX_AGE: int = 10
+    VERSION_CACHE_TTL_SECONDS: float = 1.0
+    VERSION_CACHE_MAXSIZE: int = 100000
+    # Cache des réponses sérialisées (mémoire par défaut, Redis si une URL est fournie)
+    RESULT_CACHE_TTL_SECONDS: int = 60
+    RESULT_CACHE_MAXSIZE: int = 10000
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_REDIS_URL: Optional[str] = None
+    # Détection des N+1 : signale une même requête SQL exécutée N fois pendant une requête HTTP
+    # (None : active seulement quand ENVIRONMENT=development)
+    N_PLUS_ONE_DETECTION: Optional[bool] = None
+    N_PLUS_ONE_THRESHOLD: int = 5
+    # Nombre maximum d'ids par requête groupée (GET /movies?ids=, POST /watchlist/{id}/contains)
+    BATCH_MAX_IDS: int = 100
+    # Imports en masse (POST /movies/bulk, /reviews/bulk) : éléments par requête,
+    # éléments par transaction par défaut et erreurs détaillées dans la réponse
+    BULK_MAX_ITEMS: int = 100_000
+    BULK_BATCH_SIZE: int = 1000
+    BULK_MAX_ERRORS: int = 1000
+    # Exports (GET /export/...) : lignes lues par aller-retour du curseur côté serveur
+    EXPORT_CHUNK_SIZE: int = 1000
+    # Recommandations : voisins gardés par film, voisins suivants gardés en réserve
+    # par le consommateur incrémental (remplacent sans recalcul ceux qui sortent du
+    # top K), événements de reviews par lot et attente entre deux lots quand il a
+    # tout rattrapé
+    SIMILARITY_TOP_K: int = 50
+    SIMILARITY_RESERVE: int = 25
+    SIMILARITY_EVENTS_BATCH_SIZE: int = 1000
+    SIMILARITY_UPDATE_INTERVAL_SECONDS: float = 10.0
+    # Classements (app.core.ranking) : demi-vie du score de tendance et époque
+    # de ses poids, moyenne et poids a priori de la note bayésienne
+    # (à reconstruire avec app.tools.recompute_ratings après modification)
+    TRENDING_HALF_LIFE_HOURS: float = 72.0
+    TRENDING_EPOCH: datetime = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    TOP_RATED_PRIOR_MEAN: float = 3.0
+    TOP_RATED_PRIOR_WEIGHT: float = 10.0
+    # Fil des dernières reviews (app.core.review_feed) : reviews gardées en mémoire,
+    # intervalle de vérification des écritures des autres workers et rechargement complet
+    REVIEW_FEED_SIZE: int = 1000
+    REVIEW_FEED_SYNC_SECONDS: float = 1.0
+    REVIEW_FEED_TTL_SECONDS: float = 60.0
+    # Démarrage : attente maximale de la base (prestart.py) et schéma OpenAPI
+    # mis en cache sur disque entre les processus (vide : désactivé)
+    DB_STARTUP_TIMEOUT_SECONDS: float = 60.0
+    OPENAPI_CACHE_PATH: Optional[str] = os.path.join(tempfile.gettempdir(), "cineverse-openapi.json")
     
     # CORS - peut être une string ou une liste
     CORS_ORIGINS: Union[List[str], str] = ["http://localhost:3000", "http://localhost:5173"]
@@ -34,6 +113,13 @@ class Settings(BaseSettings):
         if isinstance(v, str):
             return [origin.strip() for origin in v.split(',')]
         return v
+
+    @field_validator('DATABASE_REPLICA_URLS', mode='before')
+    @classmethod
+    def parse_replica_urls(cls, v):
+        if isinstance(v, str):
+            return [url.strip() for url in v.split(',') if url.strip()]
+        return v
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,104 @@
+"""
+Streaming exports of the catalogue and the reviews (GET /export/...)
+
+Rows are read in id order through `yield_per`, which uses a server-side
+cursor on PostgreSQL (a psycopg2 named cursor), and encoded to NDJSON or CSV
+one partition at a time, optionally gzip-compressed on the fly. Memory thus
+stays bounded by one partition whatever the size of the table. Every row
+carries its id, so an interrupted download resumes with `since_id=<last id>`.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.movie import Movie
+from app.models.review import Review
+
+EXPORTS = {
+    "movies": (Movie.__table__, ("id", "title", "description", "release_year", "avg_rating", "review_count",
+                                 "rating_1_count", "rating_2_count", "rating_3_count", "rating_4_count",
+                                 "rating_5_count")),
+    "reviews": (Review.__table__, ("id", "movie_id", "user_id", "rating", "comment", "created_at")),
+}
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def rows(db: Session, name: str, since_id: int = 0, limit: Optional[int] = None,
+         chunk_size: int = 1000) -> Iterator[Sequence[tuple]]:
+    """Rows of export `name` with an id above `since_id`, in id order, by partitions of `chunk_size`"""
+    table, columns = EXPORTS[name]
+    query = select(*(table.c[column] for column in columns))\
+        .where(table.c.id > since_id)\
+        .order_by(table.c.id)\
+        .limit(limit)\
+        .execution_options(yield_per=chunk_size)
+    yield from db.execute(query).partitions()
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode(partitions: Iterable[Sequence[tuple]], columns: Sequence[str], fmt: str) -> Iterator[bytes]:
+    """One chunk of NDJSON lines or CSV records (after a header) per partition"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode()
+        for partition in partitions:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_plain(value) for value in row] for row in partition)
+            yield buffer.getvalue().encode()
+    else:
+        for partition in partitions:
+            yield "".join(
+                json.dumps({column: _plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+                for row in partition
+            ).encode()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip: its q-value, else the one of `*`, must be above 0"""
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (item.strip() for item in part.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0  # q illisible : codage refusé par prudence
+        if coding:
+            qualities[coding.lower()] = quality
+    # x-gzip est un alias de gzip (RFC 9110) ; sans gzip ni *, le codage n'est pas accepté
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def gzipped(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a stream of chunks into one gzip stream"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(db: Session, name: str, fmt: str, since_id: int = 0, limit: Optional[int] = None,
+           gzip: bool = False, chunk_size: int = 1000) -> Iterator[bytes]:
+    """Body of an export, produced as it is read from the database"""
+    chunks = encode(rows(db, name, since_id, limit, chunk_size), EXPORTS[name][1], fmt)
+    return gzipped(chunks) if gzip else chunks
@@ -0,0 +1,113 @@
+"""
+HTTP caching of the catalogue reads: strong ETags, 304 responses, Cache-Control
+
+ETags are derived from entity versions (app.crud.version) rather than from the
+response body, so a conditional request whose versions are known locally is
+answered with 304 without querying the database. Versions written by this
+process are recorded as soon as its transaction commits; those written by other
+workers are picked up after at most VERSION_CACHE_TTL_SECONDS.
+
+A session on a read replica (app.db.replicas) gets the versions from that
+replica, cached apart from the primary's: a body read on a lagging replica is
+then labelled (ETag, result cache key) with the versions it was read at, never
+with a newer version just committed on the primary.
+"""
+import hashlib
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.crud.version import get_versions
+
+_versions = TTLCache(settings.VERSION_CACHE_MAXSIZE, settings.VERSION_CACHE_TTL_SECONDS, name="version")
+
+
+def clear():
+    _versions.clear()
+
+
+def _cache_key(db: Session, key: str) -> str:
+    replica = db.info.get("replica")
+    return f"{replica}|{key}" if replica else key
+
+
+def current_versions(db: Session, keys: Iterable[str]) -> Dict[str, int]:
+    """Versions of `keys` as seen by `db`'s database, from the local cache when possible"""
+    versions = {}
+    missing = []
+    for key in keys:
+        version = _versions.get(_cache_key(db, key))
+        if version is None:
+            missing.append(key)
+        else:
+            versions[key] = version
+    if missing:
+        for key, version in get_versions(db, missing).items():
+            _versions.set(_cache_key(db, key), version)
+            versions[key] = version
+    return versions
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed(session):
+    # Écritures sur le primaire : connues des réplicas seulement une fois répliquées
+    for key, version in session.info.get("entity_versions", {}).items():
+        _versions.set(key, version)
+
+
+def _digest(*parts: str) -> str:
+    return '"' + hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32] + '"'
+
+
+def version_etag(request: Request, versions: Dict[str, int]) -> str:
+    """ETag of a representation identified by its URL and the versions it depends on"""
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    return _digest(request.url.path, query, *(f"{key}={versions[key]}" for key in sorted(versions)))
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already holds `etag` (weak comparison, RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    # Navigateurs : revalidation à chaque lecture (304 peu coûteux), pour qu'un
+    # utilisateur voie tout de suite sa propre review. Caches partagés (nginx) :
+    # réponse servie telle quelle pendant s-maxage
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age=0, s-maxage={settings.HTTP_CACHE_SHARED_MAX_AGE}",
+    }
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """The 304 response to send when the client's copy is current, else None"""
+    if is_fresh(request, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+
+def json_response(request: Request, body: bytes, etag: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serialized JSON `body` with caching headers, or 304 if the client has it.
+    Without `etag`, the ETag is computed from the body.
+    """
+    etag = etag or body_etag(body)
+    headers = {**(headers or {}), **cache_headers(etag)}
+    if is_fresh(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
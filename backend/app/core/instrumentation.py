@@ -0,0 +1,299 @@
+"""
+Per-request performance instrumentation
+
+`InstrumentationMiddleware` keeps a RequestStats object in a context variable
+for the duration of each request. SQLAlchemy engine events (`instrument_engine`)
+and the connection pool (`TimedQueuePool`, `TimedNullPool`) add the time spent in SQL, the
+number of queries, the rows they returned and the time spent waiting for a
+pooled connection; `TimedRoute` notes when the endpoint returned, so the rest
+of the time until the response starts is response serialization. Sync
+handlers run in worker threads with a copy of the request's context, so they
+update the same object.
+
+Each request is recorded in Prometheus histograms labelled by route template
+(/metrics) and summarized in a `Server-Timing` header, shown by the browser
+devtools.
+
+Rows are counted from the DB-API cursor's rowcount: psycopg2 reports it for
+SELECT statements, sqlite3 only for writes.
+
+With settings.N_PLUS_ONE_DETECTION (on by default in development), statements
+are also grouped by shape: a shape executed N_PLUS_ONE_THRESHOLD times during
+one request, typically a lazy load per row of a list, is logged as a likely
+N+1 and counted in cineverse_n_plus_one_total.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import NullPool, QueuePool
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+request_seconds = Histogram(
+    "cineverse_http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]
+)
+request_db_seconds = Histogram(
+    "cineverse_http_request_db_seconds", "Time spent in SQL statements per request", ["method", "route"]
+)
+request_db_queries = Histogram(
+    "cineverse_http_request_db_queries", "SQL statements executed per request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+request_db_rows = Histogram(
+    "cineverse_http_request_db_rows", "Rows returned or affected by SQL statements per request", ["method", "route"],
+    buckets=(0, 1, 10, 100, 1000, 10_000, 100_000),
+)
+pool_checkout_seconds = Histogram(
+    "cineverse_db_pool_checkout_seconds", "Time spent waiting for a pooled database connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+pool_checkout_timeouts_total = Counter(
+    "cineverse_db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT seconds"
+)
+# Saturation du pool : connexions utilisées / capacité (valeurs lues par app.db.session au scrape)
+pool_connections_in_use = Gauge("cineverse_db_pool_connections_in_use", "Database connections checked out")
+pool_capacity = Gauge("cineverse_db_pool_capacity", "Database connections this worker may open (size + overflow)")
+db_sessions_waiting = Gauge("cineverse_db_sessions_waiting", "Requests waiting for a database session slot")
+db_disconnects_total = Counter(
+    "cineverse_db_disconnects_total", "Statements that failed because the database connection was lost"
+)
+n_plus_one_total = Counter(
+    "cineverse_n_plus_one_total", "Requests that repeated a query shape N_PLUS_ONE_THRESHOLD times", ["route"]
+)
+
+# Listes de paramètres d'un IN (...) : leur longueur ne change pas la forme de la requête
+_PARAMETER_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)*\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL text with parameter lists collapsed (bound values are already placeholders)"""
+    return _PARAMETER_LIST.sub("(...)", " ".join(statement.split()))
+
+
+def n_plus_one_detection() -> bool:
+    if settings.N_PLUS_ONE_DETECTION is not None:
+        return settings.N_PLUS_ONE_DETECTION
+    return settings.ENVIRONMENT == "development"
+
+
+class RequestStats:
+    __slots__ = ("started", "db_seconds", "queries", "rows", "pool_wait_seconds",
+                 "serialize_seconds", "endpoint_done", "shapes", "repeated")
+
+    def __init__(self, detect_repeats: bool = False):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.pool_wait_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.endpoint_done: Optional[float] = None
+        self.shapes: Optional[Dict[str, int]] = {} if detect_repeats else None
+        self.repeated: List[str] = []  # formes ayant atteint N_PLUS_ONE_THRESHOLD
+
+    def record_statement(self, statement: str):
+        if self.shapes is None:
+            return
+        shape = statement_shape(statement)
+        count = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if count == settings.N_PLUS_ONE_THRESHOLD:
+            self.repeated.append(shape)
+
+    def server_timing(self, now: float) -> str:
+        if self.endpoint_done is not None:
+            serialize = self.serialize_seconds + now - self.endpoint_done
+        else:
+            serialize = self.serialize_seconds
+        return ", ".join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f"pool;dur={self.pool_wait_seconds * 1000:.2f}",
+            f"serialize;dur={serialize * 1000:.2f}",
+            f"total;dur={(now - self.started) * 1000:.2f}",
+        ])
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Statistics of the request being served, None outside of a request"""
+    return _current.get()
+
+
+@contextmanager
+def collecting(detect_repeats: Optional[bool] = None) -> Iterator[RequestStats]:
+    """Collect the statistics of the enclosed block (a request, a test, a script)"""
+    stats = RequestStats(n_plus_one_detection() if detect_repeats is None else detect_repeats)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed_serialization():
+    """Count the enclosed block as serialization (handlers that serialize themselves)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - started
+
+
+# --- base de données -------------------------------------------------------
+
+def instrument_engine(engine):
+    """Add the SQL time, query count and rows of `engine`'s statements to the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.db_seconds += elapsed
+            stats.queries += 1
+            stats.rows += max(cursor.rowcount, 0)
+            stats.record_statement(statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # Requête en échec : after_cursor_execute n'est pas appelé
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+        # Connexion perdue : SQLAlchemy l'invalide ainsi que les connexions plus anciennes du pool
+        if exception_context.is_disconnect:
+            db_disconnects_total.inc()
+
+
+class _TimedCheckout:
+    """Pool mixin recording how long each checkout waited and how many connections are in use"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_use = 0
+        self._in_use_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            pool_checkout_timeouts_total.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            pool_checkout_seconds.observe(elapsed)
+            stats = _current.get()
+            if stats is not None:
+                stats.pool_wait_seconds += elapsed
+        with self._in_use_lock:
+            self.in_use += 1
+        return connection
+
+    def _do_return_conn(self, record):
+        with self._in_use_lock:
+            self.in_use -= 1
+        super()._do_return_conn(record)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool with checkout timing (one pool per worker process)"""
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    """
+    NullPool with checkout timing: one connection per session, for PgBouncer in
+    transaction mode which does the pooling (the checkout time is the connect time)
+    """
+
+
+# --- routes et middleware --------------------------------------------------
+
+def _endpoint_done():
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+def _timed_endpoint(call):
+    # Même nature (sync/async) que l'endpoint : FastAPI exécute les `def` dans son thread pool
+    if asyncio.iscoroutinefunction(call):
+        async def endpoint(**values):
+            try:
+                return await call(**values)
+            finally:
+                _endpoint_done()
+    else:
+        def endpoint(**values):
+            try:
+                return call(**values)
+            finally:
+                _endpoint_done()
+    return endpoint
+
+
+class TimedRoute(APIRoute):
+    """APIRoute noting when the endpoint returns, to time the response serialization"""
+
+    def get_route_handler(self):
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+        return super().get_route_handler()
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware recording per-route metrics and the Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(time.perf_counter()))
+            await send(message)
+
+        with collecting() as stats:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._record(scope, stats, status)
+
+    def _record(self, scope, stats: RequestStats, status: int):
+        route = scope.get("route")
+        labels = {"method": scope["method"], "route": route.path_format if route else "unmatched"}
+        request_seconds.observe(time.perf_counter() - stats.started, status=status, **labels)
+        request_db_seconds.observe(stats.db_seconds, **labels)
+        request_db_queries.observe(stats.queries, **labels)
+        request_db_rows.observe(stats.rows, **labels)
+        for shape in stats.repeated:
+            n_plus_one_total.inc(route=labels["route"])
+            logger.warning("Possible N+1 in %s %s: %d executions of %s",
+                           labels["method"], labels["route"], stats.shapes[shape], shape)
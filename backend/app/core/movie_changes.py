@@ -0,0 +1,61 @@
+"""
+Post-commit notifications of movie writes for the in-process indexes
+
+Movie inserts, updates and deletes are noted in the session while it flushes
+and handed to the subscribers once the transaction commits, so a rolled back
+transaction never reaches an index. Subscribers receive a dict of
+`movie_id -> (title, description)`, or `movie_id -> None` for a deletion.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.movie import Movie
+
+MovieChanges = Dict[int, Optional[Tuple[Optional[str], Optional[str]]]]
+
+_subscribers: List[Callable[[Session, MovieChanges], None]] = []
+
+
+def subscribe(callback: Callable[[Session, MovieChanges], None]):
+    """Call `callback(session, changes)` after each commit that wrote movies"""
+    _subscribers.append(callback)
+    return callback
+
+
+def _pending(session: Session) -> MovieChanges:
+    return session.info.setdefault("movie_changes", {})
+
+
+def record(session: Session, changes: MovieChanges):
+    """Note movie writes made without the ORM (bulk inserts) for the post-commit notification"""
+    _pending(session).update(changes)
+
+
+@event.listens_for(Movie, "after_insert")
+@event.listens_for(Movie, "after_update")
+def _movie_saved(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _pending(session)[target.id] = (target.title, target.description)
+
+
+@event.listens_for(Movie, "after_delete")
+def _movie_deleted(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        _pending(session)[target.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _notify(session):
+    changes = session.info.pop("movie_changes", None)
+    if changes:
+        for callback in _subscribers:
+            callback(session, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("movie_changes", None)
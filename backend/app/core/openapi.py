@@ -0,0 +1,80 @@
+"""
+OpenAPI schema cached on disk
+
+FastAPI builds the schema on the first request for /openapi.json (or /docs)
+by walking every route and model, in every worker process. The schema is
+written once to OPENAPI_CACHE_PATH along with a fingerprint of what it is
+derived from: the application sources, the FastAPI and Pydantic versions and
+the settings that appear in it (limits and defaults of parameters). Later
+processes read it back while the fingerprint matches, so a code change or a
+setting change regenerates it.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+
+from app.core.config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+# Réglages hors de l'empreinte : absents du schéma, et secrets à ne pas écrire sur disque (même hachés)
+UNHASHED_SETTINGS = {name for name in Settings.model_fields if "SECRET" in name or name.endswith(("URL", "URLS"))}
+
+
+def fingerprint(app: FastAPI) -> str:
+    """Hash of the inputs of the app's OpenAPI schema"""
+    digest = hashlib.sha256()
+    digest.update(f"{app.title}|{app.version}|{fastapi.__version__}|{pydantic.VERSION}".encode())
+    digest.update(settings.model_dump_json(exclude=UNHASHED_SETTINGS).encode())
+    for path in sorted(APP_DIR.rglob("*.py")):
+        stat = path.stat()
+        digest.update(f"{path.relative_to(APP_DIR)}|{stat.st_mtime_ns}|{stat.st_size}".encode())
+    return digest.hexdigest()
+
+
+def _read(path: Path, key: str) -> Optional[dict]:
+    try:
+        cached = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    return cached.get("schema") if cached.get("fingerprint") == key else None
+
+
+def _write(path: Path, key: str, schema: dict):
+    # Fichier temporaire renommé : un autre worker ne lit jamais un fichier à moitié écrit
+    try:
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump({"fingerprint": key, "schema": schema}, file)
+        os.replace(temporary, path)
+    except OSError:
+        logger.warning("Could not write the OpenAPI schema cache to %s", path, exc_info=True)
+
+
+def cache_openapi(app: FastAPI, path: Optional[str]):
+    """Serve `app`'s OpenAPI schema from `path` when it is up to date, else generate and store it"""
+    if not path:
+        return
+    generate = app.openapi
+
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            key = fingerprint(app)
+            schema = _read(Path(path), key)
+            if schema is None:
+                schema = generate()
+                _write(Path(path), key, schema)
+            app.openapi_schema = schema
+        return app.openapi_schema
+
+    app.openapi = openapi
@@ -0,0 +1,70 @@
+"""
+Cache of authenticated principals, keyed by token subject (username)
+
+`get_current_user` runs on every authenticated request; caching the user row
+avoids a database round trip for each of them. Entries are plain dicts of the
+user's columns (so they can live in Redis) and are turned back into transient
+`User` objects on read.
+"""
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import RedisCache, TTLCache, redis_client
+from app.core.config import settings
+from app.models.user import User
+
+_PRINCIPAL_FIELDS = ("id", "username", "email", "full_name", "is_active", "is_admin")
+
+
+class PrincipalCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, username: str) -> Optional[User]:
+        data = self.backend.get(f"principal:{username}")
+        return User(**data) if data is not None else None
+
+    def set(self, user: User):
+        data = {field: getattr(user, field) for field in _PRINCIPAL_FIELDS}
+        self.backend.set(f"principal:{user.username}", data)
+
+    def invalidate(self, *usernames: str):
+        self.backend.delete(*(f"principal:{username}" for username in usernames if username))
+
+
+def _backend():
+    if settings.PRINCIPAL_CACHE_REDIS_URL:
+        return RedisCache(
+            redis_client(settings.PRINCIPAL_CACHE_REDIS_URL),
+            ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+            name="principal",
+        )
+    return TTLCache(
+        settings.PRINCIPAL_CACHE_MAXSIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS, name="principal"
+    )
+
+
+principal_cache = PrincipalCache(_backend())
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_status_change(mapper, connection, target):
+    """Drop the cached principal, once committed, whenever its username or permissions change"""
+    state = inspect(target)
+    watched = ("username", "is_active", "is_admin")
+    if any(state.attrs[name].history.has_changes() for name in watched):
+        previous = state.attrs.username.history.deleted
+        # Invalidé au commit : avant, une requête concurrente relirait et remettrait en cache l'ancienne ligne
+        state.session.info.setdefault("principals", set()).update((target.username, *previous))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate(session):
+    principal_cache.invalidate(*session.info.pop("principals", ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("principals", None)
@@ -0,0 +1,73 @@
+"""
+Scores of the movie leaderboards (GET /movies/trending, GET /movies/top-rated)
+
+Both scores are stored on movies and maintained incrementally by
+app.crud.review, in the transaction of each review write, like the rating
+aggregates; the endpoints read them through an index and never scan reviews.
+
+- Trending: sum over the movie's reviews of 2^((created_at - epoch) / half-life).
+  Weights are measured from a fixed epoch rather than from now, so a score
+  never has to be decayed in place: the ordering at any time is the one of
+  the scores decayed to that time. The weights grow by 2^(1/half-life) with
+  time: the exponent is capped at MAX_TRENDING_EXPONENT half-lives (about 8
+  years after the epoch at 72 h), so the weights and their sums stay finite.
+  Past the cap every new review weighs the same and the leaderboard turns
+  into a count; a warning is logged, move TRENDING_EPOCH forward then rebuild
+  the scores before that.
+- Top-rated: Bayesian average (C × m + rating sum) / (C + review count), with
+  a fixed prior mean m and weight C, so a movie rated 5 once doesn't outrank
+  one rated 4.8 by hundreds of people.
+
+After changing the TRENDING_* or TOP_RATED_* settings, rebuild the scores with
+`python -m app.tools.recompute_ratings`.
+"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Jour julien de l'époque Unix (conversion des dates SQLite en secondes)
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+# 2^960 : les sommes de jusqu'à 2^63 poids plafonnés restent sous le plus grand float (< 2^1024)
+MAX_TRENDING_EXPONENT = 960.0
+
+_capped = False
+
+
+def _half_life_seconds() -> float:
+    return settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+
+def trending_weight(created_at: datetime) -> float:
+    """Contribution of a review written at `created_at` to its movie's trending score"""
+    global _capped
+    if created_at.tzinfo is None:  # SQLite rend des dates naïves (UTC)
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    exponent = (created_at - settings.TRENDING_EPOCH).total_seconds() / _half_life_seconds()
+    if exponent > MAX_TRENDING_EXPONENT:
+        if not _capped:
+            _capped = True
+            logger.warning("Trending weights capped %d half-lives after TRENDING_EPOCH: move it forward "
+                           "and rebuild the scores (app.tools.recompute_ratings)", MAX_TRENDING_EXPONENT)
+        exponent = MAX_TRENDING_EXPONENT
+    return 2.0 ** exponent
+
+
+def trending_weight_sql(created_at, dialect: str):
+    """SQL expression of `trending_weight` (PostgreSQL and SQLite)"""
+    if dialect == "postgresql":
+        seconds, least = func.extract("epoch", created_at), func.least
+    else:
+        seconds, least = (func.julianday(created_at) - _UNIX_EPOCH_JULIAN_DAY) * 86400, func.min
+    exponent = (seconds - settings.TRENDING_EPOCH.timestamp()) / _half_life_seconds()
+    return func.power(2.0, least(exponent, MAX_TRENDING_EXPONENT))
+
+
+def bayesian_rating(count, total):
+    """Bayesian average of `count` ratings summing to `total` (numbers or SQL expressions)"""
+    weight = settings.TOP_RATED_PRIOR_WEIGHT
+    return (weight * settings.TOP_RATED_PRIOR_MEAN + total) / (weight + count)
@@ -0,0 +1,51 @@
+"""
+Server-side cache of the serialized catalogue reads (movie detail, movie list,
+reviews of a movie)
+
+Write paths tag what they change: every entity version they bump
+(app.crud.version) is also an invalidation tag, and `invalidate_on_commit`
+adds tags without a version. Tags are invalidated once the transaction commits.
+
+The in-memory backend only sees this worker's invalidations. Entries that
+depend on entity versions are also keyed by those versions, so they follow
+other workers' writes like the ETags do. Entries tagged only with
+version-less tags (the movie lists) can lag on other workers until they
+expire (RESULT_CACHE_TTL_SECONDS). Configure RESULT_CACHE_REDIS_URL to share
+the cache and its tags between workers.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import LocalTags, RedisCache, RedisTags, ResultCache, TTLCache, redis_client
+from app.core.config import settings
+
+
+def _build() -> ResultCache:
+    if settings.RESULT_CACHE_REDIS_URL:
+        client = redis_client(settings.RESULT_CACHE_REDIS_URL)
+        entries = RedisCache(client, ttl=settings.RESULT_CACHE_TTL_SECONDS,
+                             prefix="cineverse:result:", name="result", raw=True)
+        return ResultCache(entries, RedisTags(client))
+    entries = TTLCache(settings.RESULT_CACHE_MAXSIZE, settings.RESULT_CACHE_TTL_SECONDS,
+                       name="result", max_bytes=settings.RESULT_CACHE_MAX_BYTES)
+    return ResultCache(entries, LocalTags())
+
+
+result_cache = _build()
+
+
+def invalidate_on_commit(db: Session, *tags: str):
+    """Invalidate `tags` when the current transaction commits"""
+    db.info.setdefault("result_cache_tags", set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate(session):
+    tags = session.info.pop("result_cache_tags", set())
+    tags.update(session.info.get("entity_versions", {}))
+    result_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("result_cache_tags", None)
@@ -0,0 +1,189 @@
+"""
+In-memory feed of the most recent reviews (GET /reviews/recent)
+
+The last REVIEW_FEED_SIZE reviews are kept serialized in a bounded buffer
+sorted by (created_at, id): the first page of the feed is a slice of it,
+served without querying the database. Reviews created, updated or deleted by
+this process are applied once their transaction commits (app.crud.review
+notes them in the session).
+
+No entity version is bumped for the feed, so that review writes don't all
+increment one row. At most every REVIEW_FEED_SYNC_SECONDS, the number of
+reviews from the oldest buffered one onwards is counted on the
+(created_at, id) index: reviews created or deleted by other workers (or bulk
+imports) change it and the buffer is reloaded. Other workers' edits and
+author renames show after at most REVIEW_FEED_TTL_SECONDS, when the buffer
+is reloaded anyway, like the cached movie lists. Following pages, and first
+pages the buffer cannot answer, use keyset pagination in the database.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import event, func, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.crud.pagination import encode_cursor
+from app.models.review import Review
+from app.schemas.review import ReviewResponse
+
+REVIEW = TypeAdapter(ReviewResponse)
+
+Key = Tuple[datetime, int]
+# id -> review sérialisée, ou None pour une suppression
+ReviewChanges = Dict[int, Optional[Tuple[Key, bytes]]]
+
+
+def _key(review: Review) -> Key:
+    created_at = review.created_at
+    if created_at.tzinfo is None:  # SQLite rend des dates naïves (UTC)
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at, review.id
+
+
+def _serialize(review: Review) -> Tuple[Key, bytes]:
+    return _key(review), REVIEW.dump_json(REVIEW.validate_python(review, from_attributes=True))
+
+
+class ReviewFeed:
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        self._keys: List[Key] = []  # ordre croissant : la plus récente en dernier
+        self._bodies: List[bytes] = []
+        self._complete = False  # le buffer contient toutes les reviews de la base
+        self.loaded = False
+        self._loaded_at = self._checked_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._keys, self._bodies = [], []
+            self._complete = False
+            self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, db: Session):
+        """Replace the buffer with the last `size` reviews of the database"""
+        reviews = db.query(Review)\
+            .options(joinedload(Review.user))\
+            .order_by(Review.created_at.desc(), Review.id.desc())\
+            .limit(self.size)\
+            .all()
+        entries = [_serialize(review) for review in reversed(reviews)]
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._bodies = [body for _, body in entries]
+            self._complete = len(entries) < self.size
+            self.loaded = True
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    # --- mises à jour incrémentales ---------------------------------------
+
+    def _position(self, review_id: int) -> Optional[int]:
+        for position in range(len(self._keys) - 1, -1, -1):
+            if self._keys[position][1] == review_id:
+                return position
+        return None
+
+    def _insert(self, key: Key, body: bytes):
+        # Plus ancienne que le buffer incomplet : des reviews manquent entre les deux
+        if not self._complete and (not self._keys or key < self._keys[0]):
+            return
+        position = bisect.bisect(self._keys, key)
+        self._keys.insert(position, key)
+        self._bodies.insert(position, body)
+        if len(self._keys) > self.size:
+            del self._keys[0], self._bodies[0]
+            self._complete = False
+
+    def apply(self, changes: ReviewChanges):
+        """Apply review writes committed by this process"""
+        with self._lock:
+            if not self.loaded:
+                return
+            for review_id, entry in changes.items():
+                position = self._position(review_id)
+                if position is None:
+                    if entry is not None:
+                        self._insert(*entry)
+                elif entry is None:
+                    del self._keys[position], self._bodies[position]
+                else:  # review modifiée : même date, même place
+                    self._bodies[position] = entry[1]
+
+    # --- lecture ----------------------------------------------------------
+
+    def _in_sync(self, db: Session) -> bool:
+        """Whether the database holds the buffered number of reviews from the oldest buffered one"""
+        with self._lock:
+            oldest, count = (self._keys[0] if self._keys else None), len(self._keys)
+        query = db.query(func.count(Review.id))
+        if oldest is not None:
+            query = query.filter(tuple_(Review.created_at, Review.id) >= tuple_(
+                *oldest, types=[Review.created_at.type, Review.id.type]))
+        return query.scalar() == count
+
+    def sync(self, db: Session) -> bool:
+        """
+        Load the buffer on first use, reload it every REVIEW_FEED_TTL_SECONDS or
+        when a check (at most every REVIEW_FEED_SYNC_SECONDS) finds reviews
+        written elsewhere. Returns False while another thread is loading it.
+        """
+        if self.loaded:
+            now = time.monotonic()
+            if now - self._loaded_at < settings.REVIEW_FEED_TTL_SECONDS:
+                if now - self._checked_at < settings.REVIEW_FEED_SYNC_SECONDS:
+                    return True
+                self._checked_at = now
+                if self._in_sync(db):
+                    return True
+        if not self._loading.acquire(blocking=False):
+            return False
+        try:
+            self.load(db)
+        finally:
+            self._loading.release()
+        return True
+
+    def first_page(self, db: Session, limit: int) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        Serialized JSON list of the `limit` most recent reviews and the cursor
+        of the next page, or None when the buffer cannot answer
+        """
+        if not self.sync(db):
+            return None
+        with self._lock:
+            if not self.loaded or (limit > len(self._keys) and not self._complete):
+                return None
+            start = max(0, len(self._keys) - limit)
+            body = b"[" + b",".join(reversed(self._bodies[start:])) + b"]"
+            more = start > 0 or not self._complete
+            cursor = encode_cursor(list(self._keys[start])) if more and self._keys else None
+        return body, cursor
+
+
+review_feed = ReviewFeed(settings.REVIEW_FEED_SIZE)
+
+
+def record(session: Session, review: Review, deleted: bool = False):
+    """Note a review write for the feed, applied once the transaction commits"""
+    session.info.setdefault("review_feed", {})[review.id] = None if deleted else _serialize(review)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply(session):
+    changes = session.info.pop("review_feed", None)
+    if changes:
+        review_feed.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("review_feed", None)
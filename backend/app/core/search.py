@@ -0,0 +1,152 @@
+"""
+Full-text search over movie titles and descriptions
+
+On PostgreSQL, `movies.search_vector` is a generated tsvector column (French
+and English configurations, title weighted above description) with a GIN
+index, see migration 0004. Other databases (the SQLite test setup) use
+`MovieSearchIndex`, an in-process inverted index with the same semantics:
+every query word is a prefix, all words must match, results are ranked.
+
+The in-process index is built from the movies table on first use, then kept
+up to date from the movie writes committed by this process (app.core.movie_changes).
+"""
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core import movie_changes
+from app.models.movie import Movie
+
+# Poids des termes : un mot du titre compte plus qu'un mot de la description
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free words of `text`"""
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return _WORD.findall(folded)
+
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    """
+    Turn free text into a tsquery where every word is a prefix (`word:*`), or
+    None when there is nothing to search. Only word characters are kept, so
+    user input cannot inject tsquery operators.
+    """
+    words = _WORD.findall(q.lower())
+    return " & ".join(f"{word}:*" for word in words) or None
+
+
+class MovieSearchIndex:
+    """In-process inverted index over movie titles and descriptions"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._terms: List[str] = []  # vocabulaire trié, pour la recherche par préfixe
+        self._documents: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._documents.clear()
+            self.built = False
+
+    def build(self, db: Session):
+        """(Re)build the index from every row of the movies table"""
+        rows = db.query(Movie.id, Movie.title, Movie.description).all()
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+            self._documents.clear()
+            for movie_id, title, description in rows:
+                self._add(movie_id, title, description)
+            self.built = True
+
+    def add(self, movie_id: int, title: Optional[str], description: Optional[str]):
+        with self._lock:
+            self._remove(movie_id)
+            self._add(movie_id, title, description)
+
+    def remove(self, movie_id: int):
+        with self._lock:
+            self._remove(movie_id)
+
+    def _add(self, movie_id, title, description):
+        weights: Dict[str, float] = {}
+        for word in normalize(description):
+            weights[word] = DESCRIPTION_WEIGHT
+        for word in normalize(title):
+            weights[word] = TITLE_WEIGHT
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._terms, term)
+            postings[movie_id] = weight
+        self._documents[movie_id] = list(weights)
+
+    def _remove(self, movie_id):
+        for term in self._documents.pop(movie_id, ()):
+            postings = self._postings[term]
+            postings.pop(movie_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _prefix_scores(self, prefix: str) -> Dict[int, float]:
+        """Best weight of each movie among the terms starting with `prefix`"""
+        scores: Dict[int, float] = {}
+        start = bisect.bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            for movie_id, weight in self._postings[term].items():
+                if weight > scores.get(movie_id, 0.0):
+                    scores[movie_id] = weight
+        return scores
+
+    def search(self, q: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """(movie_id, score) of the movies matching every word of `q`, best first"""
+        words = normalize(q)
+        if not words:
+            return []
+        with self._lock:
+            scores = None
+            for word in words:
+                matches = self._prefix_scores(word)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {movie_id: score + matches[movie_id]
+                              for movie_id, score in scores.items() if movie_id in matches}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+search_index = MovieSearchIndex()
+
+
+@movie_changes.subscribe
+def _apply_changes(session, changes):
+    if not search_index.built:
+        return
+    for movie_id, document in changes.items():
+        if document is None:
+            search_index.remove(movie_id)
+        else:
+            search_index.add(movie_id, *document)
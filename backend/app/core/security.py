@@ -1,24 +1,89 @@
 """
 Security utilities for authentication and password hashing
 """
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Callable, Optional, TypeVar
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# passlib et python-jose sont importés au premier usage : hors du démarrage des workers
+@lru_cache(maxsize=None)
+def pwd_context():
+    """Password hashing context, created on first use"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+hash_queue_depth = Gauge(
+    "cineverse_password_hash_queue_depth", "Password hash jobs waiting for a worker"
+)
+hash_in_progress = Gauge(
+    "cineverse_password_hash_in_progress", "Password hash jobs currently running"
+)
+hash_seconds = Histogram(
+    "cineverse_password_hash_seconds", "Time spent hashing or verifying a password", ["operation"]
+)
+hash_rejected_total = Counter(
+    "cineverse_password_hash_rejected_total", "Password hash jobs rejected because the pool was full"
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool and its queue are full"""
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool for bcrypt work
+
+    bcrypt releases the GIL, so a few dedicated threads keep a login burst from
+    occupying every worker thread of the API. At most `workers + queue_limit`
+    jobs are accepted; beyond that `PasswordHasherBusy` is raised immediately.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def run(self, operation: str, func: Callable[..., T], *args) -> T:
+        if not self._slots.acquire(blocking=False):
+            hash_rejected_total.inc()
+            raise PasswordHasherBusy()
+        hash_queue_depth.inc()
+        try:
+            return self._executor.submit(self._timed, operation, func, *args).result()
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _timed(operation: str, func: Callable[..., T], *args) -> T:
+        hash_queue_depth.dec()
+        hash_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            hash_seconds.observe(time.perf_counter() - started, operation=operation)
+            hash_in_progress.dec()
+
+
+hashing_pool = PasswordHashingPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_LIMIT)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing_pool.run("verify", pwd_context().verify, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt"""
-    return pwd_context.hash(password)
+    return hashing_pool.run("hash", pwd_context().hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -32,6 +97,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     Returns:
         Encoded JWT token as string
     """
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -43,18 +110,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+# Tokens dont la signature a déjà été vérifiée : évite de recalculer le HMAC à chaque requête
+_verified_tokens = TTLCache(settings.TOKEN_CACHE_MAXSIZE, settings.TOKEN_CACHE_TTL_SECONDS, name="token")
+
+
 def decode_access_token(token: str) -> Optional[dict]:
     """
     Decode and verify a JWT access token
     
+    Tokens that were already verified are served from an in-process cache,
+    only their expiration is checked again.
+    
     Args:
         token: JWT token string
     
     Returns:
         Dictionary containing token payload, or None if invalid
     """
+    payload = _verified_tokens.get(token)
+    if payload is not None:
+        expire = payload.get("exp")
+        if expire is not None and expire <= time.time():
+            _verified_tokens.delete(token)
+            return None
+        return dict(payload)
+
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    _verified_tokens.set(token, payload)
+    return dict(payload)
@@ -0,0 +1,261 @@
+"""
+In-memory typeahead over movie titles
+
+Every word start of every (normalized) title is an entry of one sorted array,
+so the titles containing a word starting with a prefix are a contiguous run
+found by binary search. Entries are packed integers `slot << 8 | offset`
+pointing into the normalized titles instead of key strings, which keeps the
+index at a few bytes per word on top of the titles themselves.
+
+Writes committed by this process are applied incrementally. Other workers'
+writes are detected through the "movies" entity version (checked at most
+every settings.TYPEAHEAD_SYNC_SECONDS), which triggers a background rebuild;
+the current index keeps serving meanwhile.
+"""
+import bisect
+import heapq
+import sys
+import threading
+import time
+from array import array
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import movie_changes
+from app.core.config import settings
+from app.core.metrics import Gauge
+from app.core.search import normalize
+from app.crud.version import committed_version, get_version
+from app.models.movie import Movie
+
+VERSION_KEY = "movies"
+# Seuls les débuts de mots placés dans les 255 premiers caractères sont indexés
+MAX_OFFSET = 255
+# Longueur des clés comparées pour le tri ; les préfixes plus longs sont filtrés ensuite
+KEY_LENGTH = 24
+# Nombre maximum d'entrées examinées par requête : pour un préfixe très courant,
+# le classement porte sur les premières correspondances par ordre alphabétique
+MAX_SCAN = 500
+
+typeahead_entries = Gauge("cineverse_typeahead_entries", "Word-start entries in the typeahead index")
+typeahead_memory_bytes = Gauge("cineverse_typeahead_memory_bytes", "Approximate memory used by the typeahead index")
+
+
+def normalize_title(title: Optional[str]) -> str:
+    return " ".join(normalize(title))
+
+
+def _sizeof(text: Optional[str]) -> int:
+    return sys.getsizeof(text) if text is not None else 0
+
+
+def _word_starts(text: str) -> List[int]:
+    return [i for i in range(min(len(text), MAX_OFFSET + 1)) if i == 0 or text[i - 1] == " "]
+
+
+class TitleIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self._reset([], [], array("q"), array("Q"))
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+
+    def _reset(self, titles, normalized, ids, entries):
+        self._titles: List[Optional[str]] = titles
+        self._normalized: List[Optional[str]] = normalized
+        self._ids = ids  # slot -> id du film (titre à None pour un film supprimé)
+        self._ids_sorted = all(a < b for a, b in zip(ids, ids[1:]))
+        self._entries = entries  # triées par suffixe normalisé
+        self._string_bytes = sum(_sizeof(text) for text in titles) + sum(_sizeof(text) for text in normalized)
+
+    @property
+    def built(self) -> bool:
+        return self.version is not None
+
+    def clear(self):
+        with self._lock:
+            self._reset([], [], array("q"), array("Q"))
+            self.version = None
+            self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._normalized) - self._normalized.count(None)
+
+    # --- construction -----------------------------------------------------
+
+    def build(self, db: Session, batch_size: int = 10_000):
+        """(Re)build the index from the movies table, then swap it in"""
+        version = get_version(db, VERSION_KEY)
+        self.load(db.query(Movie.id, Movie.title).order_by(Movie.id).yield_per(batch_size), version)
+
+    def load(self, rows: Iterable[Tuple[int, Optional[str]]], version: int = 0):
+        """Replace the index content with `rows` of (movie_id, title)"""
+        titles, normalized, ids = [], [], array("q")
+        for movie_id, title in rows:
+            titles.append(title)
+            normalized.append(normalize_title(title))
+            ids.append(movie_id)
+        entries = array("Q", sorted(
+            (slot << 8 | offset for slot, text in enumerate(normalized) for offset in _word_starts(text)),
+            key=lambda entry: normalized[entry >> 8][(entry & 255):(entry & 255) + KEY_LENGTH],
+        ))
+        with self._lock:
+            self._reset(titles, normalized, ids, entries)
+            self.version = version
+            self._checked_at = time.monotonic()
+        self._report()
+
+    def _report(self):
+        typeahead_entries.set(len(self._entries))
+        typeahead_memory_bytes.set(self.memory_usage())
+
+    def memory_usage(self) -> int:
+        """Approximate size in bytes of the index structures and the titles they hold"""
+        return (self._string_bytes + sys.getsizeof(self._titles) + sys.getsizeof(self._normalized)
+                + self._ids.buffer_info()[1] * self._ids.itemsize
+                + self._entries.buffer_info()[1] * self._entries.itemsize)
+
+    # --- mises à jour incrémentales ---------------------------------------
+
+    def _key(self, length: int):
+        normalized = self._normalized
+        return lambda entry: normalized[entry >> 8][(entry & 255):(entry & 255) + length]
+
+    def _slot(self, movie_id: int) -> Optional[int]:
+        # Les ids arrivent en ordre croissant (chargement trié, nouveaux films) :
+        # recherche dichotomique, sauf si un id plus petit a été ajouté depuis
+        if self._ids_sorted:
+            slot = bisect.bisect_left(self._ids, movie_id)
+            return slot if slot < len(self._ids) and self._ids[slot] == movie_id else None
+        try:
+            return self._ids.index(movie_id)
+        except ValueError:
+            return None
+
+    def _index(self, slot: int, title: Optional[str]):
+        text = normalize_title(title)
+        self._titles[slot], self._normalized[slot] = title, text
+        self._string_bytes += _sizeof(title) + _sizeof(text)
+        key = self._key(KEY_LENGTH)
+        for offset in _word_starts(text):
+            entry = slot << 8 | offset
+            self._entries.insert(bisect.bisect_right(self._entries, key(entry), key=key), entry)
+
+    def _unindex(self, slot: int):
+        text = self._normalized[slot]
+        if text is None:
+            return
+        key = self._key(KEY_LENGTH)
+        for offset in _word_starts(text):
+            entry = slot << 8 | offset
+            position = bisect.bisect_left(self._entries, key(entry), key=key)
+            while self._entries[position] != entry:
+                position += 1
+            del self._entries[position]
+        self._string_bytes -= _sizeof(self._titles[slot]) + _sizeof(text)
+        self._titles[slot] = self._normalized[slot] = None
+
+    def _set(self, movie_id: int, title: Optional[str]):
+        """Index `title` for the movie, in its existing slot when it has one"""
+        slot = self._slot(movie_id)
+        if slot is None:
+            slot = len(self._ids)
+            if slot and movie_id < self._ids[-1]:
+                self._ids_sorted = False
+            self._ids.append(movie_id)
+            self._titles.append(None)
+            self._normalized.append(None)
+        else:
+            self._unindex(slot)
+        self._index(slot, title)
+
+    def apply(self, changes: movie_changes.MovieChanges, version: Optional[int] = None):
+        """Apply movie writes committed by this process"""
+        with self._lock:
+            if not self.built:
+                return
+            for movie_id, document in changes.items():
+                if document is not None:
+                    self._set(movie_id, document[0])
+                else:
+                    slot = self._slot(movie_id)
+                    if slot is not None:
+                        self._unindex(slot)
+            # Si un autre worker a écrit entre-temps, la version diffère et l'index
+            # sera reconstruit à la prochaine vérification
+            if version is not None and version == self.version + 1:
+                self.version = version
+        self._report()
+
+    # --- lecture ----------------------------------------------------------
+
+    def sync(self, db: Session) -> bool:
+        """
+        Build the index on first use, and at most every TYPEAHEAD_SYNC_SECONDS
+        compare its version with the database's; rebuild in the background when
+        another worker changed the movies. Returns False while the first build
+        is running in another thread (the index cannot answer yet).
+        """
+        if not self.built:
+            if not self._rebuilding.acquire(blocking=False):
+                return False
+            try:
+                if not self.built:
+                    self.build(db)
+            finally:
+                self._rebuilding.release()
+            return True
+        now = time.monotonic()
+        if now - self._checked_at < settings.TYPEAHEAD_SYNC_SECONDS:
+            return True
+        self._checked_at = now
+        if get_version(db, VERSION_KEY) != self.version and self._rebuilding.acquire(blocking=False):
+            factory = sessionmaker(bind=db.get_bind())
+            threading.Thread(target=self._rebuild, args=(factory,), daemon=True).start()
+        return True
+
+    def preload(self, factory):
+        """Build the index in a background thread (at startup)"""
+        if self._rebuilding.acquire(blocking=False):
+            threading.Thread(target=self._rebuild, args=(factory,), daemon=True).start()
+
+    def _rebuild(self, factory):
+        try:
+            with factory() as db:
+                self.build(db)
+        finally:
+            self._rebuilding.release()
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """
+        (movie_id, title) of titles with a word starting with `prefix`; titles
+        starting with it come first, then shorter titles
+        """
+        text = normalize_title(prefix)
+        if not text:
+            return []
+        probe = text[:KEY_LENGTH]
+        with self._lock:
+            key = self._key(len(probe))
+            position = bisect.bisect_left(self._entries, probe, key=key)
+            end = bisect.bisect_right(self._entries, probe, lo=position, hi=min(position + MAX_SCAN, len(self._entries)), key=key)
+            offsets = {}
+            for entry in self._entries[position:end]:
+                slot, offset = entry >> 8, entry & 255
+                if len(text) > KEY_LENGTH and not self._normalized[slot].startswith(text, offset):
+                    continue
+                offsets[slot] = min(offset, offsets.get(slot, offset))
+            ranked = heapq.nsmallest(limit, offsets, key=lambda slot: (
+                offsets[slot] > 0, len(self._normalized[slot]), self._normalized[slot]
+            ))
+            return [(self._ids[slot], self._titles[slot]) for slot in ranked]
+
+
+title_index = TitleIndex()
+
+
+@movie_changes.subscribe
+def _apply_changes(session, changes):
+    title_index.apply(changes, committed_version(session, VERSION_KEY))
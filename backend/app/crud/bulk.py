@@ -0,0 +1,102 @@
+"""
+Bulk imports (POST /movies/bulk, POST /reviews/bulk)
+
+`BulkLoader` receives raw items one at a time, validates each against a
+pydantic schema and inserts the valid ones in batches of `batch_size`, one
+transaction per batch, so memory stays bounded by the batch whatever the size
+of the upload. Invalid items are reported by position and skipped. When the
+database rejects a batch (a constraint, a concurrent delete), the batch is
+rolled back and retried item by item so that only the faulty items fail.
+"""
+from typing import Callable, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+Insert = Callable[[Session, Sequence[BaseModel]], object]
+Check = Callable[[Session, Sequence[BaseModel]], List[Optional[str]]]
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" if detail["loc"] else detail["msg"]
+        for detail in error.errors()
+    )
+
+
+class BulkLoader:
+    def __init__(self, db: Session, schema: Type[BaseModel], insert: Insert,
+                 check: Optional[Check] = None, batch_size: int = 1000):
+        self.db = db
+        self.schema = schema
+        self.insert = insert
+        self.check = check
+        self.batch_size = batch_size
+        self.received = 0
+        self.created = 0
+        self.failed = 0
+        self.errors: List[Tuple[int, str]] = []  # limité à settings.BULK_MAX_ERRORS
+        self._batch: List[Tuple[int, BaseModel]] = []
+
+    def add(self, item):
+        """Validate one raw item (a decoded JSON value); inserts a batch once it is full"""
+        index = self.received
+        self.received += 1
+        if isinstance(item, ValueError):  # ligne NDJSON illisible, décodée par l'appelant
+            self.reject(index, f"Invalid JSON: {item}")
+            return
+        try:
+            self._batch.append((index, self.schema.model_validate(item)))
+        except ValidationError as error:
+            self.reject(index, validation_message(error))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def reject(self, index: int, message: str):
+        self.failed += 1
+        if len(self.errors) < settings.BULK_MAX_ERRORS:
+            self.errors.append((index, message))
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        if self.check is not None and batch:
+            checked = self.check(self.db, [item for _, item in batch])
+            for (index, _), message in zip(batch, checked):
+                if message is not None:
+                    self.reject(index, message)
+            batch = [entry for entry, message in zip(batch, checked) if message is None]
+        if not batch:
+            return
+        try:
+            self.insert(self.db, [item for _, item in batch])
+            self.db.commit()
+            self.created += len(batch)
+        except SQLAlchemyError:
+            self.db.rollback()
+            # Lot refusé par la base : un élément par transaction pour isoler les fautifs
+            for index, item in batch:
+                try:
+                    self.insert(self.db, [item])
+                    self.db.commit()
+                    self.created += 1
+                except SQLAlchemyError as error:
+                    self.db.rollback()
+                    self.reject(index, str(getattr(error, "orig", None) or error).splitlines()[0])
+
+    def finish(self) -> dict:
+        """Insert the last partial batch and return the import report"""
+        self.flush()
+        return {
+            "received": self.received,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": [{"index": index, "error": message} for index, message in self.errors],
+            "errors_truncated": self.failed > len(self.errors),
+        }
@@ -1,25 +1,117 @@
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import column, func, insert
 from sqlalchemy.orm import Session
+from app.core import movie_changes
+from app.core.search import prefix_tsquery, search_index
+from app.core.typeahead import title_index
+from app.crud.pagination import Page, paginate
+from app.crud.version import bump_versions
 from app.models.movie import Movie
 from app.schemas.movie import MovieCreate, MovieUpdate
 
 def create_movie(db: Session, movie: MovieCreate):
     db_movie = Movie(**movie.model_dump())
     db.add(db_movie)
+    db.flush()
+    # movie:{id} aussi : une lecture groupée (GET /movies?ids=) a pu mémoriser son absence
+    bump_versions(db, "movies", f"movie:{db_movie.id}")
     db.commit()
     db.refresh(db_movie)
     return db_movie
 
+def insert_movies(db: Session, movies: Sequence[MovieCreate]) -> List[int]:
+    """
+    Insert `movies` with one batched INSERT, without ORM objects, and return
+    their ids. Runs in the caller's transaction: the caller commits.
+    """
+    rows = db.execute(
+        insert(Movie).returning(Movie.id, Movie.title, Movie.description),
+        [movie.model_dump() for movie in movies],
+    ).all()
+    # Pas d'événements ORM : index de recherche et versions mis à jour explicitement
+    movie_changes.record(db, {movie_id: (title, description) for movie_id, title, description in rows})
+    bump_versions(db, "movies", *(f"movie:{movie_id}" for movie_id, _, _ in rows))
+    return [movie_id for movie_id, _, _ in rows]
+
 def get_movie(db: Session, movie_id: int):
     return db.query(Movie).filter(Movie.id == movie_id).first()
 
-def get_movies(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Movie).offset(skip).limit(limit).all()
+def get_movies_by_ids(db: Session, ids: Sequence[int]) -> List[Movie]:
+    """Movies with the given ids in one query, in the order of `ids` (unknown ids are skipped)"""
+    movies = {movie.id: movie for movie in db.query(Movie).filter(Movie.id.in_(ids))}
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
+
+# Colonnes de tri autorisées pour la liste des films (chacune indexée avec l'id)
+MOVIE_SORT_COLUMNS = {
+    "id": Movie.id,
+    "avg_rating": Movie.avg_rating,
+    "review_count": Movie.review_count,
+}
+
+def get_movies(db: Session, skip: int = 0, limit: int = 10, sort_by: str = "id",
+               descending: bool = False, cursor: Optional[str] = None) -> Page:
+    columns = [Movie.id] if sort_by == "id" else [MOVIE_SORT_COLUMNS[sort_by], Movie.id]
+    return paginate(db.query(Movie), columns, skip=skip, limit=limit, cursor=cursor, descending=descending)
+
+# Classements (app.core.ranking) : scores maintenus à chaque review, lus par index
+def get_trending_movies(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> Page:
+    """Movies with the most reviews lately (time-decayed review count), first"""
+    return paginate(db.query(Movie), [Movie.trending_score, Movie.id], skip=skip, limit=limit, cursor=cursor,
+                    descending=True)
+
+def get_top_rated_movies(db: Session, min_reviews: int = 0, skip: int = 0, limit: int = 10,
+                         cursor: Optional[str] = None) -> Page:
+    """Movies with at least `min_reviews` reviews, highest Bayesian average rating first"""
+    query = db.query(Movie)
+    if min_reviews > 0:
+        query = query.filter(Movie.review_count >= min_reviews)
+    return paginate(query, [Movie.bayesian_rating, Movie.id], skip=skip, limit=limit, cursor=cursor, descending=True)
+
+# Colonne tsvector générée par PostgreSQL (migration 0004), absente du modèle
+# pour que le schéma reste portable (SQLite dans les tests)
+SEARCH_VECTOR = column("search_vector")
+
+def search_movies(db: Session, q: str, limit: int = 20) -> List[Movie]:
+    """Movies matching every word of `q` (as prefixes), best ranked first"""
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = prefix_tsquery(q)
+        if tsquery is None:
+            return []
+        # Le vecteur mélange les deux configurations : un mot correspond s'il
+        # correspond une fois racinisé en français ou en anglais
+        query = func.to_tsquery("french", tsquery).op("||")(func.to_tsquery("english", tsquery))
+        rank = func.ts_rank(SEARCH_VECTOR, query)
+        return db.query(Movie)\
+            .filter(SEARCH_VECTOR.op("@@")(query))\
+            .order_by(rank.desc(), Movie.id)\
+            .limit(limit)\
+            .all()
+
+    # Autres bases : index inversé en mémoire
+    if not search_index.built:
+        search_index.build(db)
+    ranked = search_index.search(q, limit)
+    movies = {movie.id: movie for movie in db.query(Movie).filter(Movie.id.in_([movie_id for movie_id, _ in ranked]))}
+    return [movies[movie_id] for movie_id, _ in ranked if movie_id in movies]
+
+def suggest_titles(db: Session, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+    """(id, title) of the movies with a title word starting with `prefix`"""
+    if title_index.sync(db):
+        return title_index.suggest(prefix, limit)
+    # Index en cours de chargement (démarrage) : recherche sur le début du titre
+    rows = db.query(Movie.id, Movie.title)\
+        .filter(Movie.title.istartswith(prefix, autoescape=True))\
+        .order_by(func.length(Movie.title), Movie.id)\
+        .limit(limit)\
+        .all()
+    return [tuple(row) for row in rows]
 
 def update_movie(db: Session, movie_id: int, movie: MovieUpdate):
     db_movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if db_movie:
         for key, value in movie.model_dump(exclude_unset=True).items():
             setattr(db_movie, key, value)
+        bump_versions(db, "movies", f"movie:{movie_id}")
         db.commit()
         db.refresh(db_movie)
     return db_movie
@@ -28,5 +120,6 @@ def delete_movie(db: Session, movie_id: int):
     db_movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if db_movie:
         db.delete(db_movie)
+        bump_versions(db, "movies", f"movie:{movie_id}", f"movie:{movie_id}:reviews")
         db.commit()
     return db_movie
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row of
+a page (sort value(s) then id). The next page is fetched with a
+`(sort_key, id) > cursor` comparison that an index on the same columns can
+seek to directly, instead of skipping rows like OFFSET does.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class Page(list):
+    """A list of rows with the cursor of the following page (None on the last page)"""
+    next_cursor: Optional[str] = None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value, column):
+    """Value of `column` from its JSON form, InvalidCursor when its type doesn't match"""
+    if isinstance(value, dict) and "dt" in value:
+        try:
+            value = datetime.fromisoformat(value["dt"])
+        except (TypeError, ValueError) as exc:
+            raise InvalidCursor("Invalid pagination cursor") from exc
+    expected = column.type.python_type
+    if value is None and column.expression.nullable:
+        return None
+    # bool est un int en Python : true/false ne sont pas des ids
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        try:
+            return float(value)
+        except OverflowError as exc:
+            raise InvalidCursor("Invalid pagination cursor") from exc
+    if not isinstance(value, expected) or isinstance(value, bool):
+        raise InvalidCursor("Invalid pagination cursor")
+    return value
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """
+    Sort key of a cursor, one value per column of `columns`. Every value is
+    checked against its column's type: a forged cursor would otherwise reach
+    the database and fail there (a DataError on PostgreSQL) instead of being
+    rejected with a 400.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor("Invalid pagination cursor")
+    return [_decode_value(value, column) for value, column in zip(values, columns)]
+
+
+def paginate(query, columns: Sequence, *, skip: int = 0, limit: int = 10,
+             cursor: Optional[str] = None, descending: bool = False) -> Page:
+    """
+    Order `query` by `columns` (the last one must be unique, e.g. the id) and
+    return one page: rows after `cursor` when given, else rows after `skip`.
+    """
+    query = query.order_by(*(column.desc() if descending else column for column in columns))
+    if cursor is not None:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            key, bound = columns[0], values[0]
+        else:
+            key, bound = tuple_(*columns), tuple_(*values, types=[column.type for column in columns])
+        query = query.filter(key < bound if descending else key > bound)
+    else:
+        query = query.offset(skip)
+
+    page = Page(query.limit(limit).all())
+    if limit > 0 and len(page) == limit:
+        last = page[-1]
+        page.next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return page
@@ -0,0 +1,47 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.similarity import MovieSimilarity
+from app.models.watchlist import Watchlist
+
+# Note neutre : les voisins d'un film noté 4 ou 5 comptent pour, ceux d'un film noté 1 ou 2 contre
+NEUTRAL_RATING = 2.5
+
+def get_recommendations(db: Session, user_id: int, limit: int = 20) -> List[Tuple[Movie, Optional[float]]]:
+    """
+    Movies to recommend to a user with their score, in one query: the
+    precomputed neighbours (app.tools.similarities) of the movies they rated,
+    weighted by similarity and rating, excluding the movies they reviewed or
+    have in their watchlist. Users without neighbours get the most reviewed
+    movies instead (score None).
+    """
+    rated = select(Review.movie_id, Review.rating).where(Review.user_id == user_id).cte("rated")
+    watchlist = select(Watchlist.movie_id).where(Watchlist.user_id == user_id)
+    score = func.sum(MovieSimilarity.score * (rated.c.rating - NEUTRAL_RATING))
+    # Jointure sur la clé primaire (movie_id, neighbor_id) : une plage d'index par film noté
+    scored = select(MovieSimilarity.neighbor_id.label("movie_id"), score.label("score"))\
+        .join(rated, rated.c.movie_id == MovieSimilarity.movie_id)\
+        .where(MovieSimilarity.neighbor_id.not_in(select(rated.c.movie_id)))\
+        .where(MovieSimilarity.neighbor_id.not_in(watchlist))\
+        .group_by(MovieSimilarity.neighbor_id)\
+        .having(score > 0)\
+        .order_by(score.desc(), MovieSimilarity.neighbor_id)\
+        .limit(limit)\
+        .subquery()
+    rows = db.query(Movie, scored.c.score)\
+        .join(scored, Movie.id == scored.c.movie_id)\
+        .order_by(scored.c.score.desc(), Movie.id)\
+        .all()
+    if rows:
+        return [(movie, score) for movie, score in rows]
+
+    # Démarrage à froid : films les plus commentés
+    reviewed = select(Review.movie_id).where(Review.user_id == user_id)
+    popular = db.query(Movie)\
+        .filter(Movie.id.not_in(reviewed), Movie.id.not_in(watchlist))\
+        .order_by(Movie.review_count.desc(), Movie.id)\
+        .limit(limit)\
+        .all()
+    return [(movie, None) for movie in popular]
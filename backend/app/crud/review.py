@@ -1,38 +1,166 @@
+from collections import defaultdict
+from typing import List, Optional, Sequence
+from sqlalchemy import Float, bindparam, case, cast, insert, update
 from sqlalchemy.orm import Session, joinedload
+from app.crud.pagination import Page, paginate
+from app.core import review_feed
+from app.core.ranking import bayesian_rating, trending_weight
+from app.core.result_cache import invalidate_on_commit
+from app.crud.version import bump_versions
+from app.models.movie import Movie
 from app.models.review import Review
+from app.models.review_event import ReviewEvent
+from app.models.user import User
 from app.schemas.review import ReviewCreate, ReviewUpdate
 
+def _apply_rating(db: Session, movie_id: int, rating: Optional[int], delta: int, trend: float = 0.0):
+    """
+    Add (delta=1) or remove (delta=-1) a rating from the movie's aggregates,
+    and `trend` to its trending score (app.core.ranking).
+    The increments are computed by the database, so concurrent writes don't race.
+    A review without a rating (NULL, older rows) is not part of the aggregates.
+    """
+    if rating is None:
+        return
+    bucket = getattr(Movie, f"rating_{rating}_count")
+    count = Movie.review_count + delta
+    total = Movie.rating_sum + delta * rating
+    db.execute(
+        update(Movie)
+        .where(Movie.id == movie_id)
+        .values({
+            Movie.review_count: count,
+            Movie.rating_sum: total,
+            bucket: bucket + delta,
+            Movie.avg_rating: case((count > 0, cast(total, Float) / count), else_=0.0),
+            Movie.bayesian_rating: bayesian_rating(count, total),
+            Movie.trending_score: Movie.trending_score + trend,
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+def _bump_movie(db: Session, movie_id: int):
+    """The movie's aggregates and review list change with each review write"""
+    bump_versions(db, f"movie:{movie_id}", f"movie:{movie_id}:reviews")
+    # Les listes de films affichent aussi les agrégats (tag sans version en base)
+    invalidate_on_commit(db, "movies")
+
+def _record_event(db: Session, review: Review, old_rating: Optional[int], new_rating: Optional[int]):
+    """Add the rating change to the outbox (review_events), in the transaction of the write"""
+    # Review orpheline (film ou auteur supprimé) : hors des similarités
+    if review.movie_id is None or review.user_id is None:
+        return
+    db.add(ReviewEvent(review_id=review.id, movie_id=review.movie_id, user_id=review.user_id,
+                       old_rating=old_rating, new_rating=new_rating))
+
 def create_review(db: Session, review: ReviewCreate):
     db_review = Review(**review.model_dump())
     db.add(db_review)
+    db.flush()  # id de la review pour l'événement
+    _record_event(db, db_review, None, review.rating)
+    _apply_rating(db, review.movie_id, review.rating, 1, trending_weight(db_review.created_at))
+    _bump_movie(db, review.movie_id)
+    review_feed.record(db, db_review)
     db.commit()
     db.refresh(db_review)
     return db_review
 
+def check_review_references(db: Session, reviews: Sequence[ReviewCreate]) -> List[Optional[str]]:
+    """Error of each review whose movie or user doesn't exist (None when both exist)"""
+    movie_ids = {review.movie_id for review in reviews}
+    user_ids = {review.user_id for review in reviews}
+    movies = {movie_id for movie_id, in db.query(Movie.id).filter(Movie.id.in_(movie_ids))}
+    users = {user_id for user_id, in db.query(User.id).filter(User.id.in_(user_ids))}
+    errors = []
+    for review in reviews:
+        if review.movie_id not in movies:
+            errors.append(f"Movie {review.movie_id} not found")
+        elif review.user_id not in users:
+            errors.append(f"User {review.user_id} not found")
+        else:
+            errors.append(None)
+    return errors
+
+# Agrégats de plusieurs films en une requête exécutée par lot (executemany)
+_movies = Movie.__table__
+_count = _movies.c.review_count + bindparam("b_count")
+_total = _movies.c.rating_sum + bindparam("b_sum")
+_ADD_RATINGS = update(_movies).where(_movies.c.id == bindparam("b_id")).values({
+    _movies.c.review_count: _count,
+    _movies.c.rating_sum: _total,
+    **{_movies.c[f"rating_{n}_count"]: _movies.c[f"rating_{n}_count"] + bindparam(f"b_{n}") for n in range(1, 6)},
+    _movies.c.avg_rating: case((_count > 0, cast(_total, Float) / _count), else_=0.0),
+    _movies.c.bayesian_rating: bayesian_rating(_count, _total),
+    _movies.c.trending_score: _movies.c.trending_score + bindparam("b_trend"),
+})
+
+def insert_reviews(db: Session, reviews: Sequence[ReviewCreate]) -> int:
+    """
+    Insert `reviews` with one batched INSERT and add them to their movies'
+    aggregates with one UPDATE per movie, sent as a single executemany.
+    Runs in the caller's transaction: the caller commits.
+    """
+    inserted = db.execute(insert(Review).returning(Review.id, Review.movie_id, Review.user_id, Review.rating,
+                                                   Review.created_at),
+                          [review.model_dump() for review in reviews]).all()
+    db.execute(insert(ReviewEvent), [
+        {"review_id": review_id, "movie_id": movie_id, "user_id": user_id, "old_rating": None, "new_rating": rating}
+        for review_id, movie_id, user_id, rating, _ in inserted
+    ])
+    per_movie = defaultdict(lambda: {"b_count": 0, "b_sum": 0, "b_trend": 0.0, **{f"b_{n}": 0 for n in range(1, 6)}})
+    for _, movie_id, _, rating, created_at in inserted:
+        totals = per_movie[movie_id]
+        totals["b_count"] += 1
+        totals["b_sum"] += rating
+        totals["b_trend"] += trending_weight(created_at)
+        totals[f"b_{rating}"] += 1
+    # Ordre fixe des films : pas d'interblocage entre deux imports concurrents
+    db.execute(_ADD_RATINGS, [{"b_id": movie_id, **per_movie[movie_id]} for movie_id in sorted(per_movie)])
+    keys = [key for movie_id in per_movie for key in (f"movie:{movie_id}", f"movie:{movie_id}:reviews")]
+    bump_versions(db, *keys)
+    invalidate_on_commit(db, "movies")
+    return len(reviews)
+
 def get_review(db: Session, review_id: int):
-    return db.query(Review).filter(Review.id == review_id).first()
+    # Auteur chargé avec la review : encore lisible dans la réponse de DELETE une fois la review supprimée
+    return db.query(Review).options(joinedload(Review.user)).filter(Review.id == review_id).first()
+
+# Les listes de reviews vont de la plus récente à la plus ancienne
+REVIEW_ORDER = [Review.created_at, Review.id]
 
-def get_reviews(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(Review).offset(skip).limit(limit).all()
+# ReviewResponse inclut l'auteur : chargé dans la même requête plutôt qu'une requête par review
+def get_reviews(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> Page:
+    query = db.query(Review).options(joinedload(Review.user))
+    return paginate(query, REVIEW_ORDER, skip=skip, limit=limit, cursor=cursor, descending=True)
 
-def get_reviews_by_movie(db: Session, movie_id: int, skip: int = 0, limit: int = 10):
-    return db.query(Review)\
+def get_reviews_by_movie(db: Session, movie_id: int, skip: int = 0, limit: int = 10,
+                         cursor: Optional[str] = None) -> Page:
+    query = db.query(Review)\
         .options(joinedload(Review.user))\
-        .filter(Review.movie_id == movie_id)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+        .filter(Review.movie_id == movie_id)
+    return paginate(query, REVIEW_ORDER, skip=skip, limit=limit, cursor=cursor, descending=True)
 
-def get_reviews_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10):
-    return db.query(Review).filter(Review.user_id == user_id).offset(skip).limit(limit).all()
+def get_reviews_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10,
+                        cursor: Optional[str] = None) -> Page:
+    query = db.query(Review)\
+        .options(joinedload(Review.user))\
+        .filter(Review.user_id == user_id)
+    return paginate(query, REVIEW_ORDER, skip=skip, limit=limit, cursor=cursor, descending=True)
 
 def update_review(db: Session, review_id: int, review: ReviewUpdate):
     db_review = db.query(Review).filter(Review.id == review_id).first()
     if db_review:
-        if review.rating is not None:
+        if review.rating is not None and review.rating != db_review.rating:
+            # Review jusqu'ici sans note : elle entre aussi dans le score de tendance
+            trend = trending_weight(db_review.created_at) if db_review.rating is None else 0.0
+            _apply_rating(db, db_review.movie_id, db_review.rating, -1)
+            _apply_rating(db, db_review.movie_id, review.rating, 1, trend)
+            _record_event(db, db_review, db_review.rating, review.rating)
             db_review.rating = review.rating
         if review.comment:
             db_review.comment = review.comment
+        _bump_movie(db, db_review.movie_id)
+        review_feed.record(db, db_review)
         db.add(db_review)
         db.commit()
         db.refresh(db_review)
@@ -41,6 +169,10 @@ def update_review(db: Session, review_id: int, review: ReviewUpdate):
 def delete_review(db: Session, review_id: int):
     db_review = db.query(Review).filter(Review.id == review_id).first()
     if db_review:
+        _apply_rating(db, db_review.movie_id, db_review.rating, -1, -trending_weight(db_review.created_at))
+        _record_event(db, db_review, db_review.rating, None)
+        _bump_movie(db, db_review.movie_id)
+        review_feed.record(db, db_review, deleted=True)
         db.delete(db_review)
         db.commit()
-    return db_review
\ No newline at end of file
+    return db_review
@@ -0,0 +1,8 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+def insert(db: Session, model):
+    """INSERT supporting ON CONFLICT (PostgreSQL and SQLite) for the session's dialect"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -1,7 +1,11 @@
+from typing import Optional
 from sqlalchemy.orm import Session
+from app.crud.pagination import Page, paginate
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
+from app.core.principals import principal_cache
+from app.crud.version import bump_versions
 
 def create_user(db: Session, user: UserCreate):
     """Create a new user with hashed password"""
@@ -35,13 +39,14 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> Page:
+    return paginate(db.query(User), [User.id], skip=skip, limit=limit, cursor=cursor)
 
 def update_user(db: Session, user_id: int, user: UserUpdate):
     """Update user information, including password if provided"""
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
+        previous_username = db_user.username
         update_data = user.model_dump(exclude_unset=True)
         
         # Hash password if it's being updated
@@ -53,14 +58,20 @@ def update_user(db: Session, user_id: int, user: UserUpdate):
         for field, value in update_data.items():
             setattr(db_user, field, value)
         
+        # Les noms d'utilisateur apparaissent dans les listes de reviews
+        if db_user.username != previous_username:
+            bump_versions(db, "users")
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        principal_cache.invalidate(previous_username, db_user.username)
     return db_user
 
 def delete_user(db: Session, user_id: int):
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
         db.delete(db_user)
+        bump_versions(db, "users")
         db.commit()
+        principal_cache.invalidate(db_user.username)
     return db_user
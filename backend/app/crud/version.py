@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.crud.upsert import insert
+from app.models.entity_version import EntityVersion
+
+# Clés incrémentées par requête (paramètres par requête limités sous SQLite)
+BUMP_CHUNK_SIZE = 1000
+
+def bump_versions(db: Session, *keys: str) -> Dict[str, int]:
+    """
+    Increment the version of each key within the current transaction and
+    return the new versions. They are also kept in `db.info["entity_versions"]`
+    until the transaction ends, for the post-commit hooks.
+    """
+    bumped = db.info.setdefault("entity_versions", {})
+    ordered = sorted(set(keys))  # ordre fixe : pas d'interblocage entre transactions
+    for start in range(0, len(ordered), BUMP_CHUNK_SIZE):
+        chunk = ordered[start:start + BUMP_CHUNK_SIZE]
+        statement = insert(db, EntityVersion).values([{"key": key, "version": 1} for key in chunk])
+        statement = statement.on_conflict_do_update(
+            index_elements=["key"], set_={"version": EntityVersion.version + 1}
+        ).returning(EntityVersion.key, EntityVersion.version)
+        bumped.update(db.execute(statement).all())
+    return {key: bumped[key] for key in keys}
+
+def bump_prefix(db: Session, prefix: str) -> int:
+    """
+    Increment every existing version whose key starts with `prefix` (after
+    bulk writes that bypass the CRUD functions) and return how many changed.
+    These versions are not recorded for the post-commit hooks: workers pick
+    them up when their version cache expires.
+    """
+    return db.query(EntityVersion).filter(EntityVersion.key.startswith(prefix, autoescape=True)).update(
+        {EntityVersion.version: EntityVersion.version + 1}, synchronize_session=False
+    )
+
+def get_version(db: Session, key: str) -> int:
+    return get_versions(db, [key])[key]
+
+def get_versions(db: Session, keys: Iterable[str]) -> Dict[str, int]:
+    """Current version of each key (0 when it was never bumped)"""
+    keys = list(keys)
+    rows = db.query(EntityVersion.key, EntityVersion.version).filter(EntityVersion.key.in_(keys)).all()
+    versions = dict(rows)
+    return {key: versions.get(key, 0) for key in keys}
+
+def committed_version(db: Session, key: str) -> Optional[int]:
+    """Version given to `key` by the transaction being committed, if it bumped it"""
+    return db.info.get("entity_versions", {}).get(key)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_versions(session, transaction):
+    # Après les hooks after_commit : les versions ne valent que pour cette transaction
+    if transaction.parent is None:
+        session.info.pop("entity_versions", None)
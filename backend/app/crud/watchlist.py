@@ -1,22 +1,22 @@
+from typing import List
 from sqlalchemy.orm import Session, joinedload
+from app.crud.upsert import insert
 from app.models.watchlist import Watchlist
 from app.schemas.watchlist import WatchlistCreate
 
 def add_to_watchlist(db: Session, watchlist: WatchlistCreate):
-    # Vérifier si déjà dans la watchlist
-    existing = db.query(Watchlist).filter(
+    # Insertion idempotente : l'index unique (user_id, movie_id) écarte les doublons,
+    # même quand deux requêtes ajoutent le même film en même temps
+    db.execute(
+        insert(db, Watchlist)
+        .values(**watchlist.model_dump())
+        .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+    )
+    db.commit()
+    return db.query(Watchlist).filter(
         Watchlist.user_id == watchlist.user_id,
         Watchlist.movie_id == watchlist.movie_id
     ).first()
-    
-    if existing:
-        return existing
-    
-    db_watchlist = Watchlist(**watchlist.model_dump())
-    db.add(db_watchlist)
-    db.commit()
-    db.refresh(db_watchlist)
-    return db_watchlist
 
 def get_watchlist(db: Session, watchlist_id: int):
     return db.query(Watchlist).filter(Watchlist.id == watchlist_id).first()
@@ -39,6 +39,14 @@ def remove_from_watchlist(db: Session, user_id: int, movie_id: int):
     
     return db_watchlist
 
+def watchlist_membership(db: Session, user_id: int, movie_ids: List[int]) -> List[bool]:
+    """For each of `movie_ids`, whether it is in the user's watchlist (one IN query)"""
+    present = {movie_id for movie_id, in db.query(Watchlist.movie_id).filter(
+        Watchlist.user_id == user_id,
+        Watchlist.movie_id.in_(movie_ids)
+    )}
+    return [movie_id in present for movie_id in movie_ids]
+
 def is_in_watchlist(db: Session, user_id: int, movie_id: int):
     return db.query(Watchlist).filter(
         Watchlist.user_id == user_id,
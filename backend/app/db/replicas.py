@@ -0,0 +1,216 @@
+"""
+Read replicas (settings.DATABASE_REPLICA_URLS)
+
+`get_db_read` gives read-only handlers a session on one of the replicas, in
+round-robin, or on the primary when none is usable: a replica is skipped while
+it lags more than REPLICA_MAX_LAG_SECONDS behind the primary, and for
+REPLICA_RETRY_SECONDS after its connection failed. `ReplicaSet.monitor`
+(started by the app's lifespan) measures the lag every REPLICA_CHECK_SECONDS.
+
+Read-your-writes: a response to a request that committed a write sets a
+cookie for READ_YOUR_WRITES_SECONDS, during which the client's reads go to the
+primary. The cookie travels with the client, so every worker honours it. The
+browser keeps it when the SPA calls the API on the same origin (nginx /api
+proxy) or, cross-origin, on the same site (localhost:5173 -> localhost:8000):
+the axios client sends credentials and CORS allows them. A SPA served from
+another site would need SameSite=None; Secure.
+
+Without replicas, `get_db_read` is `get_db`: on the primary, both return the
+same session, so a request never holds two of its pool slots.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import AsyncGenerator, List, Optional, Sequence
+
+import anyio
+from anyio import to_thread
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.instrumentation import instrument_engine
+from app.core.metrics import Counter, Gauge
+from app.db.session import POOL_CAPACITY, create_db_engine, primary_session, session_scope
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = "cineverse_primary"
+
+reads_total = Counter("cineverse_db_reads_total", "Read-only requests by database they were sent to", ["target"])
+replica_lag_seconds = Gauge("cineverse_db_replica_lag_seconds", "Replication lag measured on each replica", ["replica"])
+
+# Retard d'un réplica PostgreSQL : nul s'il a rejoué tout ce qu'il a reçu (primaire inactif)
+_LAG_QUERY = """
+SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+
+class Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.slots = anyio.Semaphore(POOL_CAPACITY)
+        self.lag = 0.0
+        self.down_until = 0.0
+
+    def usable(self, now: float) -> bool:
+        return now >= self.down_until and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as connection:
+            if self.engine.dialect.name != "postgresql":
+                connection.exec_driver_sql("SELECT 1")
+                return 0.0
+            return float(connection.exec_driver_sql(_LAG_QUERY).scalar())
+
+
+class ReplicaSet:
+    def __init__(self, engines: Sequence[Engine] = ()):
+        self.replicas: List[Replica] = []
+        self._next = 0
+        self._lock = threading.Lock()
+        for engine in engines:
+            self.add(engine)
+
+    def add(self, engine: Engine) -> Replica:
+        replica = Replica(engine)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(exception_context):
+            if exception_context.is_disconnect:
+                self.mark_down(replica)
+
+        self.replicas.append(replica)
+        return replica
+
+    def pick(self) -> Optional[Replica]:
+        """Next usable replica in round-robin, None when reads must go to the primary"""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._next]
+                self._next = (self._next + 1) % len(self.replicas)
+                if replica.usable(now):
+                    return replica
+        return None
+
+    def mark_down(self, replica: Replica):
+        if replica.down_until <= time.monotonic():
+            logger.warning("Replica %s unavailable, reads go elsewhere for %ss",
+                           replica.name, settings.REPLICA_RETRY_SECONDS)
+        replica.down_until = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+    def refresh(self):
+        """Measure the lag of every replica (blocking: run it in a thread)"""
+        for replica in self.replicas:
+            try:
+                replica.lag = replica.measure_lag()
+            except SQLAlchemyError:
+                self.mark_down(replica)
+                continue
+            replica.down_until = 0.0
+            replica_lag_seconds.set(replica.lag, replica=replica.name)
+
+    async def monitor(self):
+        while True:
+            await to_thread.run_sync(self.refresh)
+            await asyncio.sleep(settings.REPLICA_CHECK_SECONDS)
+
+
+def _create_replica(url: str) -> Engine:
+    engine = create_db_engine(url)
+    instrument_engine(engine)
+    return engine
+
+
+replicas = ReplicaSet([_create_replica(url) for url in settings.DATABASE_REPLICA_URLS])
+
+
+async def get_db_read(request: Request) -> AsyncGenerator[Session, None]:
+    """
+    Dependency for read-only handlers: a session on a replica, or on the primary
+    when no replica is usable or right after the client's own write
+    """
+    replica = None if request.cookies.get(PRIMARY_COOKIE) else replicas.pick()
+    if replica is None:
+        reads_total.inc(target="primary")
+        # Session de get_db si la requête en a déjà une (get_current_user) : une seule place par requête
+        async with primary_session(request) as db:
+            yield db
+    else:
+        reads_total.inc(target="replica")
+        async with session_scope(replica.slots, bind=replica.engine) as db:
+            db.info["replica"] = replica.name  # versions lues sur ce réplica (app.core.http_cache)
+            yield db
+
+
+# --- lecture de ses propres écritures --------------------------------------
+
+class _Writes:
+    __slots__ = ("committed",)
+
+    def __init__(self):
+        self.committed = False
+
+
+_writes: ContextVar[Optional[_Writes]] = ContextVar("request_writes", default=None)
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state):
+    # INSERT/UPDATE/DELETE en masse via session.execute(), sans flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    writes = _writes.get()
+    if session.info.pop("wrote", False) and writes is not None:
+        writes.committed = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware sending the clients that just wrote to the primary for their next reads"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas.replicas:
+            await self.app(scope, receive, send)
+            return
+        writes = _Writes()
+        token = _writes.set(writes)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and writes.committed:
+                max_age = math.ceil(settings.READ_YOUR_WRITES_SECONDS)
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie", f"{PRIMARY_COOKIE}=1; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _writes.reset(token)
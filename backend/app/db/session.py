@@ -1,33 +1,126 @@
+import logging
+from contextlib import asynccontextmanager
+
+import anyio
+from anyio import to_thread
+from starlette.requests import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, AsyncIterator
 from app.core.config import settings
+from app.core.instrumentation import (
+    TimedNullPool, TimedQueuePool, db_sessions_waiting, instrument_engine, pool_capacity, pool_connections_in_use,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connexions ouvertes au plus par ce worker (en mode "null", par PgBouncer pour lui)
+POOL_CAPACITY = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+def create_db_engine(url: str) -> Engine:
+    """Engine whose pool follows settings.DB_POOL_*"""
+    if settings.DB_POOL_MODE == "null":
+        # PgBouncer (mode transaction) fait déjà le pooling : garder des connexions
+        # ici les immobiliserait côté PgBouncer. psycopg2 n'utilise pas de requêtes
+        # préparées côté serveur, incompatibles avec ce mode.
+        return create_engine(url, poolclass=TimedNullPool, pool_pre_ping=settings.DB_POOL_PRE_PING)
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,  # mesure l'attente d'une connexion libre
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        # Sans pre-ping, une connexion coupée échoue une fois puis le pool invalide
+        # toutes les connexions plus anciennes (cineverse_db_disconnects_total)
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
 
 # Créer l'engine SQLAlchemy
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Vérifier la connexion avant de l'utiliser
-    pool_size=5,         # Nombre de connexions dans le pool
-    max_overflow=10      # Connexions supplémentaires si besoin
-)
+engine = create_db_engine(settings.DATABASE_URL)
+instrument_engine(engine)
+pool_connections_in_use.set_function(lambda: engine.pool.in_use)
+pool_capacity.set_function(lambda: POOL_CAPACITY)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Dependency pour obtenir une session DB dans FastAPI
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+# Une session garde sa connexion jusqu'à la fin de la requête. On limite donc le
+# nombre de sessions ouvertes à la capacité du pool : sinon les threads de FastAPI
+# peuvent tous rester bloqués en attente d'une connexion pendant que les requêtes
+# qui en détiennent une attendent un thread pour sérialiser leur réponse.
+_session_slots = anyio.Semaphore(POOL_CAPACITY)
+
+
+def check_connection_budget(workers: int):
+    """Warn when the pools of `workers` processes could exceed PostgreSQL's max_connections"""
+    if engine.dialect.name != "postgresql" or settings.DB_POOL_MODE == "null":
+        return
     try:
-        yield db
+        with engine.connect() as connection:
+            max_connections = int(connection.exec_driver_sql("SHOW max_connections").scalar())
+            reserved = int(connection.exec_driver_sql("SHOW superuser_reserved_connections").scalar())
+    except SQLAlchemyError:
+        logger.warning("Could not read max_connections to check the connection pool size", exc_info=True)
+        return
+    if workers * POOL_CAPACITY > max_connections - reserved:
+        logger.warning(
+            "%d workers × %d connections (DB_POOL_SIZE + DB_MAX_OVERFLOW) exceed the %d connections "
+            "PostgreSQL accepts: lower the pool size or set DB_POOL_MODE=null behind PgBouncer",
+            workers, POOL_CAPACITY, max_connections - reserved,
+        )
+
+
+@asynccontextmanager
+async def session_scope(slots: anyio.Semaphore, **options) -> AsyncIterator[Session]:
+    """Session from SessionLocal (`options` override its bind...) once one of `slots` is free"""
+    db_sessions_waiting.inc()
+    try:
+        await slots.acquire()
+    finally:
+        db_sessions_waiting.dec()
+    try:
+        db = SessionLocal(**options)
+        try:
+            yield db
+        finally:
+            # close() rend la connexion au pool : on le fait hors de la boucle d'événements,
+            # dans le pool de threads partagé (les sessions ouvertes étant bornées par
+            # `slots`, les fermetures en attente d'un thread le sont aussi)
+            await to_thread.run_sync(db.close)
     finally:
-        db.close()
-def get_db():
+        slots.release()
+
+
+@asynccontextmanager
+async def primary_session(request: Request) -> AsyncIterator[Session]:
+    """
+    The request's session on the primary: opened by the first dependency that
+    asks for it, then shared with the others (get_db, get_current_user,
+    get_db_read when it routes to the primary)
+    """
+    # Deux sessions pour une même requête prendraient deux places de `_session_slots` :
+    # sous charge chaque requête en tiendrait une en attendant la seconde, sans fin
+    shared = getattr(request.state, "db", None)
+    if shared is not None:
+        yield shared
+        return
+    async with session_scope(_session_slots) as db:
+        request.state.db = db
+        try:
+            yield db
+        finally:
+            del request.state.db
+
+
+async def get_db(request: Request) -> AsyncGenerator[Session, None]:
     """
     Dependency qui fournit une session de base de données.
     La session est automatiquement fermée après la requête.
     """
-    db = SessionLocal()
-    try:
+    async with primary_session(request) as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,8 +1,39 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core import metrics
 from app.core.config import settings
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.openapi import cache_openapi
+from app.core.typeahead import title_index
+from app.core.security import PasswordHasherBusy
+from app.crud.pagination import InvalidCursor
+from app.db.replicas import ReadYourWritesMiddleware, replicas
+from app.db.session import SessionLocal, check_connection_budget
 from app.api.v1.api import api_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Size the worker thread pool that runs the sync database handlers, check the
+    connection pool against the server's limit, load in-memory indexes, watch the replicas
+    """
+    to_thread.current_default_thread_limiter().total_tokens = settings.DB_THREADPOOL_SIZE
+    # Nombre de workers uvicorn (--workers lit aussi WEB_CONCURRENCY) ; requêtes bloquantes hors de la boucle
+    await to_thread.run_sync(check_connection_budget, int(os.environ.get("WEB_CONCURRENCY", "1")))
+    if settings.TYPEAHEAD_PRELOAD:
+        title_index.preload(SessionLocal)
+    # Retard des réplicas en lecture, mesuré en tâche de fond
+    monitor = asyncio.create_task(replicas.monitor()) if replicas.replicas else None
+    yield
+    if monitor is not None:
+        monitor.cancel()
+
 # Create FastAPI app
 app = FastAPI(
     title="CineVerse API",
@@ -11,6 +42,7 @@ app = FastAPI(
     openapi_url="/api/v1/openapi.json",
     docs_url="/api/v1/docs",
     redoc_url="/api/v1/redoc",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -20,11 +52,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+# Lectures sur le primaire juste après une écriture du client (avec des réplicas seulement)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Latence par route, temps SQL et en-tête Server-Timing (ajouté en dernier : englobe les autres)
+app.add_middleware(InstrumentationMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+# Schéma OpenAPI généré une fois, puis relu depuis le disque par les autres workers
+cache_openapi(app, settings.OPENAPI_CACHE_PATH)
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """Back-pressure: the bcrypt pool is saturated, ask the client to retry"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    """Malformed or tampered pagination cursor"""
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
 @app.get("/")
 async def root():
     """Root endpoint - Health check"""
@@ -39,6 +95,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "cineverse-api"}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
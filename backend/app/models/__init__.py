@@ -3,5 +3,9 @@ from app.models.user import User  # noqa: F401
 from app.models.movie import Movie  # noqa: F401
 from app.models.review import Review  # noqa: F401
 from app.models.watchlist import Watchlist  # noqa: F401
+from app.models.entity_version import EntityVersion  # noqa: F401
+from app.models.similarity import MovieCooccurrence, MovieNeighbor, MovieNorm, MovieSimilarity  # noqa: F401
+from app.models.review_event import ReviewEvent  # noqa: F401
 
-__all__ = ["User", "Movie", "Review", "Watchlist"]
+__all__ = ["User", "Movie", "Review", "Watchlist", "EntityVersion", "MovieSimilarity", "MovieNeighbor",
+           "MovieCooccurrence", "MovieNorm", "ReviewEvent"]
@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, Column, String
+from app.db.base import Base
+
+class EntityVersion(Base):
+    """
+    Version counter of a cached entity (e.g. "movies"), incremented in the
+    transaction that modifies it. Workers compare it with the version of
+    their in-memory copy to know when that copy is stale.
+    """
+    __tablename__ = "entity_versions"
+
+    key = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
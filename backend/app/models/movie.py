@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Float, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
+from app.core.config import settings
 from app.db.base import Base
 
 class Movie(Base):
@@ -10,6 +11,35 @@ class Movie(Base):
     description = Column(Text)
     release_year = Column(Integer)
 
+    # Agrégats des notes, maintenus de façon incrémentale par app.crud.review
+    # (reconstruits par `python -m app.tools.recompute_ratings`)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    avg_rating = Column(Float, nullable=False, default=0.0, server_default="0")
+    rating_1_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Scores des classements (app.core.ranking), maintenus de la même façon
+    trending_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    bayesian_rating = Column(Float, nullable=False, default=settings.TOP_RATED_PRIOR_MEAN,
+                             server_default=str(settings.TOP_RATED_PRIOR_MEAN))
+
     # Relationships
     reviews = relationship("Review", back_populates="movie")
     watchlists = relationship("Watchlist", back_populates="movie")
+
+    # Tri de GET /movies par note ou nombre de reviews et classements
+    # (GET /movies/trending, /movies/top-rated) sans parcourir la table
+    __table_args__ = (
+        Index("ix_movies_avg_rating_id", "avg_rating", "id"),
+        Index("ix_movies_review_count_id", "review_count", "id"),
+        Index("ix_movies_trending_score_id", "trending_score", "id"),
+        Index("ix_movies_bayesian_rating_id", "bayesian_rating", "id"),
+    )
+
+    @property
+    def rating_histogram(self):
+        """Number of reviews for each rating, from 1 to 5 stars"""
+        return [getattr(self, f"rating_{n}_count") or 0 for n in range(1, 6)]
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -11,8 +12,18 @@ class Review(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     rating = Column(Integer)
     comment = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Valeur fixée côté Python pour un format homogène (SQLite compare les dates comme du texte)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        server_default=func.now())
 
 
     movie = relationship("Movie", back_populates="reviews")
-    user = relationship("User", back_populates="reviews")
\ No newline at end of file
+    user = relationship("User", back_populates="reviews")
+
+    # Pagination par curseur des listes de reviews (plus récentes d'abord),
+    # globale, par film et par utilisateur
+    __table_args__ = (
+        Index("ix_reviews_created_at_id", "created_at", "id"),
+        Index("ix_reviews_movie_id_created_at", movie_id, created_at.desc(), id.desc()),
+        Index("ix_reviews_user_id_created_at", user_id, created_at.desc(), id.desc()),
+    )
\ No newline at end of file
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Index, Integer
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class ReviewEvent(Base):
+    """
+    Outbox of the rating changes: one row per review created, re-rated or
+    deleted, inserted in the transaction of the write (old_rating is None for
+    a creation, new_rating for a deletion). The similarity consumer
+    (app.tools.similarity_updates) applies the events and deletes them.
+    """
+    __tablename__ = "review_events"
+
+    id = Column(Integer, primary_key=True)
+    # Pas de clés étrangères : l'événement survit à la review, au film ou à l'auteur supprimé
+    review_id = Column(Integer, nullable=False)
+    movie_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    old_rating = Column(Integer)
+    new_rating = Column(Integer)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        server_default=func.now())
+
+    # Le consommateur prend tous les événements en attente des auteurs d'un lot
+    __table_args__ = (
+        Index("ix_review_events_user_id", "user_id", "id"),
+    )
@@ -0,0 +1,68 @@
+from sqlalchemy import BigInteger, Column, Float, ForeignKey, Index, Integer
+from app.db.base import Base
+
+class MovieSimilarity(Base):
+    """
+    One of the top-K most similar movies of `movie_id` (item-item cosine on
+    the users' ratings), computed by `python -m app.tools.similarities` or kept
+    up to date from the review events by `python -m app.tools.similarity_updates`.
+    The primary key starts with movie_id: a movie's neighbours are one index range.
+    """
+    __tablename__ = "movie_similarities"
+
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    # REAL (4 octets) : la précision d'un float32 suffit pour classer
+    score = Column(Float(precision=24), nullable=False)
+
+    # Listes à recalculer quand un film change (app.tools.similarity_updates)
+    __table_args__ = (
+        Index("ix_movie_similarities_neighbor_id", "neighbor_id"),
+    )
+
+class MovieNeighbor(Base):
+    """
+    Head of a movie's ranking kept by app.tools.similarity_updates: its
+    SIMILARITY_TOP_K + SIMILARITY_RESERVE most similar movies (or fewer,
+    down to the top K, as changes push some below the cutoff), with exact
+    scores. The first K are published in movie_similarities; the others
+    replace the members that fall out of the top K without a recomputation.
+    """
+    __tablename__ = "movie_neighbors"
+
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    # Double précision : classement exact, comparé aux scores recalculés
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_movie_neighbors_neighbor_id", "neighbor_id"),
+    )
+
+class MovieCooccurrence(Base):
+    """
+    Dot product of two movies' rating vectors over the users who rated both
+    (`count`), with the integer weights of app.tools.similarities. Stored in
+    both directions, so a movie's pairs are one index range. Maintained from
+    the review events by app.tools.similarity_updates.
+    """
+    __tablename__ = "movie_cooccurrences"
+
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    other_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    count = Column(Integer, nullable=False)
+    dot = Column(BigInteger, nullable=False)
+
+class MovieNorm(Base):
+    """Norm of a movie's rating vector: cosine(a, b) = dot(a, b) / (norm(a) × norm(b))"""
+    __tablename__ = "movie_norms"
+
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    # Somme exacte des carrés des poids, et sa racine pour les requêtes de classement
+    norm_sq = Column(BigInteger, nullable=False)
+    norm = Column(Float, nullable=False)
+    # Voisin suivant le dernier de movie_neighbors (seuil d'entrée), ou un majorant de ce
+    # voisin dans l'ordre des listes (score, id) ; score None : inconnu, id None : aucun
+    # voisin au-dessus du score minimal
+    cutoff = Column(Float)
+    cutoff_id = Column(Integer)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -10,4 +10,11 @@ class Watchlist(Base):
     movie_id = Column(Integer, ForeignKey("movies.id"))
 
     user = relationship("User", back_populates="watchlists")
-    movie = relationship("Movie", back_populates="watchlists")
\ No newline at end of file
+    movie = relationship("Movie", back_populates="watchlists")
+
+    # Un film n'apparaît qu'une fois par watchlist ; l'index unique sert aussi
+    # les recherches par utilisateur, le second celles par film
+    __table_args__ = (
+        Index("uq_watchlists_user_id_movie_id", "user_id", "movie_id", unique=True),
+        Index("ix_watchlists_movie_id", "movie_id"),
+    )
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List
+
+class BulkError(BaseModel):
+    index: int  # position de l'élément dans le corps envoyé (à partir de 0)
+    error: str
+
+class BulkResult(BaseModel):
+    received: int
+    created: int
+    failed: int
+    errors: List[BulkError]
+    # Au-delà de BULK_MAX_ERRORS erreurs, seules les premières sont détaillées
+    errors_truncated: bool = False
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class MovieBase(BaseModel):
     title: str
@@ -16,6 +16,19 @@ class MovieUpdate(BaseModel):
 
 class MovieResponse(MovieBase):
     id: int
+    avg_rating: float = 0.0
+    review_count: int = 0
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]
 
     class Config:
         from_attributes = True
+
+
+class MovieRecommendation(MovieResponse):
+    # None : film populaire proposé faute de voisins (utilisateur sans notes)
+    score: Optional[float] = None
+
+
+class MovieSuggestion(BaseModel):
+    id: int
+    title: str
@@ -23,7 +23,7 @@ class ReviewResponse(BaseModel):
     id: int
     user_id: int
     movie_id: int
-    rating: int
+    rating: Optional[int] = None  # NULL sur d'anciennes reviews
     comment: str
     created_at: Optional[datetime] = None
     user: Optional[UserInReview] = None
@@ -35,7 +35,7 @@ class ReviewWithUser(BaseModel):
     id: int
     user_id: int
     movie_id: int
-    rating: int
+    rating: Optional[int] = None  # NULL sur d'anciennes reviews
     comment: str
     created_at: Optional[datetime] = None
     user: UserInReview
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
+from app.core.config import settings
 from app.schemas.movie import MovieResponse
 
 class WatchlistCreate(BaseModel):
@@ -24,4 +25,12 @@ class WatchlistWithMovie(BaseModel):
     movie: MovieResponse
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class WatchlistContains(BaseModel):
+    movie_ids: List[int] = Field(..., min_length=1, max_length=settings.BATCH_MAX_IDS)
+
+class WatchlistMembership(BaseModel):
+    movie_ids: List[int]
+    # in_watchlist[i] : movie_ids[i] est dans la watchlist
+    in_watchlist: List[bool]
@@ -0,0 +1,283 @@
+"""
+Generate a large synthetic dataset for load tests
+
+Movie popularity and user activity follow Zipf distributions: a few movies
+get most of the reviews and a few users write most of them, as on real
+review sites. Rows are generated in chunks and streamed with COPY FROM STDIN
+on PostgreSQL (executemany on other databases). Passwords come from a small
+pool of pre-computed bcrypt hashes; generated users log in with
+"password<N % pool size>".
+
+Rows are appended after the existing ones (explicit ids), then the id
+sequences and the rating aggregates are brought up to date.
+
+Usage (from backend/):
+    python -m app.tools.generate --movies 1M --users 500k --reviews 50M --jobs 8
+    python -m app.tools.generate --movies 1000 --users 200 --reviews 20k --watchlist 2k
+"""
+import argparse
+import csv
+import io
+import itertools
+import random
+import time
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.crud.version import bump_versions, bump_prefix
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.user import User
+from app.models.watchlist import Watchlist
+from app.tools.recompute_ratings import recompute_ratings
+
+WORDS = (
+    "nuit jour amour guerre ville secret ombre lumière voyage retour dernier premier "
+    "empire royaume mer ciel feu glace rêve mémoire silence tempête étoile destin "
+    "night day love war city secret shadow light journey return last first empire "
+    "kingdom sea sky fire ice dream memory silence storm star fate"
+).split()
+DESCRIPTIONS = [
+    "Un voyage inattendu bouleverse la vie d'une famille ordinaire.",
+    "Une enquête haletante au cœur d'une ville qui ne dort jamais.",
+    "Deux rivaux doivent s'allier pour survivre à une catastrophe.",
+    "Le récit d'une amitié improbable sur fond de guerre.",
+    "Une comédie romantique pleine de quiproquos.",
+    "Un thriller psychologique où rien n'est ce qu'il paraît.",
+]
+COMMENTS = [
+    "Excellent film, je recommande !",
+    "Pas mal, mais un peu long.",
+    "Une belle surprise.",
+    "Décevant par rapport aux critiques.",
+    "Chef-d'œuvre absolu.",
+    "Sympa pour une soirée.",
+    "Scénario prévisible mais bien joué.",
+]
+# Répartition globale des notes (les sites d'avis penchent vers 4 étoiles)
+RATING_WEIGHTS = [0.05, 0.08, 0.20, 0.37, 0.30]
+HISTORY = timedelta(days=5 * 365)
+
+
+def parse_count(value: str) -> int:
+    """'50M' -> 50_000_000, '500k' -> 500_000"""
+    value = value.strip().lower().replace("_", "")
+    for suffix, factor in (("k", 10**3), ("m", 10**6), ("b", 10**9)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def zipf_cum_weights(n: int, s: float) -> List[float]:
+    """Cumulative weights of ranks 1..n under a Zipf law of exponent s"""
+    return list(itertools.accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+
+
+class ZipfSampler:
+    """Draw ids in [first_id, first_id + n) by popularity; popular ids are spread at random"""
+
+    def __init__(self, first_id: int, n: int, s: float, rng: random.Random):
+        self.cum_weights = zipf_cum_weights(n, s)
+        self.ids = list(range(first_id, first_id + n))
+        rng.shuffle(self.ids)
+        self.rng = rng
+
+    def sample(self, k: int) -> List[int]:
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+
+# --- chargement -----------------------------------------------------------
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def load(engine: Engine, table, columns: Sequence[str], rows: Sequence[tuple]):
+    """Insert one chunk of rows: COPY FROM STDIN on PostgreSQL, executemany elsewhere"""
+    if not rows:
+        return
+    if engine.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+        buffer.seek(0)
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            connection.commit()
+        finally:
+            connection.close()
+    else:
+        with engine.begin() as connection:
+            connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def chunks(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- générateurs de lignes -------------------------------------------------
+
+def movie_rows(first_id: int, count: int, rng: random.Random) -> Iterator[tuple]:
+    for movie_id in range(first_id, first_id + count):
+        title = " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize()
+        yield movie_id, f"{title} {movie_id}", rng.choice(DESCRIPTIONS), rng.randint(1920, 2025)
+
+
+def user_rows(first_id: int, count: int, password_hashes: Sequence[str]) -> Iterator[tuple]:
+    for user_id in range(first_id, first_id + count):
+        yield (user_id, f"user{user_id}", f"user{user_id}@example.com", f"User {user_id}",
+               password_hashes[user_id % len(password_hashes)], True, False)
+
+
+def review_rows(movies: ZipfSampler, users: ZipfSampler, count: int, rng: random.Random,
+                chunk_size: int, now: datetime) -> Iterator[tuple]:
+    ratings = list(itertools.accumulate(RATING_WEIGHTS))
+    history = HISTORY.total_seconds()
+    while count > 0:
+        k = min(chunk_size, count)
+        count -= k
+        for movie_id, user_id in zip(movies.sample(k), users.sample(k)):
+            # Chaque film a un biais de qualité stable (-1, 0 ou +1 étoile)
+            rating = 1 + bisect(ratings, rng.random() * ratings[-1]) + (movie_id * 2654435761 % 3 - 1)
+            created_at = now - timedelta(seconds=rng.random() * history)
+            yield movie_id, user_id, min(5, max(1, rating)), rng.choice(COMMENTS), created_at
+
+
+def watchlist_rows(movies: ZipfSampler, first_user: int, users: int, count: int,
+                   rng: random.Random) -> Iterator[tuple]:
+    # Une entrée par (utilisateur, film) : l'index unique des watchlists l'impose
+    per_user, extra = divmod(count, users)
+    for offset in range(users):
+        wanted = per_user + (offset < extra)
+        picked = set()
+        while len(picked) < wanted:
+            picked.update(movies.sample(wanted - len(picked)))
+        for movie_id in picked:
+            yield first_user + offset, movie_id
+
+
+# --- orchestration ---------------------------------------------------------
+
+REVIEW_COLUMNS = ("movie_id", "user_id", "rating", "comment", "created_at")
+
+
+def _review_job(url: str, first_movie: int, movies: int, first_user: int, users: int, count: int,
+                zipf_s: float, seed: int, chunk_size: int, now: datetime) -> int:
+    """Generate and load `count` reviews (runs in a worker process with --jobs)"""
+    engine = create_engine(url) if isinstance(url, str) else url
+    rng = random.Random(seed)
+    movie_sampler = ZipfSampler(first_movie, movies, zipf_s, random.Random(0))
+    user_sampler = ZipfSampler(first_user, users, zipf_s * 0.8, random.Random(1))
+    rows = review_rows(movie_sampler, user_sampler, count, rng, chunk_size, now)
+    for chunk in chunks(rows, chunk_size):
+        load(engine, Review.__table__, REVIEW_COLUMNS, chunk)
+    return count
+
+
+def _next_id(engine: Engine, model) -> int:
+    with engine.connect() as connection:
+        return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate(engine: Engine, movies: int, users: int, reviews: int, watchlist: int = 0, *,
+             zipf_s: float = 1.1, seed: int = 42, chunk_size: int = 100_000, jobs: int = 1,
+             password_pool: int = 16, url: Optional[str] = None, log=print) -> dict:
+    """Append a synthetic dataset to the database behind `engine`"""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    def step(message):
+        log(f"[{time.perf_counter() - started:7.1f}s] {message}")
+
+    first_movie = _next_id(engine, Movie)
+    first_user = _next_id(engine, User)
+
+    step(f"{movies} movies")
+    for chunk in chunks(movie_rows(first_movie, movies, rng), chunk_size):
+        load(engine, Movie.__table__, ("id", "title", "description", "release_year"), chunk)
+
+    step(f"hashing a pool of {password_pool} passwords")
+    hashes = [get_password_hash(f"password{n}") for n in range(password_pool)]
+    step(f"{users} users")
+    for chunk in chunks(user_rows(first_user, users, hashes), chunk_size):
+        load(engine, User.__table__,
+             ("id", "username", "email", "full_name", "hashed_password", "is_active", "is_admin"), chunk)
+
+    now = datetime.now(timezone.utc)
+    step(f"{reviews} reviews ({jobs} job(s))")
+    shares = [reviews // jobs + (n < reviews % jobs) for n in range(jobs)]
+    job_args = [(url or engine, first_movie, movies, first_user, users, share,
+                 zipf_s, seed + 1 + n, chunk_size, now) for n, share in enumerate(shares)]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(_review_job, *zip(*job_args)))
+    else:
+        _review_job(*job_args[0])
+
+    if watchlist:
+        step(f"{watchlist} watchlist entries")
+        movie_sampler = ZipfSampler(first_movie, movies, zipf_s, random.Random(0))
+        for chunk in chunks(watchlist_rows(movie_sampler, first_user, users, watchlist, rng), chunk_size):
+            load(engine, Watchlist.__table__, ("user_id", "movie_id"), chunk)
+
+    step("sequences, rating aggregates and cache versions")
+    with Session(engine) as db:
+        if engine.dialect.name == "postgresql":
+            # Les ids explicites ne font pas avancer les séquences
+            for table in ("movies", "users"):
+                db.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+                ))
+        rated = recompute_ratings(db)
+        # Données écrites hors du CRUD : invalider les caches des workers
+        bump_versions(db, "movies", "users")
+        bump_prefix(db, "movie:")
+        db.commit()
+    step(f"done, {rated} movies rated")
+    return {"movies": movies, "users": users, "reviews": reviews, "watchlist": watchlist,
+            "seconds": round(time.perf_counter() - started, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=parse_count, default=parse_count("10k"))
+    parser.add_argument("--users", type=parse_count, default=parse_count("5k"))
+    parser.add_argument("--reviews", type=parse_count, default=parse_count("100k"))
+    parser.add_argument("--watchlist", type=parse_count, default=0, help="watchlist entries in total")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of movie popularity")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=parse_count, default=parse_count("100k"))
+    parser.add_argument("--jobs", type=int, default=1, help="processes loading reviews in parallel")
+    parser.add_argument("--password-pool", type=int, default=16)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    generate(engine, args.movies, args.users, args.reviews, args.watchlist,
+             zipf_s=args.zipf, seed=args.seed, chunk_size=args.chunk_size, jobs=args.jobs,
+             password_pool=args.password_pool, url=args.database_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Rebuild the rating aggregates and leaderboard scores stored on movies from the
+reviews table
+
+The aggregates are maintained incrementally by app.crud.review; this command
+recomputes all of them with a single UPDATE ... FROM (GROUP BY), e.g. after a
+bulk import, to repair drift or after changing the leaderboard settings
+(app.core.ranking). On PostgreSQL it locks the reviews table against writes
+until it commits, so it can run while the API is serving.
+
+Usage (from backend/):
+    python -m app.tools.recompute_ratings
+"""
+from sqlalchemy import Float, case, cast, func, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.ranking import bayesian_rating, trending_weight_sql
+from app.db.session import SessionLocal
+from app.models.movie import Movie
+from app.models.review import Review
+
+
+def recompute_ratings(db: Session) -> int:
+    """Recompute every movie's aggregates, returns the number of rated movies"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Bloque les écritures de reviews (ROW EXCLUSIVE) jusqu'au commit : un incrément
+        # concurrent ne peut pas être écrasé par un agrégat lu avant lui. SQLite n'a
+        # qu'un écrivain à la fois.
+        db.execute(text("LOCK TABLE reviews IN SHARE MODE"))
+    rated = select(Review.movie_id).where(Review.movie_id.is_not(None), Review.rating.is_not(None))
+    stats = (
+        select(
+            Review.movie_id.label("movie_id"),
+            func.count(Review.id).label("count"),
+            func.sum(Review.rating).label("total"),
+            func.coalesce(func.sum(trending_weight_sql(Review.created_at, dialect)), 0.0).label("trend"),
+            *(func.sum(case((Review.rating == n, 1), else_=0)).label(f"rating_{n}") for n in range(1, 6)),
+        )
+        # Reviews sans note (NULL) : hors des agrégats, comme dans app.crud.review
+        .where(rated.whereclause)
+        .group_by(Review.movie_id)
+        .subquery()
+    )
+
+    db.execute(
+        update(Movie).where(Movie.id.not_in(rated)).values(
+            review_count=0, rating_sum=0, avg_rating=0.0,
+            trending_score=0.0, bayesian_rating=settings.TOP_RATED_PRIOR_MEAN,
+            **{f"rating_{n}_count": 0 for n in range(1, 6)},
+        )
+    )
+    # UPDATE ... FROM (agrégat) : une seule instruction pour tous les films notés
+    updated = db.execute(
+        update(Movie).where(Movie.id == stats.c.movie_id).values(
+            review_count=stats.c.count,
+            rating_sum=stats.c.total,
+            avg_rating=cast(stats.c.total, Float) / stats.c.count,
+            bayesian_rating=bayesian_rating(stats.c.count, stats.c.total),
+            trending_score=stats.c.trend,
+            **{f"rating_{n}_count": stats.c[f"rating_{n}"] for n in range(1, 6)},
+        ).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return updated.rowcount
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        rated = recompute_ratings(db)
+        print(f"Rating aggregates rebuilt for {rated} movies")
+    finally:
+        db.close()
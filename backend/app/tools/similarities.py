@@ -0,0 +1,159 @@
+"""
+Precompute the top-K similar movies of every movie for the recommendations
+
+The reviews are read as a sparse movie × user matrix (SciPy CSR) of rating
+weights centred on the neutral rating, so that a movie someone disliked
+counts against the movies they liked. The weights are integers
+(2 × rating - 5), so that sums of their products are exact. Rows are
+normalized, then similarities are computed for a block of movies at a time
+with one sparse product against the whole matrix; the top K of each row is kept with
+argpartition. Memory stays bounded by one dense block of
+`block_size × movies` float32 scores (and their int64 partition indices).
+
+The table is replaced in one transaction, so GET /users/{id}/recommendations
+never sees a partial result. app.tools.similarity_updates maintains the same
+lists incrementally from statistics it keeps in the database; this job
+computes the lists alone, in memory.
+
+Usage (from backend/):
+    python -m app.tools.similarities --top-k 50 --block-size 1024
+"""
+import argparse
+import io
+import time
+from typing import Iterator, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.crud.recommendation import NEUTRAL_RATING
+from app.db.session import engine as app_engine
+from app.models.review import Review
+from app.models.similarity import MovieNeighbor, MovieNorm, MovieSimilarity
+
+READ_CHUNK_SIZE = 1_000_000
+WRITE_CHUNK_SIZE = 100_000
+
+
+def read_ratings(engine: Engine) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(movie_ids, user_ids, ratings) of every complete review, read in chunks through a server-side cursor"""
+    movies, users, ratings = [], [], []
+    # Colonnes nullables : mêmes reviews que celles de app.tools.similarity_updates
+    query = select(Review.movie_id, Review.user_id, Review.rating)\
+        .where(Review.movie_id.is_not(None), Review.user_id.is_not(None), Review.rating.is_not(None))\
+        .execution_options(yield_per=READ_CHUNK_SIZE)
+    with engine.connect() as connection:
+        for partition in connection.execute(query).partitions():
+            chunk = np.array(partition, dtype=np.int32).reshape(-1, 3)
+            movies.append(chunk[:, 0])
+            users.append(chunk[:, 1])
+            ratings.append(chunk[:, 2])
+    if not movies:
+        return (np.empty(0, np.int32),) * 3
+    return np.concatenate(movies), np.concatenate(users), np.concatenate(ratings)
+
+
+def rating_weight(rating):
+    """2 × (rating - NEUTRAL_RATING): -3, -1, 1, 3, 5 from 1 to 5 stars (ints or numpy arrays)"""
+    return 2 * rating - int(2 * NEUTRAL_RATING)
+
+
+def rating_matrix(movie_ids: np.ndarray, user_ids: np.ndarray, ratings: np.ndarray) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Row-normalized movie × user CSR matrix of rating weights, and the movie id of each row"""
+    movies, movie_index = np.unique(movie_ids, return_inverse=True)
+    _, user_index = np.unique(user_ids, return_inverse=True)
+    values = rating_weight(ratings).astype(np.float32)
+    matrix = sparse.csr_matrix((values, (movie_index, user_index)), shape=(len(movies), user_index.max() + 1))
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags((1.0 / norms).astype(np.float32)) @ matrix, movies
+
+
+def top_k_similarities(matrix: sparse.csr_matrix, top_k: int = settings.SIMILARITY_TOP_K, block_size: int = 1024,
+                       min_score: float = 0.0) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    (row, neighbour row, score) arrays of the `top_k` most similar rows of each
+    row with a score above `min_score`, one block of rows at a time
+    """
+    count = matrix.shape[0]
+    k = min(top_k, count - 1)
+    if k <= 0:
+        return
+    transposed = matrix.T.tocsr()
+    for start in range(0, count, block_size):
+        scores = (matrix[start:start + block_size] @ transposed).toarray()
+        rows = np.arange(scores.shape[0])
+        scores[rows, start + rows] = -np.inf  # un film n'est pas son propre voisin
+        neighbors = np.argpartition(scores, -k, axis=1)[:, -k:]
+        best = np.take_along_axis(scores, neighbors, axis=1)
+        keep = best > min_score
+        yield np.repeat(start + rows, k)[keep.ravel()], neighbors[keep], best[keep]
+
+
+def _write(engine: Engine, movie_ids: np.ndarray, neighbor_ids: np.ndarray, scores: np.ndarray):
+    table = MovieSimilarity.__table__
+    with engine.begin() as connection:
+        connection.execute(delete(table))
+        # Têtes et seuils du consommateur incrémental (app.tools.similarity_updates) : à recalculer
+        connection.execute(delete(MovieNeighbor))
+        connection.execute(update(MovieNorm).values(cutoff=None, cutoff_id=None))
+        for start in range(0, len(scores), WRITE_CHUNK_SIZE):
+            chunk = slice(start, start + WRITE_CHUNK_SIZE)
+            if engine.dialect.name == "postgresql":
+                buffer = io.StringIO()
+                np.savetxt(buffer, np.column_stack([movie_ids[chunk], neighbor_ids[chunk], scores[chunk]]),
+                           fmt=("%d", "%d", "%.6g"), delimiter=",")
+                buffer.seek(0)
+                with connection.connection.cursor() as cursor:
+                    cursor.copy_expert(f"COPY {table.name} (movie_id, neighbor_id, score) FROM STDIN WITH (FORMAT csv)",
+                                       buffer)
+            else:
+                connection.execute(insert(table), [
+                    {"movie_id": int(movie), "neighbor_id": int(neighbor), "score": float(score)}
+                    for movie, neighbor, score in zip(movie_ids[chunk], neighbor_ids[chunk], scores[chunk])
+                ])
+
+
+def compute_similarities(engine: Engine, top_k: int = settings.SIMILARITY_TOP_K, block_size: int = 1024,
+                         min_score: float = 0.0, log=print) -> int:
+    """Replace the movie_similarities table, returns the number of rows written"""
+    started = time.perf_counter()
+
+    def step(message: str):
+        log(f"[{time.perf_counter() - started:>7.1f}s] {message}")
+
+    movie_ids, user_ids, ratings = read_ratings(engine)
+    step(f"{len(ratings)} ratings read")
+    if len(ratings) == 0:
+        _write(engine, *(np.empty(0),) * 3)
+        return 0
+    matrix, movies = rating_matrix(movie_ids, user_ids, ratings)
+    step(f"matrix {matrix.shape[0]} movies × {matrix.shape[1]} users, {matrix.nnz} ratings")
+    rows, neighbors, scores = [], [], []
+    for row, neighbor, score in top_k_similarities(matrix, top_k, block_size, min_score):
+        rows.append(movies[row])
+        neighbors.append(movies[neighbor])
+        scores.append(score)
+    rows, neighbors, scores = (np.concatenate(parts) if parts else np.empty(0) for parts in (rows, neighbors, scores))
+    step(f"{len(scores)} similarities computed")
+    _write(engine, rows, neighbors, scores)
+    step("movie_similarities replaced")
+    return len(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=settings.SIMILARITY_TOP_K, help="neighbours kept per movie")
+    parser.add_argument("--block-size", type=int, default=1024,
+                        help="movies per vectorized block (memory: block × movies × 12 bytes)")
+    parser.add_argument("--min-score", type=float, default=0.0, help="drop neighbours at or below this cosine")
+    args = parser.parse_args()
+    compute_similarities(app_engine, args.top_k, args.block_size, args.min_score)
+
+
+if __name__ == "__main__":
+    main()
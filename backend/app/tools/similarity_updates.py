@@ -0,0 +1,466 @@
+"""
+Keep the movie similarities up to date from the review events
+
+create_review, update_review, delete_review and the bulk import record every
+rating change in the review_events outbox, in the transaction of the write.
+This consumer applies them in batches, so the recommendations follow the
+reviews within seconds instead of waiting for a full recomputation:
+
+1. it takes the oldest events and every pending event of their authors,
+   rebuilds each author's ratings before and after those events, and adds
+   the difference to the dot products (movie_cooccurrences) and the norms
+   (movie_norms) of the movies involved only;
+2. it merges the new scores of those movies into the head of each ranking
+   (movie_neighbors: the top K and up to SIMILARITY_RESERVE movies after
+   them, above the best movie outside the head, kept as the list's cutoff),
+   publishes the changes of the top K to movie_similarities, and recomputes
+   only the lists of the re-rated movies and those whose head no longer holds
+   K movies above the cutoff.
+
+The events are deleted in the transaction that applies them, so each one is
+applied exactly once whatever crashes; on PostgreSQL the transaction reads
+one snapshot (REPEATABLE READ) and an advisory lock keeps a single consumer
+running. The weights are the integers of app.tools.similarities: the sums
+are exact and the lists match a full recomputation.
+
+Writes that bypass the CRUD functions (app.tools.generate) record no events:
+run --rebuild afterwards, which recomputes the statistics from the reviews.
+The consumer does it by itself when it starts on reviews without statistics
+(fresh database, first start after the upgrade).
+
+Usage (from backend/):
+    python -m app.tools.similarity_updates --rebuild
+    python -m app.tools.similarity_updates            # consume events until stopped
+"""
+import argparse
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, or_, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.upsert import insert as upsert
+from app.db.session import engine as app_engine
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.review_event import ReviewEvent
+from app.models.similarity import MovieCooccurrence, MovieNeighbor, MovieNorm, MovieSimilarity
+from app.tools.similarities import rating_weight
+
+CHUNK_SIZE = 1000
+LOCK_ID = 0x63696E65  # "cine"
+# Marge du filtre SQL des films entrants, classés ensuite exactement
+SCORE_TOLERANCE = 1e-6
+
+Pair = Tuple[int, int]
+
+
+def _chunks(values: Iterable, size: int = CHUNK_SIZE) -> Iterable[list]:
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _begin(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        # Reviews et événements lus dans un même instantané
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+@contextmanager
+def consumer_lock(engine: Engine, log=print):
+    """Hold the consumer's advisory lock (PostgreSQL) for the duration of the block"""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as connection:
+        if not connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": LOCK_ID}).scalar():
+            log("Another consumer holds the lock, waiting")
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": LOCK_ID})
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": LOCK_ID})
+            connection.commit()
+
+
+def _weights(db: Session, users: Iterable[int]) -> Dict[int, Dict[int, int]]:
+    """Current weight of each movie rated by each user (duplicate reviews add up)"""
+    weights = defaultdict(lambda: defaultdict(int))
+    for chunk in _chunks(users):
+        rows = db.execute(
+            select(Review.user_id, Review.movie_id, Review.rating)
+            .where(Review.user_id.in_(chunk), Review.movie_id.is_not(None), Review.rating.is_not(None))
+        )
+        for user_id, movie_id, rating in rows:
+            weights[user_id][movie_id] += rating_weight(rating)
+    return weights
+
+
+def _weight(rating) -> int:
+    return 0 if rating is None else rating_weight(rating)
+
+
+def statistics_delta(events: List, weights: Dict[int, Dict[int, int]]) -> Tuple[Dict[int, int], Dict[Pair, list]]:
+    """
+    Changes of the squared norms and of the [count, dot] of the pairs (movie < other)
+    due to `events` (ordered by id), given the authors' weights after them
+    """
+    norms = defaultdict(int)
+    pairs = defaultdict(lambda: [0, 0])
+    for user_id, user_events in groupby(sorted(events, key=lambda event: (event.user_id, event.id)),
+                                        key=lambda event: event.user_id):
+        after = {movie: weight for movie, weight in weights.get(user_id, {}).items() if weight}
+        before = dict(after)
+        for event in reversed(list(user_events)):
+            before[event.movie_id] = before.get(event.movie_id, 0) + _weight(event.old_rating) - \
+                _weight(event.new_rating)
+        before = {movie: weight for movie, weight in before.items() if weight}
+        rated = set(before) | set(after)
+        changed = {movie for movie in rated if before.get(movie, 0) != after.get(movie, 0)}
+        for movie in changed:
+            old, new = before.get(movie, 0), after.get(movie, 0)
+            norms[movie] += new * new - old * old
+            for other in rated:
+                # Paires de deux films modifiés : comptées une seule fois
+                if other == movie or (other in changed and other < movie):
+                    continue
+                other_old, other_new = before.get(other, 0), after.get(other, 0)
+                pair = pairs[(movie, other) if movie < other else (other, movie)]
+                pair[0] += bool(new and other_new) - bool(old and other_old)
+                pair[1] += new * other_new - old * other_old
+    return norms, pairs
+
+
+def _apply_norms(db: Session, norms: Dict[int, int]):
+    for chunk in _chunks(norms):
+        statement = upsert(db, MovieNorm).values(
+            [{"movie_id": movie_id, "norm_sq": norms[movie_id], "norm": 0.0} for movie_id in chunk]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["movie_id"], set_={"norm_sq": MovieNorm.norm_sq + statement.excluded.norm_sq}
+        ).returning(MovieNorm.movie_id, MovieNorm.norm_sq)
+        _set_norms(db, db.execute(statement).all())
+
+
+def _set_norms(db: Session, rows: Iterable[Tuple[int, int]]):
+    table = MovieNorm.__table__
+    values = [{"b_id": movie_id, "b_norm": math.sqrt(max(norm_sq, 0))} for movie_id, norm_sq in rows]
+    if values:
+        db.execute(update(table).where(table.c.movie_id == bindparam("b_id")).values(norm=bindparam("b_norm")),
+                   values)
+
+
+def _apply_pairs(db: Session, pairs: Dict[Pair, list]):
+    rows = []
+    for (movie, other), (count, dot) in sorted(pairs.items()):
+        if count or dot:
+            rows.append({"movie_id": movie, "other_id": other, "count": count, "dot": dot})
+            rows.append({"movie_id": other, "other_id": movie, "count": count, "dot": dot})
+    if not rows:
+        return
+    table = MovieCooccurrence.__table__
+    statement = upsert(db, table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["movie_id", "other_id"],
+        set_={"count": table.c.count + statement.excluded["count"], "dot": table.c.dot + statement.excluded.dot},
+    ).returning(table.c.movie_id, table.c.other_id, table.c.count)
+    # executemany : une seule compilation, envoyé par paquets de lignes (insertmanyvalues)
+    emptied = [{"b_movie": movie, "b_other": other} for movie, other, count in db.execute(statement, rows)
+               if count <= 0]
+    if emptied:
+        db.execute(delete(table).where(table.c.movie_id == bindparam("b_movie"),
+                                       table.c.other_id == bindparam("b_other")), emptied)
+
+
+def _score(pair, norm, other_norm):
+    return pair.dot / (norm.norm * other_norm.norm)
+
+
+def refresh_lists(db: Session, touched: Set[int], top_k: int, min_score: float = 0.0,
+                  reserve: int = settings.SIMILARITY_RESERVE) -> int:
+    """
+    Bring the rankings up to date after the statistics of `touched` changed,
+    returns the number of lists recomputed. The movie_neighbors rows of a list
+    are the exact head of its ranking, all above its cutoff (the best movie
+    outside them, or an upper bound of it): the changed scores are merged into
+    the head, which loses the movies falling to or below the cutoff and gains
+    the movies rising above it. A list is recomputed only when fewer than
+    `top_k` movies remain above its cutoff; those of `touched`, whose scores
+    all changed, always are.
+    """
+    pair, norm, other_norm = MovieCooccurrence, MovieNorm.__table__.alias("norm"), MovieNorm.__table__.alias("other")
+    head = MovieNeighbor.__table__
+    score = _score(pair, norm.c, other_norm.c)
+    in_head = and_(head.c.movie_id == pair.other_id, head.c.neighbor_id == pair.movie_id)
+
+    # Nouveaux scores des films touchés dans chaque tête (None : paire disparue) et hors des têtes
+    changes = defaultdict(dict)
+    for chunk in _chunks(touched):
+        rows = db.execute(
+            select(head.c.movie_id, head.c.neighbor_id, score)
+            .outerjoin(pair, and_(pair.movie_id == head.c.neighbor_id, pair.other_id == head.c.movie_id))
+            .outerjoin(norm, norm.c.movie_id == pair.movie_id)
+            .outerjoin(other_norm, other_norm.c.movie_id == pair.other_id)
+            .where(head.c.neighbor_id.in_(chunk))
+        )
+        for movie, neighbor, value in rows:
+            changes[movie][neighbor] = value
+        rows = db.execute(
+            select(pair.other_id, pair.movie_id, score)
+            .join(norm, norm.c.movie_id == pair.movie_id)
+            .join(other_norm, other_norm.c.movie_id == pair.other_id)
+            .outerjoin(head, in_head)
+            .where(pair.movie_id.in_(chunk), head.c.movie_id.is_(None), score > min_score,
+                   score > func.coalesce(other_norm.c.cutoff, min_score) - SCORE_TOLERANCE)
+        )
+        for movie, neighbor, value in rows:
+            changes[movie][neighbor] = value
+
+    lists = set(changes) - touched
+    heads = defaultdict(dict)
+    cutoffs = {}
+    for chunk in _chunks(lists):
+        for movie, neighbor, value in db.execute(
+                select(head.c.movie_id, head.c.neighbor_id, head.c.score).where(head.c.movie_id.in_(chunk))):
+            heads[movie][neighbor] = value
+        cutoffs.update((movie, (cutoff, cutoff_id)) for movie, cutoff, cutoff_id in db.execute(
+            select(MovieNorm.movie_id, MovieNorm.cutoff, MovieNorm.cutoff_id).where(MovieNorm.movie_id.in_(chunk))))
+
+    stale = set(touched)
+    neighbors, published, new_cutoffs = _Changes(), _Changes(), []
+    for movie in lists:
+        cutoff, cutoff_id = cutoffs.get(movie, (None, None))
+        if cutoff is None:
+            stale.add(movie)
+            continue
+        # Sous le seuil, un film rejoint les inconnus dont le seuil reste un majorant
+        bound = _rank_key(cutoff, cutoff_id)
+        merged = {**heads[movie], **changes[movie]}
+        ranking = sorted(((value, neighbor) for neighbor, value in merged.items()
+                          if value is not None and value > min_score and _rank_key(value, neighbor) > bound),
+                         key=lambda item: _rank_key(*item), reverse=True)
+        if len(ranking) > top_k + reserve:
+            cutoff, cutoff_id = ranking[top_k + reserve]
+            ranking = ranking[:top_k + reserve]
+        # Films manquants dans le top K parmi les inconnus, sauf s'il n'y en a aucun au-dessus du score minimal
+        if len(ranking) < top_k and cutoff_id is not None:
+            stale.add(movie)
+            continue
+        old = sorted(((value, neighbor) for neighbor, value in heads[movie].items()),
+                     key=lambda item: _rank_key(*item), reverse=True)
+        neighbors.diff(movie, old, ranking)
+        published.diff(movie, old[:top_k], ranking[:top_k])
+        if (cutoff, cutoff_id) != cutoffs[movie]:
+            new_cutoffs.append({"b_movie": movie, "b_cutoff": cutoff, "b_cutoff_id": cutoff_id})
+
+    neighbors.apply(db, head)
+    published.apply(db, MovieSimilarity.__table__)
+    _set_cutoffs(db, new_cutoffs)
+    recompute_lists(db, stale, top_k, min_score, reserve)
+    return len(stale)
+
+
+class _Changes:
+    """Rows to delete, insert and update in a (movie_id, neighbor_id, score) table"""
+
+    def __init__(self):
+        self.deleted, self.inserted, self.updated = [], [], []
+
+    def diff(self, movie: int, old: List[Tuple[float, int]], new: List[Tuple[float, int]]):
+        before = {neighbor: value for value, neighbor in old}
+        after = {neighbor: value for value, neighbor in new}
+        for neighbor, value in after.items():
+            row = {"b_movie": movie, "b_neighbor": neighbor, "b_score": value}
+            if neighbor not in before:
+                self.inserted.append(row)
+            elif before[neighbor] != value:
+                self.updated.append(row)
+        self.deleted.extend({"b_movie": movie, "b_neighbor": neighbor} for neighbor in before.keys() - after.keys())
+
+    def apply(self, db: Session, table):
+        key = and_(table.c.movie_id == bindparam("b_movie"), table.c.neighbor_id == bindparam("b_neighbor"))
+        if self.deleted:
+            db.execute(delete(table).where(key), self.deleted)
+        if self.inserted:
+            db.execute(insert(table), [{"movie_id": row["b_movie"], "neighbor_id": row["b_neighbor"],
+                                        "score": row["b_score"]} for row in self.inserted])
+        if self.updated:
+            db.execute(update(table).where(key).values(score=bindparam("b_score")), self.updated)
+
+
+def _rank_key(value: float, neighbor):
+    """Comparable like the ranking of the lists: higher score first, then lower id (None: after all ids)"""
+    return value, -math.inf if neighbor is None else -neighbor
+
+
+def _set_cutoffs(db: Session, values: List[dict]):
+    if values:
+        table = MovieNorm.__table__
+        db.execute(update(table).where(table.c.movie_id == bindparam("b_movie"))
+                   .values(cutoff=bindparam("b_cutoff"), cutoff_id=bindparam("b_cutoff_id")), values)
+
+
+def recompute_lists(db: Session, movies: Iterable[int], top_k: int, min_score: float = 0.0,
+                    reserve: int = settings.SIMILARITY_RESERVE):
+    """Replace the heads and top-K lists of `movies` from the co-occurrences, and their cutoffs"""
+    pair, norm, other_norm = MovieCooccurrence, MovieNorm.__table__.alias("norm"), MovieNorm.__table__.alias("other")
+    score = _score(pair, norm.c, other_norm.c)
+    rank = func.row_number().over(partition_by=pair.movie_id, order_by=(score.desc(), pair.other_id))
+    length = top_k + reserve
+    for chunk in _chunks(movies):
+        db.execute(delete(MovieSimilarity).where(MovieSimilarity.movie_id.in_(chunk)))
+        db.execute(delete(MovieNeighbor).where(MovieNeighbor.movie_id.in_(chunk)))
+        ranked = select(pair.movie_id, pair.other_id, score.label("score"), rank.label("rank"))\
+            .join(norm, norm.c.movie_id == pair.movie_id)\
+            .join(other_norm, other_norm.c.movie_id == pair.other_id)\
+            .where(pair.movie_id.in_(chunk), score > min_score)\
+            .subquery()
+        # Le voisin qui suit la tête est le seuil d'entrée dans la tête
+        cutoffs = {movie: (min_score, None) for movie in chunk}
+        neighbors, published = [], []
+        for movie, neighbor, value, position in db.execute(select(ranked).where(ranked.c.rank <= length + 1)):
+            if position > length:
+                cutoffs[movie] = (value, neighbor)
+                continue
+            neighbors.append({"movie_id": movie, "neighbor_id": neighbor, "score": value})
+            if position <= top_k:
+                published.append(neighbors[-1])
+        if neighbors:
+            db.execute(insert(MovieNeighbor), neighbors)
+            db.execute(insert(MovieSimilarity), published)
+        _set_cutoffs(db, [{"b_movie": movie, "b_cutoff": cutoff, "b_cutoff_id": neighbor}
+                          for movie, (cutoff, neighbor) in cutoffs.items()])
+
+
+def apply_events(engine: Engine, batch_size: int = settings.SIMILARITY_EVENTS_BATCH_SIZE,
+                 top_k: int = settings.SIMILARITY_TOP_K, min_score: float = 0.0,
+                 reserve: int = settings.SIMILARITY_RESERVE) -> Tuple[int, int]:
+    """Apply and delete one batch of events; returns (events applied, lists recomputed)"""
+    with Session(engine) as db:
+        _begin(db)
+        oldest = select(ReviewEvent.user_id).order_by(ReviewEvent.id).limit(batch_size).subquery()
+        events = db.execute(
+            select(ReviewEvent.id, ReviewEvent.user_id, ReviewEvent.movie_id, ReviewEvent.old_rating,
+                   ReviewEvent.new_rating)
+            .where(ReviewEvent.user_id.in_(select(oldest.c.user_id)))
+            .order_by(ReviewEvent.id)
+        ).all()
+        if not events:
+            return 0, 0
+        norms, pairs = statistics_delta(events, _weights(db, {event.user_id for event in events}))
+
+        # Films supprimés depuis l'événement : leurs statistiques sont parties avec eux
+        movies = set(norms) | {movie for pair in pairs for movie in pair}
+        existing = set()
+        for chunk in _chunks(movies):
+            existing.update(db.scalars(select(Movie.id).where(Movie.id.in_(chunk))))
+        _apply_norms(db, {movie: delta for movie, delta in norms.items() if movie in existing})
+        _apply_pairs(db, {pair: delta for pair, delta in pairs.items() if existing.issuperset(pair)})
+
+        recomputed = refresh_lists(db, set(norms) & existing, top_k, min_score, reserve)
+        for chunk in _chunks(event.id for event in events):
+            db.execute(delete(ReviewEvent).where(ReviewEvent.id.in_(chunk)))
+        db.commit()
+        return len(events), recomputed
+
+
+def rebuild(engine: Engine, top_k: int = settings.SIMILARITY_TOP_K, min_score: float = 0.0,
+            reserve: int = settings.SIMILARITY_RESERVE) -> int:
+    """
+    Recompute the statistics and every top-K list from the reviews and drop
+    the events they already include; returns the number of pairs
+    """
+    weight = func.sum(rating_weight(Review.rating))
+    weights = select(Review.user_id, Review.movie_id, weight.label("weight"))\
+        .where(Review.user_id.is_not(None), Review.movie_id.is_not(None))\
+        .group_by(Review.user_id, Review.movie_id)\
+        .having(weight != 0)\
+        .cte("weights")
+    movie, other = weights.alias("movie"), weights.alias("other")
+    with Session(engine) as db:
+        _begin(db)
+        # Les événements visibles sont déjà dans les reviews lues ; les suivants seront appliqués
+        db.execute(delete(ReviewEvent))
+        db.execute(delete(MovieCooccurrence))
+        db.execute(delete(MovieNorm))
+        db.execute(insert(MovieNorm).from_select(
+            ["movie_id", "norm_sq", "norm"],
+            select(weights.c.movie_id, func.sum(weights.c.weight * weights.c.weight), literal(0.0))
+            .group_by(weights.c.movie_id),
+        ))
+        _set_norms(db, db.execute(select(MovieNorm.movie_id, MovieNorm.norm_sq)).all())
+        db.execute(insert(MovieCooccurrence).from_select(
+            ["movie_id", "other_id", "count", "dot"],
+            select(movie.c.movie_id, other.c.movie_id, func.count(), func.sum(movie.c.weight * other.c.weight))
+            .join(other, and_(other.c.user_id == movie.c.user_id, other.c.movie_id != movie.c.movie_id))
+            .group_by(movie.c.movie_id, other.c.movie_id),
+        ))
+        pairs = db.scalar(select(func.count()).select_from(MovieCooccurrence))
+        db.execute(delete(MovieSimilarity))
+        db.execute(delete(MovieNeighbor))
+        recompute_lists(db, db.scalars(select(MovieNorm.movie_id)).all(), top_k, min_score, reserve)
+        db.commit()
+        return pairs
+
+
+def needs_rebuild(engine: Engine) -> bool:
+    """True when there are rated reviews but no statistics (fresh or seeded database, first upgrade)"""
+    with Session(engine) as db:
+        if db.scalar(select(MovieNorm.movie_id).limit(1)) is not None:
+            return False
+        return db.scalar(select(Review.id).where(Review.rating.is_not(None)).limit(1)) is not None
+
+
+def run(engine: Engine, batch_size: int, top_k: int, min_score: float, reserve: int, interval: float, log=print):
+    """Apply the events as they arrive, until interrupted"""
+    with consumer_lock(engine, log):
+        # Reviews sans événements (données d'exemple, app.tools.generate, tables créées après coup)
+        if needs_rebuild(engine):
+            started = time.perf_counter()
+            pairs = rebuild(engine, top_k, min_score, reserve)
+            log(f"No similarity statistics: rebuilt from the reviews ({pairs} movie pairs) "
+                f"in {time.perf_counter() - started:.2f}s")
+        while True:
+            started = time.perf_counter()
+            applied, recomputed = apply_events(engine, batch_size, top_k, min_score, reserve)
+            if applied:
+                log(f"{applied} events applied, {recomputed} lists recomputed "
+                    f"in {time.perf_counter() - started:.2f}s")
+            if applied < batch_size:
+                time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="recompute everything from the reviews, then exit")
+    parser.add_argument("--once", action="store_true", help="apply the pending events, then exit")
+    parser.add_argument("--batch-size", type=int, default=settings.SIMILARITY_EVENTS_BATCH_SIZE)
+    parser.add_argument("--top-k", type=int, default=settings.SIMILARITY_TOP_K, help="neighbours kept per movie")
+    parser.add_argument("--min-score", type=float, default=0.0, help="drop neighbours at or below this cosine")
+    parser.add_argument("--reserve", type=int, default=settings.SIMILARITY_RESERVE,
+                        help="neighbours ranked after the top K kept to replace those falling out of it")
+    parser.add_argument("--interval", type=float, default=settings.SIMILARITY_UPDATE_INTERVAL_SECONDS,
+                        help="seconds to wait once every event is applied")
+    args = parser.parse_args()
+    if args.rebuild:
+        with consumer_lock(app_engine):
+            pairs = rebuild(app_engine, args.top_k, args.min_score, args.reserve)
+        print(f"{pairs} movie pairs")
+    elif args.once:
+        with consumer_lock(app_engine):
+            while apply_events(app_engine, args.batch_size, args.top_k, args.min_score, args.reserve)[0]:
+                pass
+    else:
+        run(app_engine, args.batch_size, args.top_k, args.min_score, args.reserve, args.interval)
+
+
+if __name__ == "__main__":
+    main()
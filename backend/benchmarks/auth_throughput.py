@@ -0,0 +1,70 @@
+"""
+Authenticated-endpoint throughput, with and without the principal/token caches
+
+Logs in once, then hammers GET /auth/me with concurrent clients.
+
+Usage (from backend/):
+    python -m benchmarks.auth_throughput --clients 50 --requests 40
+"""
+import argparse
+import asyncio
+
+from app.core import security
+from app.core.cache import TTLCache, cache_hit_ratio
+from app.core.principals import principal_cache
+from app.main import app
+from app.models.user import User
+from benchmarks.common import (
+    add_query_delay,
+    asgi_client,
+    create_bench_engine,
+    run_clients,
+    summarize,
+    use_engine,
+)
+
+
+async def run(args) -> dict:
+    async with asgi_client(app) as client:
+        response = await client.post("/api/v1/auth/login", data={"username": "bench", "password": "benchpassword"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        async def send(client_id: int, n: int):
+            return await client.get("/api/v1/auth/me", headers=headers)
+
+        latencies, elapsed = await run_clients(args.clients, args.requests, send)
+    return summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--query-delay-ms", type=float, default=1.0,
+                        help="simulated database latency per statement")
+    args = parser.parse_args()
+
+    engine = create_bench_engine()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), {
+            "username": "bench", "email": "bench@example.com", "is_active": True, "is_admin": False,
+            "hashed_password": security.get_password_hash("benchpassword"),
+        })
+    add_query_delay(engine, args.query_delay_ms / 1000)
+    use_engine(engine)
+
+    cached_backend, cached_tokens = principal_cache.backend, security._verified_tokens
+    principal_cache.backend = TTLCache(0, 0, name="principal-disabled")
+    security._verified_tokens = TTLCache(0, 0, name="token-disabled")
+    uncached = asyncio.run(run(args))
+
+    principal_cache.backend, security._verified_tokens = cached_backend, cached_tokens
+    cached = asyncio.run(run(args))
+
+    for label, r in (("no cache", uncached), ("cached", cached)):
+        print(f"{label:>9}  rps={r['rps']:>8}  p50={r['p50_ms']:>7}ms  p99={r['p99_ms']:>7}ms")
+    print(f"principal hit ratio={cache_hit_ratio('principal'):.3f}  token hit ratio={cache_hit_ratio('token'):.3f}")
+
+
+if __name__ == "__main__":
+    main()
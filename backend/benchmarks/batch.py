@@ -0,0 +1,102 @@
+"""
+Batch reads vs one request per item
+
+Times what a grid of N movie cards costs: N calls to GET /movies/{id} vs one
+GET /movies?ids=..., and N calls to GET /watchlist/{user}/{movie} vs one
+POST /watchlist/{user}/contains. Reports wall-clock time and SQL statements.
+Result caches are cleared before each run so every variant hits the database.
+
+Usage (from backend/):
+    python -m benchmarks.batch --sizes 10,50,100 --query-delay-ms 1
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from app.core import http_cache, security
+from app.core.result_cache import result_cache
+from app.main import app
+from app.models.user import User
+from app.models.watchlist import Watchlist
+from benchmarks.common import add_query_delay, asgi_client, create_bench_engine, seed_movies, use_engine
+
+API = "/api/v1"
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, *args):
+        self.count += 1
+
+
+async def timed(counter: StatementCounter, requests) -> dict:
+    result_cache.clear()
+    http_cache.clear()
+    before = counter.count
+    started = time.perf_counter()
+    for response in await requests():
+        response.raise_for_status()
+    return {"ms": round((time.perf_counter() - started) * 1000, 2), "queries": counter.count - before}
+
+
+async def run(args, counter: StatementCounter) -> list:
+    results = []
+    async with asgi_client(app) as client:
+        response = await client.post(f"{API}/auth/login", data={"username": "bench", "password": "benchpassword"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for size in args.sizes:
+            ids = list(range(1, size + 1))
+
+            async def movies_one_by_one():
+                return [await client.get(f"{API}/movies/{movie_id}") for movie_id in ids]
+
+            async def movies_batch():
+                return [await client.get(f"{API}/movies", params={"ids": ",".join(map(str, ids))})]
+
+            async def watchlist_one_by_one():
+                return [await client.get(f"{API}/watchlist/1/{movie_id}") for movie_id in ids]
+
+            async def watchlist_batch():
+                return [await client.post(f"{API}/watchlist/1/contains", headers=headers, json={"movie_ids": ids})]
+
+            for label, requests in (("movies per item", movies_one_by_one), ("movies ?ids=", movies_batch),
+                                    ("watchlist per item", watchlist_one_by_one),
+                                    ("watchlist /contains", watchlist_batch)):
+                results.append({"size": size, "variant": label, **await timed(counter, requests)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,50,100", help="comma-separated numbers of movies per grid")
+    parser.add_argument("--query-delay-ms", type=float, default=1.0,
+                        help="simulated database latency per statement")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+
+    engine = create_bench_engine()
+    seed_movies(engine, max(args.sizes))
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), {
+            "username": "bench", "email": "bench@example.com", "is_active": True, "is_admin": False,
+            "hashed_password": security.get_password_hash("benchpassword"),
+        })
+        # Un film sur trois dans la watchlist
+        conn.execute(Watchlist.__table__.insert(), [
+            {"user_id": 1, "movie_id": movie_id} for movie_id in range(1, max(args.sizes) + 1, 3)
+        ])
+    add_query_delay(engine, args.query_delay_ms / 1000)
+    use_engine(engine)
+    counter = StatementCounter(engine)
+
+    for r in asyncio.run(run(args, counter)):
+        print(f"size={r['size']:>4}  {r['variant']:<20} {r['ms']:>9}ms  queries={r['queries']:>4}")
+
+
+if __name__ == "__main__":
+    main()
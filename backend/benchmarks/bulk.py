@@ -0,0 +1,104 @@
+"""
+Bulk import vs one request per item
+
+Times importing N reviews with N calls to POST /reviews and with one
+POST /reviews/bulk (NDJSON), and N movies with POST /movies vs POST /movies/bulk.
+Reports wall-clock time, items per second and SQL statements.
+
+Usage (from backend/):
+    python -m benchmarks.bulk --sizes 100,1000,10000 --batch-size 1000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from sqlalchemy import event
+
+from app.core import security
+from app.main import app
+from app.models.user import User
+from benchmarks.common import asgi_client, create_bench_engine, seed_movies, use_engine
+
+API = "/api/v1"
+MOVIES = 1000
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, *args):
+        self.count += 1
+
+
+async def timed(counter: StatementCounter, size: int, requests) -> dict:
+    before = counter.count
+    started = time.perf_counter()
+    await requests()
+    elapsed = time.perf_counter() - started
+    return {"ms": round(elapsed * 1000, 2), "per_s": round(size / elapsed), "queries": counter.count - before}
+
+
+async def run(args, counter: StatementCounter) -> list:
+    results = []
+    rng = random.Random(42)
+    async with asgi_client(app) as client:
+        tokens = {}
+        for username in ("admin", "bench"):
+            response = await client.post(f"{API}/auth/login", data={"username": username, "password": "benchpassword"})
+            tokens[username] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for size in args.sizes:
+            movies = [{"title": f"Imported {n}", "release_year": 1950 + n % 70} for n in range(size)]
+            reviews = [{"user_id": 2, "movie_id": rng.randint(1, MOVIES), "rating": rng.randint(1, 5),
+                        "comment": "Avis importé"} for _ in range(size)]
+
+            async def post_each(url, items, headers):
+                for item in items:
+                    (await client.post(url, json=item, headers=headers)).raise_for_status()
+
+            async def post_bulk(url, items):
+                body = "".join(json.dumps(item) + "\n" for item in items)
+                response = await client.post(url, content=body, params={"batch_size": args.batch_size},
+                                             headers={**tokens["admin"], "Content-Type": "application/x-ndjson"})
+                assert response.json()["created"] == len(items), response.json()
+
+            variants = [("reviews bulk", lambda: post_bulk(f"{API}/reviews/bulk", reviews)),
+                        ("movies bulk", lambda: post_bulk(f"{API}/movies/bulk", movies))]
+            if size <= args.max_per_item:
+                variants = [("reviews per item", lambda: post_each(f"{API}/reviews", reviews, tokens["bench"])),
+                            variants[0],
+                            ("movies per item", lambda: post_each(f"{API}/movies", movies, tokens["admin"])),
+                            variants[1]]
+            for label, requests in variants:
+                results.append({"size": size, "variant": label, **await timed(counter, size, requests)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma-separated numbers of items per import")
+    parser.add_argument("--batch-size", type=int, default=1000, help="items per transaction of the bulk endpoints")
+    parser.add_argument("--max-per-item", type=int, default=1000,
+                        help="largest size also imported one request per item (slow)")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+
+    engine = create_bench_engine()
+    seed_movies(engine, MOVIES)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{
+            "username": username, "email": f"{username}@example.com", "is_active": True, "is_admin": is_admin,
+            "hashed_password": security.get_password_hash("benchpassword"),
+        } for username, is_admin in (("admin", True), ("bench", False))])
+    use_engine(engine)
+    counter = StatementCounter(engine)
+
+    for r in asyncio.run(run(args, counter)):
+        print(f"size={r['size']:>6}  {r['variant']:<18} {r['ms']:>10}ms  {r['per_s']:>8}/s  queries={r['queries']:>6}")
+
+
+if __name__ == "__main__":
+    main()
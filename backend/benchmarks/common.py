@@ -0,0 +1,111 @@
+"""
+Shared helpers for the CineVerse benchmarks
+
+Benchmarks drive the in-process ASGI app through httpx against a throwaway
+SQLite database, so they need neither network access nor a running Postgres.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from sqlalchemy import create_engine, event, insert
+
+from app.db.base import Base
+from app.db.session import SessionLocal
+from app.models.movie import Movie
+
+
+def create_bench_engine(url: Optional[str] = None):
+    """Create an engine on `url`, or on a fresh temporary SQLite file"""
+    if url is None:
+        fd, path = tempfile.mkstemp(prefix="cineverse-bench-", suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{path}"
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def add_query_delay(engine, delay: float):
+    """Sleep `delay` seconds before each statement to mimic a remote database"""
+    if delay <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(delay)
+
+
+def use_engine(engine):
+    """Point the app's session factory (and so `get_db`) at `engine`"""
+    SessionLocal.configure(bind=engine)
+
+
+def seed_movies(engine, count: int, batch_size: int = 10_000):
+    """Insert `count` synthetic movies"""
+    with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            rows = [
+                {
+                    "title": f"Movie {i}",
+                    "description": f"Synthetic movie number {i}",
+                    "release_year": 1950 + i % 75,
+                }
+                for i in range(start, min(start + batch_size, count))
+            ]
+            conn.execute(insert(Movie), rows)
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of `samples`"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: list, elapsed: float) -> dict:
+    """Summarize latencies (seconds) as RPS and millisecond percentiles"""
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    """httpx client talking to `app` in-process"""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def run_clients(
+    clients: int,
+    requests_per_client: int,
+    send: Callable[[int, int], Awaitable[httpx.Response]],
+):
+    """
+    Run `clients` concurrent loops of `requests_per_client` calls to `send`
+
+    Returns:
+        (latencies in seconds, wall-clock duration in seconds)
+    """
+    latencies = []
+
+    async def client_loop(client_id: int):
+        for n in range(requests_per_client):
+            started = time.perf_counter()
+            response = await send(client_id, n)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{response.request.url} returned {response.status_code}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(i) for i in range(clients)))
+    return latencies, time.perf_counter() - started
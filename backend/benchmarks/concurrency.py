@@ -0,0 +1,68 @@
+"""
+Concurrency benchmark for the sync database handlers
+
+Fires concurrent clients at the catalogue endpoints and reports latency
+percentiles for each worker thread pool size. A pool of 1 thread reproduces
+the old behaviour, where handlers blocked the event loop and requests were
+served one query at a time.
+
+Usage (from backend/):
+    python -m benchmarks.concurrency --clients 200 --threads 1,40
+"""
+import argparse
+import asyncio
+import json
+
+from anyio import to_thread
+
+from app.main import app
+from benchmarks.common import (
+    add_query_delay,
+    asgi_client,
+    create_bench_engine,
+    run_clients,
+    seed_movies,
+    summarize,
+    use_engine,
+)
+
+
+async def run(threads: int, args) -> dict:
+    to_thread.current_default_thread_limiter().total_tokens = threads
+    async with asgi_client(app) as client:
+        async def send(client_id: int, n: int):
+            if n % 2:
+                return await client.get("/api/v1/movies", params={"skip": client_id, "limit": 20})
+            return await client.get(f"/api/v1/movies/{(client_id * 7 + n) % args.movies + 1}")
+
+        latencies, elapsed = await run_clients(args.clients, args.requests, send)
+    return {"threads": threads, **summarize(latencies, elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--query-delay-ms", type=float, default=5.0,
+                        help="simulated database latency per statement")
+    parser.add_argument("--threads", default="1,40", help="comma-separated thread pool sizes")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    engine = create_bench_engine()
+    seed_movies(engine, args.movies)
+    add_query_delay(engine, args.query_delay_ms / 1000)
+    use_engine(engine)
+
+    results = [asyncio.run(run(int(t), args)) for t in args.threads.split(",")]
+    for r in results:
+        print(f"threads={r['threads']:>4}  rps={r['rps']:>8}  p50={r['p50_ms']:>8}ms  "
+              f"p95={r['p95_ms']:>8}ms  p99={r['p99_ms']:>8}ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Memory and throughput of the streaming exports on a large table
+
+Seeds a table with app.tools.generate (10M rows by default, a few minutes on
+SQLite), then streams it through app.core.export exactly as GET /export/...
+does, discarding the output. Prints throughput and the process's resident
+memory every --report rows: it stays flat whatever the number of rows.
+
+Usage (from backend/):
+    python -m benchmarks.export --rows 10M
+    python -m benchmarks.export --rows 10M --table reviews --format csv --gzip
+    python -m benchmarks.export --database-url postgresql://... --rows 10M
+"""
+import argparse
+import resource
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core import export
+from app.tools.generate import generate, parse_count
+from benchmarks.common import create_bench_engine
+
+
+def rss_mb() -> float:
+    """Current resident memory of the process (Linux), in MB"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=parse_count, default=10_000_000)
+    parser.add_argument("--table", choices=sorted(export.EXPORTS), default="movies")
+    parser.add_argument("--format", choices=sorted(export.MEDIA_TYPES), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--report", type=parse_count, default=1_000_000, help="print progress every N rows")
+    parser.add_argument("--database-url", help="empty database to seed (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    if args.table == "movies":
+        generate(engine, movies=args.rows, users=1, reviews=0, password_pool=1)
+    else:
+        generate(engine, movies=10_000, users=10_000, reviews=args.rows, password_pool=1)
+
+    baseline = rss_mb()
+    print(f"exporting {args.rows} {args.table} as {args.format}{' (gzip)' if args.gzip else ''}, "
+          f"RSS before export {baseline:.1f} MB")
+    with Session(engine) as db:
+        # Les lignes sont comptées sur le flux non compressé, avant gzip
+        def counted(partitions):
+            nonlocal rows
+            for partition in partitions:
+                rows += len(partition)
+                yield partition
+
+        rows = 0
+        size = 0
+        next_report = args.report
+        started = time.perf_counter()
+        chunks = export.encode(counted(export.rows(db, args.table, chunk_size=args.chunk_size)),
+                               export.EXPORTS[args.table][1], args.format)
+        for chunk in export.gzipped(chunks) if args.gzip else chunks:
+            size += len(chunk)
+            if rows >= next_report:
+                elapsed = time.perf_counter() - started
+                print(f"{rows:>11} rows  {rows / elapsed:>9.0f} rows/s  {size / 2**20:>9.1f} MB out  "
+                      f"RSS {rss_mb():.1f} MB")
+                next_report += args.report
+        elapsed = time.perf_counter() - started
+    print(f"{rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s), {size / 2**20:.1f} MB, "
+          f"RSS {rss_mb():.1f} MB (+{rss_mb() - baseline:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Load test of the HTTP API with per-endpoint RPS and latency percentiles
+
+Three traffic mixes, each run by concurrent clients:
+  read   movie list, movie detail, reviews of a movie, watchlist check
+  auth   login, /auth/me
+  write  create review, watchlist add then remove
+
+Movies are picked with a Zipf distribution, like real traffic. By default the
+app runs in-process behind httpx's ASGI transport on a temporary SQLite
+database seeded by app.tools.generate; --uvicorn serves it from a local
+uvicorn process instead (real sockets and HTTP parsing, still no network).
+
+Results can be saved as a JSON baseline and compared with later runs: the
+command exits with status 1 when an endpoint's RPS drops, or its p95 grows,
+by more than --threshold.
+
+Usage (from backend/):
+    python -m benchmarks.load --save-baseline
+    python -m benchmarks.load --mix read,auth --threshold 0.15
+    python -m benchmarks.load --uvicorn --clients 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from app.main import app
+from app.tools.generate import ZipfSampler, generate
+from benchmarks.common import asgi_client, create_bench_engine, summarize, use_engine
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "load.json"
+API = "/api/v1"
+PASSWORD = "password0"  # generate() avec un seul mot de passe dans le pool
+MIXES = ("read", "auth", "write")
+
+
+class Traffic:
+    """Requests of each mix for one client; every call returns (endpoint name, response)"""
+
+    def __init__(self, client: httpx.AsyncClient, user: dict, movies: ZipfSampler, rng: random.Random):
+        self.client = client
+        self.user = user
+        self.movies = movies
+        self.rng = rng
+        self.headers = {"Authorization": f"Bearer {user['token']}"}
+        self.pending = None  # film ajouté à la watchlist, retiré à la requête suivante
+
+    def movie(self) -> int:
+        return self.movies.sample(1)[0]
+
+    async def read(self, n: int):
+        kind = n % 4
+        if kind == 0:
+            return "GET /movies", await self.client.get(f"{API}/movies", params={"limit": 20})
+        if kind == 1:
+            return "GET /movies/{id}", await self.client.get(f"{API}/movies/{self.movie()}")
+        if kind == 2:
+            return "GET /movies/{id}/reviews", await self.client.get(
+                f"{API}/movies/{self.movie()}/reviews", params={"limit": 20}
+            )
+        return "GET /watchlist/{user}/{movie}", await self.client.get(
+            f"{API}/watchlist/{self.user['id']}/{self.movie()}"
+        )
+
+    async def auth(self, n: int):
+        if n % 4 == 0:
+            return "POST /auth/login", await self.client.post(
+                f"{API}/auth/login", data={"username": self.user["username"], "password": PASSWORD}
+            )
+        return "GET /auth/me", await self.client.get(f"{API}/auth/me", headers=self.headers)
+
+    async def write(self, n: int):
+        kind = n % 3
+        if kind == 0:
+            return "POST /reviews", await self.client.post(f"{API}/reviews", headers=self.headers, json={
+                "user_id": self.user["id"], "movie_id": self.movie(),
+                "rating": self.rng.randint(1, 5), "comment": "Avis de test de charge",
+            })
+        if kind == 1:
+            self.pending = self.movie()
+            return "POST /watchlist", await self.client.post(f"{API}/watchlist", headers=self.headers, json={
+                "user_id": self.user["id"], "movie_id": self.pending,
+            })
+        return "DELETE /watchlist/{user}/{movie}", await self.client.delete(
+            f"{API}/watchlist/{self.user['id']}/{self.pending}", headers=self.headers
+        )
+
+
+async def login(client: httpx.AsyncClient, user_id: int) -> dict:
+    username = f"user{user_id}"
+    response = await client.post(f"{API}/auth/login", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"id": user_id, "username": username, "token": response.json()["access_token"]}
+
+
+async def run_mix(client: httpx.AsyncClient, mix: str, users: list, args) -> dict:
+    """Run `mix` with one client per user; returns the summary of each endpoint"""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async def client_loop(n_client: int, user: dict):
+        rng = random.Random(args.seed + n_client)
+        traffic = Traffic(client, user, ZipfSampler(1, args.movies, 1.1, random.Random(args.seed)), rng)
+        send = getattr(traffic, mix)
+        for n in range(args.requests):
+            started = time.perf_counter()
+            endpoint, response = await send(n)
+            latencies[endpoint].append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                errors[endpoint] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(n, user) for n, user in enumerate(users)))
+    elapsed = time.perf_counter() - started
+    results = {endpoint: {**summarize(samples, elapsed), "errors": errors[endpoint]}
+               for endpoint, samples in sorted(latencies.items())}
+    every = [latency for samples in latencies.values() for latency in samples]
+    results["total"] = {**summarize(every, elapsed), "errors": sum(errors.values())}
+    return results
+
+
+async def run(client: httpx.AsyncClient, args) -> dict:
+    users = [await login(client, 1 + n % args.users) for n in range(args.clients)]
+    return {mix: await run_mix(client, mix, users, args) for mix in args.mix}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of `results` against `baseline`, as readable messages"""
+    regressions = []
+    for mix, endpoints in results.items():
+        for endpoint, current in endpoints.items():
+            reference = baseline.get(mix, {}).get(endpoint)
+            if reference is None:
+                continue
+            if current["rps"] < reference["rps"] * (1 - threshold):
+                regressions.append(f"{mix} {endpoint}: rps {reference['rps']} -> {current['rps']}")
+            if current["p95_ms"] > reference["p95_ms"] * (1 + threshold):
+                regressions.append(f"{mix} {endpoint}: p95 {reference['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(database_url: str) -> tuple:
+    """Serve the app from a local uvicorn process on `database_url`; returns (process, base url)"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "DATABASE_URL": database_url},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/health").raise_for_status()
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default=",".join(MIXES), help="comma-separated mixes among read,auth,write")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=60, help="requests per client and mix")
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reviews", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--uvicorn", action="store_true", help="serve the app from a local uvicorn process")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="tolerated relative drop of RPS / growth of p95 before failing")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    args.mix = [mix for mix in args.mix.split(",") if mix]
+    if unknown := set(args.mix) - set(MIXES):
+        parser.error(f"unknown mix: {', '.join(sorted(unknown))}")
+
+    engine = create_bench_engine()
+    generate(engine, args.movies, args.users, args.reviews, watchlist=args.users * 5,
+             seed=args.seed, password_pool=1, log=lambda message: None)
+
+    async def run_in_process():
+        use_engine(engine)
+        async with asgi_client(app) as client:
+            return await run(client, args)
+
+    async def run_against(base_url):
+        limits = httpx.Limits(max_connections=args.clients)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            return await run(client, args)
+
+    if args.uvicorn:
+        process, base_url = start_uvicorn(str(engine.url))
+        try:
+            results = asyncio.run(run_against(base_url))
+        finally:
+            process.terminate()
+            process.wait()
+    else:
+        results = asyncio.run(run_in_process())
+
+    for mix, endpoints in results.items():
+        print(f"[{mix}]")
+        for endpoint, r in endpoints.items():
+            print(f"  {endpoint:<32} rps={r['rps']:>8}  p50={r['p50_ms']:>7}ms  p95={r['p95_ms']:>7}ms  "
+                  f"p99={r['p99_ms']:>7}ms  errors={r['errors']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    # Une baseline ne se compare qu'à une exécution de même configuration
+    config = {key: getattr(args, key) for key in ("clients", "requests", "movies", "users", "reviews", "seed", "uvicorn")}
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"config": config, "results": results}, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["config"] != config:
+            sys.exit(f"{args.baseline} was recorded with {baseline['config']}, not {config}")
+        regressions = compare(results, baseline["results"], args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regression beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Offset vs keyset pagination on a large reviews table
+
+Seeds N reviews, then times page 1 and page P of GET /reviews ordering
+(most recent first), once with skip/limit and once with a cursor.
+
+Usage (from backend/):
+    python -m benchmarks.pagination --reviews 5000000 --page 10000
+    python -m benchmarks.pagination --database-url postgresql://... --reviews 5000000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.crud.pagination import encode_cursor
+from app.crud.review import REVIEW_ORDER, get_reviews
+from app.models.review import Review
+from benchmarks.common import create_bench_engine
+
+
+def seed_reviews(engine, count: int, batch_size: int = 50_000):
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        for first in range(0, count, batch_size):
+            conn.execute(insert(Review), [
+                {
+                    "movie_id": 1 + i % 1000,
+                    "user_id": 1 + i % 10_000,
+                    "rating": 1 + i % 5,
+                    "comment": "Synthetic review",
+                    # Plusieurs reviews par seconde : des ex aequo sur created_at
+                    "created_at": start + timedelta(seconds=i // 3),
+                }
+                for i in range(first, min(first + batch_size, count))
+            ])
+
+
+def timed(fn, repeat: int) -> float:
+    """Best of `repeat` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=5_000_000)
+    parser.add_argument("--page", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    started = time.perf_counter()
+    seed_reviews(engine, args.reviews)
+    print(f"seeded {args.reviews} reviews in {time.perf_counter() - started:.1f}s")
+
+    skip = (args.page - 1) * args.limit
+    with Session(engine) as db:
+        # Curseur de la page précédente, comme l'aurait renvoyé l'API
+        order = [column.desc() for column in REVIEW_ORDER]
+        last = db.execute(select(*REVIEW_ORDER).order_by(*order).offset(skip - 1).limit(1)).one()
+        cursor = encode_cursor(list(last))
+
+        results = {
+            "page 1 (offset)": timed(lambda: get_reviews(db, limit=args.limit), args.repeat),
+            f"page {args.page} (offset)": timed(lambda: get_reviews(db, skip=skip, limit=args.limit), args.repeat),
+            f"page {args.page} (cursor)": timed(lambda: get_reviews(db, limit=args.limit, cursor=cursor), args.repeat),
+        }
+        assert [r.id for r in get_reviews(db, skip=skip, limit=args.limit)] == \
+            [r.id for r in get_reviews(db, limit=args.limit, cursor=cursor)]
+
+    for label, ms in results.items():
+        print(f"{label:>22}: {ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Offline similarity job and recommendation serving at scale
+
+compute  builds a synthetic rating matrix in memory (Zipf-distributed movie
+         popularity and user activity, 1M users × 100k movies by default) and
+         times app.tools.similarities: matrix construction, then the blocked
+         top-K products. Reports the peak resident memory. Repeated
+         (user, movie) draws collapse into one rating, so the matrix holds
+         fewer nonzeros than --ratings.
+serve    seeds a SQLite database with app.tools.generate, runs the job on it
+         and times GET /users/{id}/recommendations' query for random users.
+
+Usage (from backend/):
+    python -m benchmarks.recommendations compute --users 1M --movies 100k --ratings 20M
+    python -m benchmarks.recommendations serve --users 20k --movies 5k --reviews 500k
+"""
+import argparse
+import random
+import resource
+import time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.crud.recommendation import get_recommendations
+from app.tools.generate import generate, parse_count
+from app.tools.similarities import compute_similarities, rating_matrix, top_k_similarities
+from benchmarks.common import create_bench_engine, percentile
+
+
+def zipf_ids(rng: np.random.Generator, count: int, size: int, s: float) -> np.ndarray:
+    """`size` ids in 1..count, id n drawn with a probability proportional to 1/n^s"""
+    weights = 1.0 / np.arange(1, count + 1) ** s
+    cumulative = np.cumsum(weights / weights.sum())
+    ids = np.searchsorted(cumulative, rng.random(size)) + 1
+    return np.minimum(ids, count).astype(np.int32)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_compute(args):
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    movie_ids = zipf_ids(rng, args.movies, args.ratings, args.zipf_s)
+    user_ids = zipf_ids(rng, args.users, args.ratings, args.zipf_s)
+    ratings = rng.integers(1, 6, args.ratings, dtype=np.int32)
+    print(f"{args.ratings} ratings generated in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    matrix, movies = rating_matrix(movie_ids, user_ids, ratings)
+    del movie_ids, user_ids, ratings
+    print(f"matrix {matrix.shape[0]} × {matrix.shape[1]}, {matrix.nnz} nonzeros "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    pairs = 0
+    blocks = 0
+    for rows, neighbors, scores in top_k_similarities(matrix, args.top_k, args.block_size):
+        pairs += len(scores)
+        blocks += 1
+        if blocks % args.report == 0:
+            done = min(blocks * args.block_size, matrix.shape[0])
+            elapsed = time.perf_counter() - started
+            print(f"  {done:>8} movies  {elapsed:>8.1f}s  (~{elapsed / done * matrix.shape[0]:.0f}s in total)")
+    elapsed = time.perf_counter() - started
+    print(f"top-{args.top_k}: {pairs} similarities in {elapsed:.1f}s "
+          f"({matrix.shape[0] / elapsed:.0f} movies/s), peak RSS {peak_rss_mb():.0f} MB")
+
+
+def run_serve(args):
+    engine = create_bench_engine(args.database_url)
+    generate(engine, args.movies, args.users, args.reviews, watchlist=args.users * 5,
+             seed=args.seed, password_pool=1, log=lambda message: None)
+    started = time.perf_counter()
+    written = compute_similarities(engine, top_k=args.top_k, block_size=args.block_size, log=lambda message: None)
+    print(f"similarity job: {written} rows in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(args.seed)
+    latencies = []
+    empty = 0
+    with Session(engine) as db:
+        for _ in range(args.samples):
+            user_id = rng.randint(1, args.users)
+            started = time.perf_counter()
+            recommended = get_recommendations(db, user_id, limit=20)
+            latencies.append(time.perf_counter() - started)
+            empty += recommended[0][1] is None if recommended else 1
+    print(f"{args.samples} users: p50 {percentile(latencies, 50) * 1000:.2f}ms  "
+          f"p95 {percentile(latencies, 95) * 1000:.2f}ms  p99 {percentile(latencies, 99) * 1000:.2f}ms  "
+          f"cold-start fallbacks {empty}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    compute = sub.add_parser("compute", help="time the similarity job on an in-memory matrix")
+    compute.add_argument("--users", type=parse_count, default=1_000_000)
+    compute.add_argument("--movies", type=parse_count, default=100_000)
+    compute.add_argument("--ratings", type=parse_count, default=20_000_000)
+    compute.add_argument("--report", type=int, default=10, help="print progress every N blocks")
+    serve = sub.add_parser("serve", help="time the recommendation query on a seeded database")
+    serve.add_argument("--users", type=parse_count, default=20_000)
+    serve.add_argument("--movies", type=parse_count, default=5_000)
+    serve.add_argument("--reviews", type=parse_count, default=500_000)
+    serve.add_argument("--samples", type=int, default=500)
+    serve.add_argument("--database-url", help="empty database to seed (default: temporary SQLite file)")
+    for command in (compute, serve):
+        command.add_argument("--top-k", type=int, default=50)
+        command.add_argument("--block-size", type=int, default=1024)
+        command.add_argument("--zipf-s", type=float, default=1.1)
+        command.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run_compute(args) if args.command == "compute" else run_serve(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Typeahead index at catalogue scale
+
+Loads N synthetic titles into a TitleIndex (no database involved), then
+reports the build time, the memory footprint and the latency of suggestions
+and of incremental updates.
+
+Usage (from backend/):
+    python -m benchmarks.typeahead --titles 1000000 [--trace-memory]
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from app.core.typeahead import TitleIndex
+from benchmarks.common import percentile
+
+WORDS = (
+    "star wars return king lord rings night day dark knight love story last first man woman "
+    "city lost world war time life death blood moon sun fire ice shadow ghost house road "
+    "amour nuit jour ville guerre été hiver vie mort rêve voyage odyssée mer ciel secret"
+).split()
+
+
+def synthetic_titles(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for movie_id in range(1, count + 1):
+        words = rng.choices(WORDS, k=rng.randint(1, 5))
+        yield movie_id, " ".join(words).title() + f" {movie_id}"
+
+
+def timed_us(fn, samples: int) -> dict:
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="measure allocations with tracemalloc (slows the build down ~3x)")
+    args = parser.parse_args()
+
+    index = TitleIndex()
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    index.load(synthetic_titles(args.titles))
+    build_seconds = time.perf_counter() - started
+    traced = {}
+    if args.trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        traced = {"traced_memory_mb": round(current / 2**20, 1), "traced_peak_mb": round(peak / 2**20, 1)}
+
+    rng = random.Random(7)
+    prefixes = [rng.choice(WORDS)[:rng.randint(1, 5)] for _ in range(args.queries)]
+    queries = iter(prefixes)
+    suggest = timed_us(lambda: index.suggest(next(queries)), args.queries)
+
+    next_id = iter(range(args.titles + 1, args.titles + 1 + 200))
+    add = timed_us(lambda: index.apply({next(next_id): ("Brand New Movie", None)}), 200)
+    removed = iter(range(1, 201))
+    remove = timed_us(lambda: index.apply({next(removed): None}), 200)
+
+    print(json.dumps({
+        "titles": args.titles,
+        "entries": len(index._entries),
+        "build_s": round(build_seconds, 2),
+        "index_memory_mb": round(index.memory_usage() / 2**20, 1),
+        **traced,
+        "suggest": suggest,
+        "add": add,
+        "remove": remove,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,10 @@
 
 set -e
 
-echo "Waiting for database to be ready..."
-sleep 5
+# Attente de la base (sondée, pas de délai fixe), migrations et seed dans un seul interpréteur
+echo "Waiting for database, then initializing and seeding it..."
+python prestart.py
 
-echo "Initializing database..."
-python init_db.py
-
-echo "Seeding database with movies..."
-python seed_db.py
-
-echo "Database initialization complete!"
 echo "🚀 Starting API server..."
 
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
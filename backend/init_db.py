@@ -1,29 +1,32 @@
 """
-Script to initialize the database and create all tables
-Run this once to set up the database schema
+Script to bring the database schema up to date with the Alembic migrations
+Safe to run on every startup: only pending migrations are applied
 """
-from app.db.base import Base
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
 from app.db.session import engine
-from sqlalchemy import text, inspect
-from app import models  
-
-# Check if tables already exist
-inspector = inspect(engine)
-existing_tables = inspector.get_table_names()
-
-# Create all tables only if they don't exist
-if not existing_tables:
-    Base.metadata.create_all(bind=engine)
-    
-    # Reset sequences to 1 only on first creation
-    with engine.connect() as connection:
-        connection.execute(text("ALTER SEQUENCE movies_id_seq RESTART WITH 1"))
-        connection.execute(text("ALTER SEQUENCE users_id_seq RESTART WITH 1"))
-        connection.execute(text("ALTER SEQUENCE reviews_id_seq RESTART WITH 1"))
-        connection.execute(text("ALTER SEQUENCE watchlists_id_seq RESTART WITH 1"))
-        connection.commit()
-    
-    print("Database tables created successfully!")
-    print("Sequences reset to 1")
-else:
-    print("Database tables already exist - skipping creation")
+
+# Première migration : le schéma créé auparavant par Base.metadata.create_all
+BASELINE_REVISION = "0001"
+
+
+def upgrade_schema():
+    config = Config(str(Path(__file__).resolve().parent / "alembic.ini"))
+
+    existing_tables = inspect(engine).get_table_names()
+
+    # Base créée avant Alembic : elle correspond déjà à la première migration
+    if existing_tables and "alembic_version" not in existing_tables:
+        command.stamp(config, BASELINE_REVISION)
+        print(f"Existing schema stamped at revision {BASELINE_REVISION}")
+
+    command.upgrade(config, "head")
+    print("Database schema is up to date")
+
+
+if __name__ == "__main__":
+    upgrade_schema()
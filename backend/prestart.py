@@ -0,0 +1,42 @@
+"""
+Container startup, before uvicorn: wait for the database, apply the
+migrations (init_db.py) and seed the sample data (seed_db.py)
+
+Everything runs in one interpreter, so the application modules are imported
+once instead of once per script. The database is polled until it accepts a
+connection (at most DB_STARTUP_TIMEOUT_SECONDS) instead of sleeping a fixed
+time.
+"""
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db.session import engine
+from init_db import upgrade_schema
+from seed_db import seed_all
+
+POLL_INTERVAL_SECONDS = 0.25
+
+
+def wait_for_database(timeout: float = settings.DB_STARTUP_TIMEOUT_SECONDS) -> float:
+    """Block until the database answers a query, returns the seconds waited"""
+    started = time.monotonic()
+    while True:
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return time.monotonic() - started
+        except OperationalError:
+            if time.monotonic() - started >= timeout:
+                raise
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    started = time.monotonic()
+    print(f"Database ready after {wait_for_database():.2f}s")
+    upgrade_schema()
+    seed_all()
+    print(f"Database initialization complete in {time.monotonic() - started:.2f}s")
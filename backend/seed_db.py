@@ -8,6 +8,8 @@ from app.models.user import User
 from app.models.review import Review
 from app.models.watchlist import Watchlist
 from app.core.security import get_password_hash
+from app.crud.review import insert_reviews
+from app.schemas.review import ReviewCreate
 
 def seed_movies():
     db = SessionLocal()
@@ -283,7 +285,7 @@ def seed_reviews():
         {"user_id": bob.id, "movie_id": 26, "rating": 5, "comment": "Mad Max Fury Road est une symphonie visuelle. Action pure du début à la fin!"},
     ]
     
-    reviews_created = 0
+    new_reviews = []
     
     for review_data in reviews_data:
         existing = db.query(Review).filter(
@@ -292,11 +294,12 @@ def seed_reviews():
         ).first()
         
         if not existing:
-            review = Review(**review_data)
-            db.add(review)
-            reviews_created += 1
+            new_reviews.append(ReviewCreate(**review_data))
+    reviews_created = len(new_reviews)
     
     if reviews_created > 0:
+        # Par le CRUD : agrégats et scores des films, événements pour les similarités
+        insert_reviews(db, new_reviews)
         db.commit()
         print(f"Successfully seeded {reviews_created} reviews!")
     else:
@@ -356,9 +359,13 @@ def seed_watchlists():
     db.close()
 
 
-if __name__ == "__main__":
+def seed_all():
     seed_movies()
     seed_admin_user()
     seed_users()
     seed_reviews()
     seed_watchlists()
+
+
+if __name__ == "__main__":
+    seed_all()
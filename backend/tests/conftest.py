@@ -1,16 +1,26 @@
 """
 Configuration pytest et fixtures communes pour les tests
 """
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.db.base import Base
 from app.db.session import get_db
+from app.db.replicas import get_db_read
 from app.core.security import get_password_hash
+from app.core.principals import principal_cache
+from app.core.search import search_index
+from app.core.typeahead import title_index
+from app.core import http_cache
+from app.core.result_cache import result_cache
+from app.core.review_feed import review_feed
+from app.core.instrumentation import instrument_engine
 from app.models.user import User
 from app.models.movie import Movie
 
@@ -23,6 +33,78 @@ engine = create_engine(
     poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Comme l'engine de l'application : temps SQL et nombre de requêtes par requête HTTP
+instrument_engine(engine)
+
+
+class FakeRedis:
+    """Client Redis minimal en mémoire (get/mget/set/delete/scan_iter) pour les tests"""
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value.encode() if isinstance(value, str) else value
+
+    def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, pattern="*"):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.store) if key.startswith(prefix)]
+
+
+@pytest.fixture
+def fake_redis():
+    """Fixture fournissant un faux client Redis"""
+    return FakeRedis()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Vide les caches en mémoire entre les tests (chaque test recrée sa base)"""
+    principal_cache.backend.clear()
+    search_index.clear()
+    title_index.clear()
+    http_cache.clear()
+    result_cache.clear()
+    review_feed.clear()
+    yield
+    principal_cache.backend.clear()
+    search_index.clear()
+    title_index.clear()
+    http_cache.clear()
+    result_cache.clear()
+    review_feed.clear()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Context manager qui fait échouer le test si le bloc exécute plus de
+    `limit` requêtes SQL (régression de stratégie de chargement, N+1)
+    """
+    @contextmanager
+    def budget(limit: int):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert len(statements) <= limit, (
+            f"{len(statements)} SQL queries, budget {limit}:\n" + "\n".join(statements)
+        )
+    return budget
 
 
 @pytest.fixture
@@ -47,6 +129,8 @@ def client(db):
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    # Lectures (réplicas en production) sur la même base de test
+    app.dependency_overrides[get_db_read] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -2,8 +2,11 @@
 Tests d'intégration essentiels - CineVerse API
 10 tests couvrant les workflows critiques
 """
+import json
+
 import pytest
 from fastapi.testclient import TestClient
+from app.core import security
 
 
 def test_user_registration(client):
@@ -33,6 +36,25 @@ def test_user_login(client, test_user):
     assert data["token_type"] == "bearer"
 
 
+def test_login_returns_503_when_hashing_pool_is_saturated(client, test_user, monkeypatch):
+    """Test que /auth/login répond 503 quand le pool bcrypt est saturé"""
+    def saturated(*args):
+        raise security.PasswordHasherBusy()
+
+    monkeypatch.setattr(security.hashing_pool, "run", saturated)
+    response = client.post("/api/v1/auth/login", data={
+        "username": test_user.username,
+        "password": "testpassword123"
+    })
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    metrics = client.get("/metrics").text
+    assert "cineverse_password_hash_seconds_bucket" in metrics
+    assert "cineverse_password_hash_queue_depth" in metrics
+
+
 def test_get_current_user_with_token(client, auth_headers_user):
     """Test que /auth/me retourne l'utilisateur connecté"""
     response = client.get("/api/v1/auth/me", headers=auth_headers_user)
@@ -42,6 +64,20 @@ def test_get_current_user_with_token(client, auth_headers_user):
     assert data["username"] == "testuser"
 
 
+def test_principal_cache_invalidated_on_user_update(client, test_user, auth_headers_user):
+    """Test que /auth/me reflète une mise à jour malgré le cache des principals"""
+    first = client.get("/api/v1/auth/me", headers=auth_headers_user)
+    assert first.json()["full_name"] == "Test User"
+
+    response = client.put(f"/api/v1/users/{test_user.id}", json={"full_name": "Renamed User"},
+                          headers=auth_headers_user)
+    assert response.status_code == 200
+
+    second = client.get("/api/v1/auth/me", headers=auth_headers_user)
+    assert second.status_code == 200
+    assert second.json()["full_name"] == "Renamed User"
+
+
 def test_list_movies_public(client, test_movie):
     """Test que la liste des films est accessible publiquement"""
     response = client.get("/api/v1/movies/")
@@ -52,6 +88,563 @@ def test_list_movies_public(client, test_movie):
     assert len(movies) > 0
 
 
+def test_list_movies_sorted_by_rating(client, db, test_user, auth_headers_user):
+    """Test que GET /movies trie par note moyenne avec les agrégats exposés"""
+    from app.models.movie import Movie
+    db.add_all([Movie(title="Moyen"), Movie(title="Excellent")])
+    db.commit()
+    ids = {m.title: m.id for m in db.query(Movie).all()}
+
+    for title, rating in (("Moyen", 3), ("Excellent", 5)):
+        client.post("/api/v1/reviews/", json={
+            "user_id": test_user.id, "movie_id": ids[title], "rating": rating, "comment": "Avis"
+        }, headers=auth_headers_user)
+
+    response = client.get("/api/v1/movies/", params={"sort_by": "avg_rating", "order": "desc"})
+    assert response.status_code == 200
+    movies = response.json()
+    assert [m["title"] for m in movies] == ["Excellent", "Moyen"]
+    assert movies[0]["avg_rating"] == 5.0
+    assert movies[0]["review_count"] == 1
+    assert movies[0]["rating_histogram"] == [0, 0, 0, 0, 1]
+
+
+def test_trending_and_top_rated_movies(client, db, test_user, auth_headers_user):
+    """Test que les classements suivent les reviews : tendance et note bayésienne avec minimum de reviews"""
+    from app.models.movie import Movie
+    db.add_all([Movie(title="Oublié"), Movie(title="Unique"), Movie(title="Populaire")])
+    db.commit()
+    ids = {m.title: m.id for m in db.query(Movie).all()}
+
+    reviews = [("Unique", 5), ("Populaire", 5), ("Populaire", 5), ("Populaire", 4)]
+    for title, rating in reviews:
+        response = client.post("/api/v1/reviews/", json={
+            "user_id": test_user.id, "movie_id": ids[title], "rating": rating, "comment": "Avis"
+        }, headers=auth_headers_user)
+        assert response.status_code == 200
+
+    trending = client.get("/api/v1/movies/trending", params={"limit": 3})
+    assert trending.status_code == 200
+    assert [m["title"] for m in trending.json()] == ["Populaire", "Unique", "Oublié"]
+
+    # Une seule note de 5 pèse moins que trois notes presque parfaites
+    top_rated = client.get("/api/v1/movies/top-rated", params={"limit": 3})
+    assert [m["title"] for m in top_rated.json()] == ["Populaire", "Unique", "Oublié"]
+    filtered = client.get("/api/v1/movies/top-rated", params={"min_reviews": 2})
+    assert [m["title"] for m in filtered.json()] == ["Populaire"]
+
+    # Reviews supprimées : le film redescend
+    for review in client.get(f"/api/v1/movies/{ids['Populaire']}/reviews").json():
+        client.delete(f"/api/v1/reviews/{review['id']}", headers=auth_headers_user)
+    trending = client.get("/api/v1/movies/trending", params={"limit": 1})
+    assert [m["title"] for m in trending.json()] == ["Unique"]
+
+
+def test_recent_reviews_feed(client, db, test_user, auth_headers_user):
+    """Test que le fil des dernières reviews va de la plus récente à la plus ancienne, page par page"""
+    from app.models.movie import Movie
+    db.add(Movie(title="Fil"))
+    db.commit()
+    movie_id = db.query(Movie.id).filter(Movie.title == "Fil").scalar()
+    ids = []
+    for n in range(3):
+        response = client.post("/api/v1/reviews/", json={
+            "user_id": test_user.id, "movie_id": movie_id, "rating": 4, "comment": f"Avis {n}"
+        }, headers=auth_headers_user)
+        ids.append(response.json()["id"])
+
+    first = client.get("/api/v1/reviews/recent", params={"limit": 2})
+    assert first.status_code == 200
+    assert [r["id"] for r in first.json()] == [ids[2], ids[1]]
+    assert first.json()[0]["user"]["username"] == test_user.username
+
+    second = client.get("/api/v1/reviews/recent", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [r["id"] for r in second.json()] == [ids[0]]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_list_movies_cursor_pagination(client, db):
+    """Test que GET /movies renvoie un curseur pour la page suivante"""
+    from app.models.movie import Movie
+    db.add_all([Movie(title=f"Movie {i}") for i in range(3)])
+    db.commit()
+
+    first = client.get("/api/v1/movies/", params={"limit": 2})
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/api/v1/movies/", params={"limit": 2, "cursor": cursor})
+    assert [m["title"] for m in second.json()] == ["Movie 2"]
+    assert "X-Next-Cursor" not in second.headers
+
+    invalid = client.get("/api/v1/movies/", params={"cursor": "not-a-cursor"})
+    assert invalid.status_code == 400
+
+
+def test_forged_cursor_rejected(client, db, test_movie):
+    """Test qu'un curseur dont une valeur n'a pas le type de sa colonne est refusé (400) avant la base"""
+    from datetime import datetime
+    from app.crud.pagination import encode_cursor
+    forged = {
+        "/api/v1/movies/": [["1"], [True], [None], [{"dt": "2026-01-01T00:00:00"}]],
+        "/api/v1/movies/?sort_by=avg_rating": [["4.5", 1], [4.5, 1.5], [10 ** 400, 1]],
+        "/api/v1/reviews/recent": [["2026-01-01", 1], [1767225600, 1], [{"dt": "demain"}, 1],
+                                   [datetime(2026, 1, 1), "1"]],
+    }
+    for url, cursors in forged.items():
+        for values in cursors:
+            response = client.get(url, params={"cursor": encode_cursor(values)})
+            assert response.status_code == 400, (url, values)
+    # Un entier reste accepté pour une colonne flottante (JSON ne distingue pas 4 de 4.0)
+    valid = client.get("/api/v1/movies/", params={"sort_by": "avg_rating", "cursor": encode_cursor([4, 1])})
+    assert valid.status_code == 200
+
+
+def test_search_movies(client, auth_headers_admin):
+    """Test que la recherche plein texte classe les titres avant les descriptions et suit les modifications"""
+    client.post("/api/v1/movies/", headers=auth_headers_admin,
+                json={"title": "Le Voyage", "description": "Une odyssée spatiale"})
+    client.post("/api/v1/movies/", headers=auth_headers_admin,
+                json={"title": "Odyssée", "description": "Un long voyage en mer"})
+    client.post("/api/v1/movies/", headers=auth_headers_admin,
+                json={"title": "Autre film", "description": "Rien à voir"})
+
+    response = client.get("/api/v1/movies/search", params={"q": "voya"})
+    assert response.status_code == 200
+    assert [m["title"] for m in response.json()] == ["Le Voyage", "Odyssée"]
+
+    # Accents ignorés, tous les mots doivent correspondre
+    response = client.get("/api/v1/movies/search", params={"q": "odyssee mer"})
+    assert [m["title"] for m in response.json()] == ["Odyssée"]
+
+    # L'index suit les créations après son premier chargement
+    client.post("/api/v1/movies/", headers=auth_headers_admin, json={"title": "Voyageurs"})
+    response = client.get("/api/v1/movies/search", params={"q": "voyage"})
+    assert [m["title"] for m in response.json()] == ["Le Voyage", "Voyageurs", "Odyssée"]
+
+    assert client.get("/api/v1/movies/search", params={"q": ""}).status_code == 422
+
+
+def test_suggest_movie_titles(client, db, auth_headers_admin, monkeypatch):
+    """Test que l'autocomplétion suit les écritures locales et celles des autres workers"""
+    import time
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.crud.version import bump_versions
+    from app.models.movie import Movie
+    for title in ["Star Wars", "The Last Starfighter", "Lone Star", "Stalker"]:
+        client.post("/api/v1/movies/", headers=auth_headers_admin, json={"title": title})
+
+    response = client.get("/api/v1/movies/suggest", params={"prefix": "star"})
+    assert response.status_code == 200
+    assert [m["title"] for m in response.json()] == ["Star Wars", "Lone Star", "The Last Starfighter"]
+
+    # Écriture locale : appliquée directement à l'index
+    movie_id = response.json()[0]["id"]
+    client.put(f"/api/v1/movies/{movie_id}", headers=auth_headers_admin, json={"title": "Stargate"})
+    response = client.get("/api/v1/movies/suggest", params={"prefix": "starg"})
+    assert response.json() == [{"id": movie_id, "title": "Stargate"}]
+
+    # Écriture d'un autre worker (sans passer par l'ORM de ce processus) :
+    # détectée par le compteur de version, l'index est reconstruit en arrière-plan
+    monkeypatch.setattr(settings, "TYPEAHEAD_SYNC_SECONDS", 0)
+    db.execute(insert(Movie).values(title="Starman"))
+    bump_versions(db, "movies")
+    db.commit()
+    deadline = time.monotonic() + 5
+    titles = []
+    while "Starman" not in titles and time.monotonic() < deadline:
+        titles = [m["title"] for m in client.get("/api/v1/movies/suggest", params={"prefix": "starm"}).json()]
+        time.sleep(0.01)
+    assert titles == ["Starman"]
+
+
+def test_movie_conditional_get(client, db, test_user, auth_headers_user, auth_headers_admin, test_movie):
+    """Test que les lectures du catalogue renvoient un ETag et 304 tant que rien n'a changé"""
+    from sqlalchemy import event
+    url = f"/api/v1/movies/{test_movie.id}"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert "s-maxage" in first.headers["Cache-Control"]
+
+    # 304 sans aucune requête SQL
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    second = client.get(url, headers={"If-None-Match": etag})
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+    assert second.status_code == 304
+    assert statements == []
+
+    # Une review modifie les agrégats du film : nouvel ETag
+    client.post("/api/v1/reviews/", headers=auth_headers_user,
+                json={"user_id": test_user.id, "movie_id": test_movie.id, "rating": 4, "comment": "Bien"})
+    third = client.get(url, headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.json()["review_count"] == 1
+    assert third.headers["ETag"] != etag
+
+    reviews_url = f"/api/v1/movies/{test_movie.id}/reviews"
+    reviews_etag = client.get(reviews_url).headers["ETag"]
+    assert client.get(reviews_url, headers={"If-None-Match": reviews_etag}).status_code == 304
+    # Le nom de l'auteur apparaît dans les reviews
+    client.put(f"/api/v1/users/{test_user.id}", headers=auth_headers_user, json={"username": "renamed"})
+    assert client.get(reviews_url, headers={"If-None-Match": reviews_etag}).status_code == 200
+
+    listing = client.get("/api/v1/movies/")
+    assert client.get("/api/v1/movies/", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+
+def test_movie_reads_served_from_result_cache(client, db, test_user, auth_headers_user, test_movie):
+    """Test que les lectures répétées du catalogue ne touchent pas la base tant qu'aucune écriture ne les invalide"""
+    from sqlalchemy import event
+    urls = [f"/api/v1/movies/{test_movie.id}", f"/api/v1/movies/{test_movie.id}/reviews", "/api/v1/movies/"]
+    first = [client.get(url).json() for url in urls]
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    assert [client.get(url).json() for url in urls] == first
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+    assert statements == []
+
+    client.post("/api/v1/reviews/", headers=auth_headers_user,
+                json={"user_id": test_user.id, "movie_id": test_movie.id, "rating": 5, "comment": "Super"})
+    detail, reviews, listing = [client.get(url).json() for url in urls]
+    assert detail["review_count"] == 1
+    assert len(reviews) == 1
+    assert listing[0]["avg_rating"] == 5.0
+
+
+def test_request_instrumentation(client, test_movie):
+    """Test que chaque requête expose son temps SQL dans Server-Timing et alimente les métriques par route"""
+    import re
+    from app.core.instrumentation import request_seconds
+    labels = {"method": "GET", "route": "/api/v1/movies/{movie_id}"}
+    before = request_seconds.count(status=200, **labels)
+
+    response = client.get(f"/api/v1/movies/{test_movie.id}")
+    timing = response.headers["Server-Timing"]
+    queries = int(re.search(r'db;dur=[0-9.]+;desc="(\d+) queries"', timing).group(1))
+    assert queries >= 1
+    assert "serialize;dur=" in timing and "total;dur=" in timing
+    assert request_seconds.count(status=200, **labels) == before + 1
+
+    metrics = client.get("/metrics").text
+    assert 'cineverse_http_request_db_queries_bucket{method="GET",route="/api/v1/movies/{movie_id}",le="1"}' in metrics
+    assert 'cineverse_db_pool_checkout_seconds' in metrics
+
+
+def test_review_and_watchlist_lists_fit_query_budget(client, db, test_user, auth_headers_user, query_budget):
+    """Test que les listes chargent auteurs et films en une requête, quel que soit le nombre de lignes (pas de N+1)"""
+    from app.models.movie import Movie
+    from app.models.review import Review
+    from app.models.user import User
+    from app.models.watchlist import Watchlist
+    authors = [User(username=f"author{i}", email=f"author{i}@example.com", hashed_password="x") for i in range(6)]
+    movies = [Movie(title=f"Movie {i}", release_year=2000 + i) for i in range(6)]
+    db.add_all(authors + movies)
+    db.commit()
+    db.add_all([Review(user_id=author.id, movie_id=movie.id, rating=4, comment="Bien")
+                for author in authors for movie in movies[:2]])
+    db.add_all([Review(user_id=test_user.id, movie_id=movie.id, rating=3, comment="Bof") for movie in movies])
+    db.add_all([Watchlist(user_id=test_user.id, movie_id=movie.id) for movie in movies])
+    db.commit()
+
+    for url, headers in (("/api/v1/reviews?limit=20", {}),
+                         (f"/api/v1/users/{test_user.id}/reviews?limit=20", {}),
+                         (f"/api/v1/watchlist/{test_user.id}", auth_headers_user)):
+        db.expunge_all()  # pas d'objets déjà chargés dans la session partagée
+        with query_budget(2):
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) >= 6
+
+
+def test_batch_movies_and_watchlist_membership(client, db, test_user, auth_headers_user, auth_headers_admin, query_budget):
+    """Test des lectures groupées : films par ids et appartenance à la watchlist en une requête"""
+    ids = [client.post("/api/v1/movies/", headers=auth_headers_admin,
+                       json={"title": f"Movie {i}", "release_year": 2000 + i}).json()["id"] for i in range(4)]
+    for movie_id in ids[:2]:
+        client.post("/api/v1/watchlist/", headers=auth_headers_user, json={"user_id": test_user.id, "movie_id": movie_id})
+
+    # Ordre demandé conservé, ids inconnus ignorés
+    wanted = [ids[2], 9999, ids[0]]
+    response = client.get("/api/v1/movies", params={"ids": ",".join(map(str, wanted))})
+    assert [movie["id"] for movie in response.json()] == [ids[2], ids[0]]
+    assert client.get("/api/v1/movies", params={"ids": "1,abc"}).status_code == 422
+    assert client.get("/api/v1/movies", params={"ids": ",".join(map(str, range(1, 102)))}).status_code == 422
+
+    # Un film créé après coup apparaît dans la réponse groupée qui l'avait manqué
+    missing = ids[-1] + 1
+    assert client.get("/api/v1/movies", params={"ids": str(missing)}).json() == []
+    client.post("/api/v1/movies/", headers=auth_headers_admin, json={"title": "Late", "release_year": 2024})
+    assert [m["id"] for m in client.get("/api/v1/movies", params={"ids": str(missing)}).json()] == [missing]
+
+    url = f"/api/v1/watchlist/{test_user.id}/contains"
+    with query_budget(2):
+        response = client.post(url, headers=auth_headers_user, json={"movie_ids": ids + [9999]})
+    assert response.json() == {"movie_ids": ids + [9999], "in_watchlist": [True, True, False, False, False]}
+    assert client.post(url, headers=auth_headers_user, json={"movie_ids": list(range(101))}).status_code == 422
+    assert client.post(url, json={"movie_ids": ids}).status_code == 401
+
+
+def test_bulk_import_movies_and_reviews(client, db, test_user, auth_headers_user, auth_headers_admin):
+    """Test des imports en masse : NDJSON avec erreurs par ligne, tableau JSON et agrégats des films"""
+    lines = [json.dumps({"title": f"Bulk {i}", "release_year": 1990 + i}) for i in range(5)]
+    lines.insert(2, "{pas du json")
+    lines.insert(4, json.dumps({"release_year": 2000}))  # titre manquant
+    body = "\n".join(lines) + "\n"
+    headers = {**auth_headers_admin, "Content-Type": "application/x-ndjson"}
+    assert client.post("/api/v1/movies/bulk", content=body,
+                       headers={**auth_headers_user, "Content-Type": "application/x-ndjson"}).status_code == 403
+
+    response = client.post("/api/v1/movies/bulk", params={"batch_size": 2}, content=body, headers=headers)
+    result = response.json()
+    assert (result["received"], result["created"], result["failed"]) == (7, 5, 2)
+    assert [error["index"] for error in result["errors"]] == [2, 4]
+    titles = [movie["title"] for movie in client.get("/api/v1/movies", params={"limit": 20}).json()]
+    assert titles == [f"Bulk {i}" for i in range(5)]
+    assert [movie["title"] for movie in client.get("/api/v1/movies/suggest", params={"prefix": "bulk"}).json()]
+
+    reviews = [
+        {"user_id": test_user.id, "movie_id": 1, "rating": 5, "comment": "Top"},
+        {"user_id": test_user.id, "movie_id": 1, "rating": 3, "comment": "Bien"},
+        {"user_id": test_user.id, "movie_id": 2, "rating": 6, "comment": "Note invalide"},
+        {"user_id": test_user.id, "movie_id": 999, "rating": 4, "comment": "Film inconnu"},
+        {"user_id": test_user.id, "movie_id": 2, "rating": 1, "comment": "Bof"},
+    ]
+    assert client.get("/api/v1/movies/1").json()["review_count"] == 0
+    response = client.post("/api/v1/reviews/bulk", json=reviews, headers=auth_headers_admin)
+    result = response.json()
+    assert (result["created"], result["failed"]) == (3, 2)
+    assert [error["index"] for error in result["errors"]] == [2, 3]
+    assert "not found" in result["errors"][1]["error"]
+
+    # Agrégats mis à jour et versions incrémentées (pas de réponse périmée du cache)
+    movie = client.get("/api/v1/movies/1").json()
+    assert (movie["review_count"], movie["avg_rating"], movie["rating_histogram"]) == (2, 4.0, [0, 0, 1, 0, 1])
+    assert client.get("/api/v1/movies/2").json()["rating_histogram"] == [1, 0, 0, 0, 0]
+    assert len(client.get("/api/v1/movies/1/reviews").json()) == 2
+    assert client.post("/api/v1/reviews/bulk", json={"rating": 5}, headers=auth_headers_admin).status_code == 422
+
+
+def test_export_movies_and_reviews(client, db, test_user, auth_headers_user, auth_headers_admin):
+    """Test des exports en flux : NDJSON, CSV, gzip et reprise avec since_id"""
+    body = "".join(json.dumps({"title": f"Export {i}", "release_year": 2000 + i}) + "\n" for i in range(5))
+    client.post("/api/v1/movies/bulk", content=body,
+                headers={**auth_headers_admin, "Content-Type": "application/x-ndjson"})
+    client.post("/api/v1/reviews", headers=auth_headers_user,
+                json={"user_id": test_user.id, "movie_id": 2, "rating": 4, "comment": "Très bien"})
+    assert client.get("/api/v1/export/movies", headers=auth_headers_user).status_code == 403
+
+    # httpx annonce gzip et décompresse la réponse
+    response = client.get("/api/v1/export/movies", headers=auth_headers_admin)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "application/x-ndjson"
+    movies = [json.loads(line) for line in response.text.splitlines()]
+    assert [movie["title"] for movie in movies] == [f"Export {i}" for i in range(5)]
+    assert movies[1]["review_count"] == 1
+
+    # Reprise après le dernier id reçu
+    response = client.get("/api/v1/export/movies", params={"since_id": movies[2]["id"], "limit": 1},
+                          headers={**auth_headers_admin, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Export 3"]
+
+    # gzip;q=0 est un refus explicite, * couvre gzip quand il n'est pas nommé
+    refused = client.get("/api/v1/export/movies", params={"limit": 1},
+                         headers={**auth_headers_admin, "Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in refused.headers
+    wildcard = client.get("/api/v1/export/movies", params={"limit": 1},
+                          headers={**auth_headers_admin, "Accept-Encoding": "br, *;q=0.5"})
+    assert wildcard.headers["content-encoding"] == "gzip"
+
+    response = client.get("/api/v1/export/reviews", params={"format": "csv"}, headers=auth_headers_admin)
+    header, row = response.text.splitlines()
+    assert header == "id,movie_id,user_id,rating,comment,created_at"
+    assert row.startswith(f"1,2,{test_user.id},4,Très bien,")
+
+
+def test_reads_routed_to_replicas(client, db, test_user, auth_headers_user, test_movie, tmp_path, monkeypatch):
+    """Test du routage des lectures : réplicas en round-robin, primaire après une écriture, en cas de retard ou de panne"""
+    from sqlalchemy import create_engine
+    from app.db import replicas as routing
+    from app.db.base import Base
+    from app.db.session import SessionLocal
+    from app.main import app
+    from app.models.watchlist import Watchlist
+    from tests.conftest import engine as primary
+
+    # Deux réplicas SQLite : seul le premier a le film 1 dans la watchlist
+    replica_set = routing.ReplicaSet()
+    for name in ("replica-a", "replica-b"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        if name == "replica-a":
+            with engine.begin() as conn:
+                conn.execute(Watchlist.__table__.insert(), {"user_id": test_user.id, "movie_id": test_movie.id})
+        replica_set.add(engine)
+    monkeypatch.setattr(routing, "replicas", replica_set)
+    monkeypatch.setitem(SessionLocal.kw, "bind", primary)
+    monkeypatch.delitem(app.dependency_overrides, routing.get_db_read)
+
+    def in_watchlist(movie_id):
+        return client.get(f"/api/v1/watchlist/{test_user.id}/{movie_id}").json()["in_watchlist"]
+
+    assert [in_watchlist(test_movie.id) for _ in range(4)] == [True, False, True, False]
+
+    # Après sa propre écriture, le client lit le primaire (cookie), puis revient aux réplicas
+    # SPA sur une autre origine (Vite) : le cookie n'est conservé que si CORS autorise les credentials
+    response = client.post("/api/v1/watchlist", json={"user_id": test_user.id, "movie_id": 2},
+                           headers={**auth_headers_user, "Origin": "http://localhost:5173"})
+    assert routing.PRIMARY_COOKIE in response.cookies
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert in_watchlist(2) is True
+    client.cookies.clear()
+    assert in_watchlist(2) is False
+
+    # Réplicas en retard : repli sur le primaire
+    for replica in replica_set.replicas:
+        replica.lag = 60
+    assert in_watchlist(2) is True
+
+    # Réplica injoignable : écarté à la mesure suivante, les autres reprennent le trafic
+    broken = replica_set.add(create_engine(f"sqlite:///{tmp_path / 'absent' / 'replica.db'}"))
+    replica_set.refresh()
+    assert broken.down_until > 0
+    assert {replica_set.pick().name for _ in range(6)} == {replica.name for replica in replica_set.replicas[:2]}
+
+
+def test_authenticated_reads_hold_one_session_slot(client, db, test_user, test_movie, auth_headers_user, monkeypatch):
+    """Test qu'une lecture authentifiée routée sur le primaire partage la session de get_current_user"""
+    import threading
+    from app.db import replicas as routing
+    from app.db import session as sessions
+    from app.main import app
+    from tests.conftest import engine as primary
+
+    # Vraies dépendances get_db / get_db_read, sans réplica, une seule place de session libre
+    monkeypatch.setitem(sessions.SessionLocal.kw, "bind", primary)
+    monkeypatch.setattr(routing, "replicas", routing.ReplicaSet())
+    monkeypatch.delitem(app.dependency_overrides, sessions.get_db)
+    monkeypatch.delitem(app.dependency_overrides, routing.get_db_read)
+
+    responses = []
+
+    def read():
+        responses.append(client.get(f"/api/v1/watchlist/{test_user.id}", headers=auth_headers_user))
+        responses.append(client.post(f"/api/v1/watchlist/{test_user.id}/contains", headers=auth_headers_user,
+                                     json={"movie_ids": [test_movie.id]}))
+
+    slots = sessions._session_slots
+    held = slots.value - 1
+    for _ in range(held):
+        slots.acquire_nowait()
+    try:
+        # Deux places demandées pour une requête : elle attendrait indéfiniment la seconde
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        reader.join(timeout=10)
+        assert not reader.is_alive(), "authenticated read waiting for a second session slot"
+        assert [response.status_code for response in responses] == [200, 200]
+        assert slots.value == 1
+    finally:
+        for _ in range(held):
+            slots.release()
+
+
+def test_lagging_replica_does_not_poison_versions(client, db, test_movie, auth_headers_admin, tmp_path, monkeypatch):
+    """Test qu'un corps lu sur un réplica en retard n'est ni caché ni étiqueté avec la version du primaire"""
+    from sqlalchemy import create_engine
+    from app.db import replicas as routing
+    from app.db.base import Base
+    from app.db.session import SessionLocal
+    from app.main import app
+    from app.models.movie import Movie
+    from tests.conftest import engine as primary
+
+    # Réplica figé avant la modification : ancien titre, aucune version
+    lagging = create_engine(f"sqlite:///{tmp_path / 'lagging.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(lagging)
+    with lagging.begin() as conn:
+        conn.execute(Movie.__table__.insert(), {"id": test_movie.id, "title": test_movie.title})
+    replica_set = routing.ReplicaSet([lagging])
+    monkeypatch.setattr(routing, "replicas", replica_set)
+    monkeypatch.setitem(SessionLocal.kw, "bind", primary)
+    monkeypatch.delitem(app.dependency_overrides, routing.get_db_read)
+    movie_id = test_movie.id
+
+    response = client.put(f"/api/v1/movies/{movie_id}", headers=auth_headers_admin, json={"title": "Nouveau titre"})
+    assert response.status_code == 200
+    client.cookies.clear()
+
+    # Lecture sur le réplica (version 0 chez lui) : ancien corps, avec son propre ETag
+    stale = client.get(f"/api/v1/movies/{movie_id}")
+    assert stale.json()["title"] == "Test Movie"
+
+    # Lecture sur le primaire (cookie) : le corps du réplica n'a pas été caché sous la nouvelle version
+    client.cookies.set(routing.PRIMARY_COOKIE, "1")
+    fresh = client.get(f"/api/v1/movies/{movie_id}")
+    assert fresh.json()["title"] == "Nouveau titre"
+    assert fresh.headers["ETag"] != stale.headers["ETag"]
+    assert client.get(f"/api/v1/movies/{movie_id}", headers={"If-None-Match": stale.headers["ETag"]}).status_code == 200
+
+
+def test_recommendations_from_precomputed_similarities(client, db, test_user, auth_headers_user, auth_headers_admin):
+    """Test des recommandations : voisins des films aimés, sans les films notés ni ceux de la watchlist"""
+    from app.models.movie import Movie
+    from app.models.review import Review
+    from app.models.user import User
+    from app.tools.similarities import compute_similarities
+    from app.tools.recompute_ratings import recompute_ratings
+    from tests.conftest import engine
+
+    titles = ["Alien", "Aliens", "Notting Hill", "Predator", "Love Actually"]
+    db.add_all([Movie(title=title) for title in titles])
+    db.add_all([User(username=f"fan{n}", email=f"fan{n}@example.com", hashed_password="x") for n in range(4)])
+    db.commit()
+    movie = {m.title: m.id for m in db.query(Movie)}
+    fans = [u.id for u in db.query(User).filter(User.username.startswith("fan")).order_by(User.id)]
+    # Amateurs de science-fiction d'un côté, de comédies romantiques de l'autre
+    ratings = [
+        (fans[0], {"Alien": 5, "Aliens": 5, "Predator": 4, "Notting Hill": 1, "Love Actually": 2}),
+        (fans[1], {"Alien": 4, "Aliens": 5, "Predator": 5, "Notting Hill": 2, "Love Actually": 1}),
+        (fans[2], {"Alien": 1, "Aliens": 2, "Predator": 1, "Notting Hill": 5, "Love Actually": 4}),
+        (fans[3], {"Alien": 2, "Aliens": 1, "Notting Hill": 4, "Love Actually": 5}),
+        (test_user.id, {"Alien": 5}),
+    ]
+    db.add_all([Review(user_id=user_id, movie_id=movie[title], rating=rating, comment="Avis")
+                for user_id, rated in ratings for title, rating in rated.items()])
+    db.commit()
+    recompute_ratings(db)
+    assert compute_similarities(engine, top_k=2, log=lambda message: None) > 0
+
+    url = f"/api/v1/users/{test_user.id}/recommendations"
+    response = client.get(url, headers=auth_headers_user)
+    assert response.status_code == 200
+    recommended = [m["title"] for m in response.json()]
+    assert recommended[0] in ("Aliens", "Predator")
+    assert not {"Alien", "Notting Hill", "Love Actually"} & set(recommended)
+    assert response.json()[0]["score"] > 0
+
+    # Un film ajouté à la watchlist n'est plus recommandé
+    client.post("/api/v1/watchlist", headers=auth_headers_user,
+                json={"user_id": test_user.id, "movie_id": movie[recommended[0]]})
+    assert recommended[0] not in [m["title"] for m in client.get(url, headers=auth_headers_user).json()]
+
+    # Sans notes : films les plus commentés ; pas d'accès aux recommandations des autres
+    response = client.get(f"/api/v1/users/{fans[0]}/recommendations", headers=auth_headers_admin)
+    assert response.status_code == 200
+    admin = client.get("/api/v1/auth/me", headers=auth_headers_admin).json()["id"]
+    cold = client.get(f"/api/v1/users/{admin}/recommendations", headers=auth_headers_admin).json()
+    assert len(cold) == 5 and cold[0]["score"] is None
+    assert client.get(f"/api/v1/users/{fans[0]}/recommendations", headers=auth_headers_user).status_code == 403
+
+
 def test_create_movie_requires_admin(client, auth_headers_user, auth_headers_admin):
     """Test que seul un admin peut créer un film"""
     movie_data = {
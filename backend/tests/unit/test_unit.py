@@ -2,21 +2,29 @@
 Tests unitaires essentiels - CineVerse Backend
 10 tests couvrant les fonctions critiques
 """
+import threading
 import pytest
 from datetime import timedelta
 from app.core.security import (
     get_password_hash,
     verify_password,
     create_access_token,
-    decode_access_token
+    decode_access_token,
+    PasswordHasherBusy,
+    PasswordHashingPool
 )
+from app.core.cache import RedisCache, RedisTags, ResultCache
+from app.core.principals import PrincipalCache
 from app.crud.user import create_user, authenticate_user
-from app.crud.movie import create_movie
-from app.crud.review import create_review
+from app.models.user import User
+from app.crud.movie import create_movie, get_movies
+from app.crud.review import create_review, update_review, delete_review, get_reviews_by_movie
 from app.crud.watchlist import add_to_watchlist, is_in_watchlist
 from app.schemas.user import UserCreate
 from app.schemas.movie import MovieCreate
-from app.schemas.review import ReviewCreate
+from app.schemas.review import ReviewCreate, ReviewUpdate
+from app.tools.recompute_ratings import recompute_ratings
+from app.core.ranking import MAX_TRENDING_EXPONENT, bayesian_rating, trending_weight, trending_weight_sql
 from app.schemas.watchlist import WatchlistCreate
 
 
@@ -183,3 +191,630 @@ def test_password_hash_uses_salt(db):
     
     assert verify_password(password, hash1) is True
     assert verify_password(password, hash2) is True
+
+
+def test_password_hashing_pool_rejects_when_saturated():
+    """Test que le pool bcrypt refuse les jobs au-delà de sa file d'attente"""
+    pool = PasswordHashingPool(workers=1, queue_limit=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hashed"
+
+    worker = threading.Thread(target=pool.run, args=("hash", slow_hash))
+    worker.start()
+    started.wait(5)
+
+    with pytest.raises(PasswordHasherBusy):
+        pool.run("hash", lambda: "rejected")
+
+    release.set()
+    worker.join()
+    assert pool.run("hash", lambda: "accepted") == "accepted"
+
+
+def test_principal_cache_with_redis_backend(fake_redis):
+    """Test que le cache des principals fonctionne avec un backend Redis"""
+    cache = PrincipalCache(RedisCache(fake_redis, ttl=30, name="principal-test"))
+    user = User(id=7, username="alice", email="alice@example.com", full_name="Alice",
+                is_active=True, is_admin=False)
+
+    assert cache.get("alice") is None
+    cache.set(user)
+
+    cached = cache.get("alice")
+    assert cached.id == 7
+    assert cached.email == "alice@example.com"
+    assert cached.is_admin is False
+
+    cache.invalidate("alice")
+    assert cache.get("alice") is None
+
+
+def test_principal_invalidated_after_commit(db):
+    """Test que le principal en cache est invalidé au commit, pas au flush (relecture concurrente entre les deux)"""
+    from app.core.principals import principal_cache
+    user = create_user(db, UserCreate(username="alice", email="alice@example.com", password="password123"))
+    principal_cache.set(user)
+
+    user.is_active = False
+    db.flush()
+    # Requête concurrente avant le commit : elle lit encore l'utilisateur actif et le remet en cache
+    principal_cache.set(User(id=user.id, username="alice", email="alice@example.com", is_active=True,
+                             is_admin=False))
+    db.commit()
+    assert principal_cache.get("alice") is None
+
+    # Annulée : rien à invalider
+    principal_cache.set(user)
+    user.is_admin = True
+    db.flush()
+    db.rollback()
+    assert principal_cache.get("alice").is_active is False
+
+
+def test_movie_rating_aggregates_are_maintained(db):
+    """Test que les agrégats de notes du film suivent les créations/modifications/suppressions"""
+    alice = create_user(db, UserCreate(username="alice", email="alice@example.com", password="password123"))
+    bob = create_user(db, UserCreate(username="bob", email="bob@example.com", password="password123"))
+    movie = create_movie(db, MovieCreate(title="Test Movie", description="Test", release_year=2024))
+
+    first = create_review(db, ReviewCreate(user_id=alice.id, movie_id=movie.id, rating=5, comment="Top"))
+    create_review(db, ReviewCreate(user_id=bob.id, movie_id=movie.id, rating=3, comment="Bof"))
+    db.refresh(movie)
+    assert movie.review_count == 2
+    assert movie.avg_rating == 4.0
+    assert movie.rating_histogram == [0, 0, 1, 0, 1]
+
+    update_review(db, first.id, ReviewUpdate(rating=1))
+    db.refresh(movie)
+    assert movie.avg_rating == 2.0
+    assert movie.rating_histogram == [1, 0, 1, 0, 0]
+
+    delete_review(db, first.id)
+    db.refresh(movie)
+    assert movie.review_count == 1
+    assert movie.avg_rating == 3.0
+    assert movie.rating_histogram == [0, 0, 1, 0, 0]
+    # Scores des classements : note bayésienne et poids de la review restante
+    assert movie.bayesian_rating == pytest.approx(bayesian_rating(1, 3))
+    trending = movie.trending_score
+    assert trending > 0
+
+    # Reconstruction complète après une dérive
+    movie.review_count, movie.avg_rating, movie.rating_3_count = 42, 1.5, 0
+    movie.trending_score, movie.bayesian_rating = 0.0, 5.0
+    db.commit()
+    assert recompute_ratings(db) == 1
+    db.refresh(movie)
+    assert movie.review_count == 1
+    assert movie.avg_rating == 3.0
+    assert movie.rating_histogram == [0, 0, 1, 0, 0]
+    assert movie.bayesian_rating == pytest.approx(bayesian_rating(1, 3))
+    assert movie.trending_score == pytest.approx(trending)
+
+
+def test_recompute_ratings_skips_reviews_without_rating(db):
+    """Test que la reconstruction des agrégats ignore les reviews sans note (NULL, anciennes lignes)"""
+    from app.models.review import Review
+    alice = create_user(db, UserCreate(username="alice", email="alice@example.com", password="password123"))
+    bob = create_user(db, UserCreate(username="bob", email="bob@example.com", password="password123"))
+    unrated_only, mixed = (create_movie(db, MovieCreate(title=f"Movie {i}", release_year=2024)) for i in range(2))
+    db.add_all([Review(user_id=user.id, movie_id=movie.id, rating=None, comment="Sans note")
+                for user in (alice, bob) for movie in (unrated_only, mixed)])
+    db.commit()
+    rated = create_review(db, ReviewCreate(user_id=alice.id, movie_id=mixed.id, rating=4, comment="Bien"))
+    db.refresh(mixed)
+    expected = (mixed.review_count, mixed.avg_rating, mixed.trending_score)
+
+    assert recompute_ratings(db) == 1
+    db.refresh(unrated_only)
+    db.refresh(mixed)
+    assert (unrated_only.review_count, unrated_only.avg_rating, unrated_only.trending_score) == (0, 0.0, 0.0)
+    assert expected[:2] == (1, 4.0)
+    assert (mixed.review_count, mixed.avg_rating) == expected[:2]
+    assert mixed.trending_score == pytest.approx(trending_weight(rated.created_at))
+    assert mixed.rating_histogram == [0, 0, 0, 1, 0]
+
+
+def test_reviews_without_rating_can_be_updated_and_deleted(db):
+    """Test que les reviews sans note (NULL) se modifient et se suppriment, et n'entrent aux agrégats qu'une fois notées"""
+    from app.models.review import Review
+    alice = create_user(db, UserCreate(username="alice", email="alice@example.com", password="password123"))
+    bob = create_user(db, UserCreate(username="bob", email="bob@example.com", password="password123"))
+    movie = create_movie(db, MovieCreate(title="Test Movie", release_year=2024))
+    unrated = [Review(user_id=user.id, movie_id=movie.id, rating=None, comment="Sans note") for user in (alice, bob)]
+    db.add_all(unrated)
+    db.commit()
+
+    update_review(db, unrated[0].id, ReviewUpdate(comment="Toujours sans note"))
+    delete_review(db, unrated[1].id)
+    db.refresh(movie)
+    assert (movie.review_count, movie.avg_rating, movie.trending_score) == (0, 0.0, 0.0)
+
+    # Notée après coup : compte, moyenne, histogramme et tendance
+    update_review(db, unrated[0].id, ReviewUpdate(rating=4))
+    db.refresh(movie)
+    assert movie.review_count == 1
+    assert movie.avg_rating == 4.0
+    assert movie.rating_histogram == [0, 0, 0, 1, 0]
+    trending = movie.trending_score
+    assert trending == pytest.approx(trending_weight(unrated[0].created_at))
+    assert recompute_ratings(db) == 1
+    db.refresh(movie)
+    assert movie.trending_score == pytest.approx(trending)
+
+
+def test_trending_weight_capped_before_float_overflow(db):
+    """Test que le poids de tendance reste fini au-delà du plafond, en Python comme en SQL"""
+    import math
+    from sqlalchemy import DateTime, literal, select
+    from app.core.config import settings
+
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    edge = settings.TRENDING_EPOCH + half_life * MAX_TRENDING_EXPONENT
+    cap = 2.0 ** MAX_TRENDING_EXPONENT
+    # Sous le plafond l'ordre est conservé, au-delà le poids est constant (2^1024 déborderait)
+    assert trending_weight(edge - half_life) == pytest.approx(cap / 2)
+    assert trending_weight(edge - half_life) < trending_weight(edge) == cap
+    for later in (edge + half_life, edge + half_life * 64, settings.TRENDING_EPOCH + half_life * 5000):
+        assert trending_weight(later) == cap
+    # 2^63 reviews au plafond tiennent encore dans un float
+    assert math.isfinite(cap * 2.0 ** 63)
+
+    for moment in (edge - half_life, edge + half_life * 64):
+        naive = moment.replace(tzinfo=None)  # SQLite stocke des dates naïves
+        value = db.execute(select(trending_weight_sql(literal(naive, DateTime()), "sqlite"))).scalar_one()
+        assert value == pytest.approx(trending_weight(moment))
+
+
+def test_keyset_pagination_walks_every_row_once(db):
+    """Test que la pagination par curseur parcourt toutes les lignes sans doublon"""
+    user = create_user(db, UserCreate(username="testuser", email="test@example.com", password="password123"))
+    movies = [create_movie(db, MovieCreate(title=f"Movie {i}", release_year=2000 + i)) for i in range(7)]
+    for i, movie in enumerate(movies):
+        # Plusieurs films avec la même note pour tester le départage par id
+        create_review(db, ReviewCreate(user_id=user.id, movie_id=movie.id, rating=1 + i % 3, comment="Avis"))
+    for i in range(5):
+        create_review(db, ReviewCreate(user_id=user.id, movie_id=movies[0].id, rating=4, comment=f"Avis {i}"))
+
+    seen, cursor = [], None
+    while True:
+        page = get_movies(db, limit=3, sort_by="avg_rating", descending=True, cursor=cursor)
+        seen.extend(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == 7
+    assert len({m.id for m in seen}) == 7
+    ratings = [(m.avg_rating, m.id) for m in seen]
+    assert ratings == sorted(ratings, reverse=True)
+
+    first = get_reviews_by_movie(db, movies[0].id, limit=4)
+    second = get_reviews_by_movie(db, movies[0].id, limit=4, cursor=first.next_cursor)
+    assert len(first) == 4 and len(second) == 2
+    assert second.next_cursor is None
+    ids = [r.id for r in first + second]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_migrations_match_models(tmp_path):
+    """Test que les migrations Alembic produisent le schéma décrit par les modèles"""
+    from pathlib import Path
+    from alembic import command
+    from alembic.autogenerate import compare_metadata
+    from alembic.config import Config
+    from alembic.migration import MigrationContext
+    from sqlalchemy import create_engine
+    from app.db.base import Base
+
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    config = Config(str(Path(__file__).resolve().parents[2] / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+    engine.dispose()
+    assert diff == []
+
+    # Les migrations se défont proprement
+    command.downgrade(config, "base")
+
+
+def test_result_cache_tags_and_single_flight(fake_redis):
+    """Test que le cache de résultats s'invalide par tag et ne calcule qu'une fois un résultat manquant"""
+    import time
+    cache = ResultCache(RedisCache(fake_redis, ttl=60, prefix="test:result:", raw=True), RedisTags(fake_redis))
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            time.sleep(0.05)
+            return value
+        return run
+
+    # 20 requêtes simultanées sur la même entrée : un seul calcul
+    threads = [threading.Thread(target=cache.get_or_set, args=("movie:1", ["movie:1"], compute(b"v1")))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [b"v1"]
+    assert cache.get_or_set("movie:1", ["movie:1"], compute(b"other")) == b"v1"
+
+    # Invalider un autre tag ne touche pas l'entrée, invalider le sien la recalcule
+    cache.invalidate("movie:2")
+    assert cache.get_or_set("movie:1", ["movie:1"], compute(b"other")) == b"v1"
+    cache.invalidate("movie:1")
+    assert cache.get_or_set("movie:1", ["movie:1"], compute(b"v2")) == b"v2"
+    assert calls == [b"v1", b"v2"]
+
+
+def test_generate_synthetic_dataset(db):
+    """Test que le générateur produit un jeu de données cohérent et une popularité zipfienne"""
+    from collections import Counter
+    from app.models.movie import Movie
+    from app.models.review import Review
+    from app.models.watchlist import Watchlist
+    from app.tools.generate import generate, parse_count
+
+    assert parse_count("50M") == 50_000_000
+    assert parse_count("500k") == 500_000
+    assert parse_count("1.5k") == 1500
+
+    create_movie(db, MovieCreate(title="Existing", release_year=2000))
+    generate(db.get_bind(), movies=100, users=30, reviews=2000, watchlist=90,
+             chunk_size=500, password_pool=2, log=lambda message: None)
+
+    assert db.query(Movie).count() == 101
+    assert db.query(User).count() == 30
+    assert db.query(Watchlist).count() == 90
+    user = db.query(User).order_by(User.id).first()
+    assert authenticate_user(db, user.username, f"password{user.id % 2}")
+
+    # Les agrégats sont recalculés et la popularité est très concentrée
+    counts = Counter(movie_id for movie_id, in db.query(Review.movie_id))
+    assert sum(counts.values()) == 2000
+    movie_id, top = counts.most_common(1)[0]
+    assert db.get(Movie, movie_id).review_count == top
+    assert top > 10 * sorted(counts.values())[len(counts) // 2]
+
+
+def test_n_plus_one_detector_flags_repeated_queries(db, monkeypatch):
+    """Test que le détecteur signale une même requête répétée (chargement paresseux par ligne)"""
+    from sqlalchemy.orm import joinedload
+    from app.core.config import settings
+    from app.core.instrumentation import collecting, instrument_engine, statement_shape
+    from app.models.review import Review
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 3)
+    instrument_engine(db.get_bind())
+    movie = create_movie(db, MovieCreate(title="Test Movie", release_year=2024))
+    for i in range(4):
+        user = create_user(db, UserCreate(username=f"user{i}", email=f"user{i}@example.com", password="password123"))
+        db.add(Review(user_id=user.id, movie_id=movie.id, rating=4, comment="Bien"))
+    db.commit()
+
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?,\n ?)") == statement_shape("SELECT * FROM t WHERE id IN (?)")
+
+    db.expunge_all()
+    with collecting(detect_repeats=True) as stats:
+        [review.user.username for review in db.query(Review).all()]
+    assert len(stats.repeated) == 1
+    assert stats.shapes[stats.repeated[0]] == 4
+
+    db.expunge_all()
+    with collecting(detect_repeats=True) as stats:
+        [review.user.username for review in db.query(Review).options(joinedload(Review.user)).all()]
+    assert stats.repeated == []
+    assert stats.queries == 1
+
+
+def test_bulk_loader_isolates_rows_rejected_by_database(db):
+    """Test qu'un lot refusé par la base est rejoué ligne par ligne : seules les lignes fautives échouent"""
+    from sqlalchemy.exc import IntegrityError
+    from app.crud.bulk import BulkLoader
+    from app.crud.movie import insert_movies
+
+    def insert(db, movies):
+        if any(movie.title == "doublon" for movie in movies):
+            raise IntegrityError("INSERT", {}, Exception("duplicate key"))
+        return insert_movies(db, movies)
+
+    loader = BulkLoader(db, MovieCreate, insert, batch_size=3)
+    loader.add_many([{"title": "A"}, {"title": "doublon"}, {"title": "B"}, {"title": 42}, {"title": "C"}])
+    result = loader.finish()
+
+    assert (result["received"], result["created"], result["failed"]) == (5, 3, 2)
+    assert [(error["index"], error["error"]) for error in result["errors"]] == [
+        (1, "duplicate key"), (3, "title: Input should be a valid string"),
+    ]
+    assert sorted(movie.title for movie in get_movies(db, limit=10)) == ["A", "B", "C"]
+
+
+def test_accept_encoding_quality_values():
+    """Test que gzip n'est choisi que si sa valeur q (ou celle de *) est positive"""
+    from app.core.export import accepts_gzip
+    for header in ("gzip", "gzip, deflate, br", "GZIP;q=0.1", "x-gzip", "*", "br;q=1, *;q=0.5", "gzip ; q=1.0"):
+        assert accepts_gzip(header), header
+    for header in ("", "identity", "gzip;q=0", "gzip;q=0.000, *", "*;q=0", "br", "gzip;q=abc", "*, gzip;q=0"):
+        assert not accepts_gzip(header), header
+
+
+def test_export_memory_stays_flat(db):
+    """Test que la mémoire de l'export ne dépend pas du nombre de lignes (curseur par lots)"""
+    import gzip
+    import tracemalloc
+    from app.core import export
+    from app.tools.generate import generate
+
+    generate(db.get_bind(), movies=20_000, users=1, reviews=0, chunk_size=10_000, password_pool=1,
+             log=lambda message: None)
+
+    def peak(limit, fmt="ndjson", compress=False):
+        db.rollback()
+        tracemalloc.start()
+        size = sum(len(chunk) for chunk in export.export(db, "movies", fmt, limit=limit, gzip=compress,
+                                                         chunk_size=500))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak, size
+
+    peak(1_000)  # préchauffage (requêtes compilées mises en cache)
+    small, small_size = peak(2_000)
+    large, large_size = peak(20_000)
+    assert large_size > 9 * small_size
+    assert large < 1.5 * small
+
+    # Les formats restent lisibles une fois décompressés, et la reprise saute les lignes déjà reçues
+    body = b"".join(export.export(db, "movies", "csv", since_id=19_998, gzip=True))
+    lines = gzip.decompress(body).decode().splitlines()
+    assert lines[0].startswith("id,title,")
+    assert [line.split(",")[0] for line in lines[1:]] == ["19999", "20000"]
+
+
+def test_db_pool_modes_and_saturation(tmp_path, monkeypatch):
+    """Test du pool configuré par les settings : saturation, timeouts comptés et mode NullPool (PgBouncer)"""
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+    from app.core.config import settings
+    from app.core.instrumentation import TimedNullPool, TimedQueuePool, pool_checkout_timeouts_total
+    from app.db.session import create_db_engine
+
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.05)
+    engine = create_db_engine(url)
+    assert isinstance(engine.pool, TimedQueuePool)
+    held = engine.connect()
+    assert engine.pool.in_use == 1
+    timeouts = pool_checkout_timeouts_total.value()
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    assert pool_checkout_timeouts_total.value() == timeouts + 1
+    held.close()
+    assert engine.pool.in_use == 0
+
+    # Derrière PgBouncer : aucune connexion gardée, une par session
+    monkeypatch.setattr(settings, "DB_POOL_MODE", "null")
+    engine = create_db_engine(url)
+    assert isinstance(engine.pool, TimedNullPool)
+    with engine.connect(), engine.connect():
+        assert engine.pool.in_use == 2
+    assert engine.pool.in_use == 0
+    assert engine.pool.status() == "NullPool"
+
+
+def test_blocked_top_k_similarities_match_brute_force():
+    """Test que le calcul par blocs des top-K similarités donne le même résultat qu'un calcul dense"""
+    import numpy as np
+    from app.tools.similarities import rating_matrix, top_k_similarities
+
+    rng = np.random.default_rng(7)
+    movie_ids = rng.integers(1, 60, 3000)
+    user_ids = rng.integers(1, 400, 3000)
+    ratings = rng.integers(1, 6, 3000)
+    matrix, movies = rating_matrix(movie_ids, user_ids, ratings)
+
+    dense = matrix.toarray()
+    expected = dense @ dense.T
+    np.fill_diagonal(expected, -np.inf)
+    found = {}
+    for rows, neighbors, scores in top_k_similarities(matrix, top_k=5, block_size=7):
+        for row, neighbor, score in zip(rows, neighbors, scores):
+            found.setdefault(row, {})[neighbor] = score
+
+    assert len(found) > 50
+    for row, neighbors in found.items():
+        best = np.sort(expected[row])[::-1][:5]
+        # Mêmes scores que les 5 meilleurs (au-dessus de 0), chacun au bon voisin
+        assert np.allclose(sorted(neighbors.values(), reverse=True), best[best > 0][:len(neighbors)], atol=1e-5)
+        for neighbor, score in neighbors.items():
+            assert abs(expected[row, neighbor] - score) < 1e-5
+
+
+def test_similarities_skip_incomplete_reviews(db):
+    """Test que le calcul des similarités ignore les reviews sans film, sans utilisateur ou sans note"""
+    from app.models.review import Review
+    from app.tools.similarities import read_ratings
+
+    db.add_all([Review(movie_id=1, user_id=1, rating=4), Review(movie_id=2, user_id=1, rating=None),
+                Review(movie_id=None, user_id=1, rating=5), Review(movie_id=3, user_id=None, rating=2)])
+    db.commit()
+
+    movie_ids, user_ids, ratings = read_ratings(db.get_bind())
+    assert (movie_ids.tolist(), user_ids.tolist(), ratings.tolist()) == ([1], [1], [4])
+
+
+def test_incremental_similarities_match_full_rebuild(db):
+    """Test que le consommateur des événements de reviews aboutit aux mêmes similarités qu'un recalcul complet"""
+    import random
+    from collections import defaultdict
+    from app.crud.review import insert_reviews
+    from app.models.review import Review
+    from app.models.review_event import ReviewEvent
+    from app.models.similarity import MovieCooccurrence, MovieNeighbor, MovieNorm, MovieSimilarity
+    from app.tools.generate import generate
+    from app.tools.similarity_updates import apply_events, rebuild
+
+    engine = db.get_bind()
+    generate(engine, movies=60, users=40, reviews=400, password_pool=1, log=lambda message: None)
+    # Petite réserve : les têtes s'épuisent et des listes sont recalculées
+    rebuild(engine, top_k=8, reserve=3)
+
+    def state():
+        db.expire_all()
+        return (
+            sorted(db.query(MovieNorm.movie_id, MovieNorm.norm_sq).all()),
+            sorted(db.query(MovieCooccurrence.movie_id, MovieCooccurrence.other_id, MovieCooccurrence.count,
+                            MovieCooccurrence.dot).all()),
+            sorted((movie, neighbor, round(score, 5)) for movie, neighbor, score in
+                   db.query(MovieSimilarity.movie_id, MovieSimilarity.neighbor_id, MovieSimilarity.score)),
+        )
+
+    rng = random.Random(3)
+    for _ in range(6):
+        for _ in range(30):
+            review_ids = [review_id for review_id, in db.query(Review.id)]
+            action = rng.random()
+            if action < 0.4:
+                create_review(db, ReviewCreate(movie_id=rng.randint(1, 60), user_id=rng.randint(1, 40),
+                                               rating=rng.randint(1, 5), comment="ok"))
+            elif action < 0.7:
+                update_review(db, rng.choice(review_ids), ReviewUpdate(rating=rng.randint(1, 5)))
+            else:
+                delete_review(db, rng.choice(review_ids))
+        insert_reviews(db, [ReviewCreate(movie_id=rng.randint(1, 60), user_id=rng.randint(1, 40),
+                                         rating=rng.randint(1, 5), comment="ok") for _ in range(10)])
+        db.commit()
+        # Lots de tailles variées : une partie des événements attend le tour suivant
+        apply_events(engine, batch_size=rng.randint(1, 40), top_k=8, reserve=3)
+    while apply_events(engine, batch_size=25, top_k=8, reserve=3)[0]:
+        pass
+
+    def heads():
+        ranked = defaultdict(list)
+        for movie, neighbor, score in db.query(MovieNeighbor.movie_id, MovieNeighbor.neighbor_id,
+                                               MovieNeighbor.score).order_by(MovieNeighbor.score.desc(),
+                                                                             MovieNeighbor.neighbor_id):
+            ranked[movie].append((neighbor, round(score, 5)))
+        return ranked
+
+    assert db.query(ReviewEvent).count() == 0
+    incremental, incremental_heads = state(), heads()
+    assert len(incremental[2]) > 100
+    rebuild(engine, top_k=8, reserve=3)
+    assert state() == incremental
+    # Chaque tête est le début exact du classement recalculé
+    rebuilt_heads = heads()
+    assert incremental_heads.keys() == rebuilt_heads.keys()
+    for movie, head in incremental_heads.items():
+        assert head == rebuilt_heads[movie][:len(head)]
+
+
+def test_similarity_consumer_rebuilds_missing_statistics(db, monkeypatch):
+    """Test que le consommateur reconstruit les similarités au démarrage si des reviews existent sans statistiques"""
+    from app.models.similarity import MovieSimilarity
+    from app.tools import similarity_updates
+    from app.tools.generate import generate
+
+    engine = db.get_bind()
+    # Reviews écrites hors du CRUD : aucun événement
+    generate(engine, movies=20, users=15, reviews=120, password_pool=1, log=lambda message: None)
+    assert similarity_updates.needs_rebuild(engine)
+
+    class Stop(Exception):
+        pass
+
+    def stop(seconds):
+        raise Stop
+
+    monkeypatch.setattr(similarity_updates.time, "sleep", stop)
+    messages = []
+    with pytest.raises(Stop):
+        similarity_updates.run(engine, batch_size=100, top_k=5, min_score=0.0, reserve=2, interval=1,
+                               log=messages.append)
+    assert "rebuilt from the reviews" in messages[0]
+    assert db.query(MovieSimilarity).count() > 0
+    assert not similarity_updates.needs_rebuild(engine)
+
+
+def test_review_feed_buffer_follows_writes(db, monkeypatch):
+    """Test que le buffer du fil suit les écritures locales et recharge celles des autres workers"""
+    import json
+    from app.core import review_feed
+    from app.models.review import Review
+
+    feed = review_feed.ReviewFeed(size=2)
+    monkeypatch.setattr(review_feed, "review_feed", feed)
+    user = create_user(db, UserCreate(username="alice", email="alice@example.com", password="password123"))
+    movie = create_movie(db, MovieCreate(title="Test Movie", description="Test", release_year=2024))
+    ids = [create_review(db, ReviewCreate(user_id=user.id, movie_id=movie.id, rating=4, comment=f"Avis {n}")).id
+           for n in range(3)]
+
+    def first_page(limit):
+        page = feed.first_page(db, limit)
+        return page and ([review["id"] for review in json.loads(page[0])], page[1])
+
+    newest, cursor = first_page(2)
+    assert newest == [ids[2], ids[1]]
+    assert [review.id for review in get_reviews_by_movie(db, movie.id, cursor=cursor)] == [ids[0]]
+    assert first_page(3) is None  # plus de reviews que le buffer n'en garde
+
+    # Écritures de ce processus : appliquées au buffer après le commit
+    created = create_review(db, ReviewCreate(user_id=user.id, movie_id=movie.id, rating=5, comment="Nouvel avis"))
+    assert first_page(2)[0] == [created.id, ids[2]]
+    update_review(db, ids[2], ReviewUpdate(comment="Modifié"))
+    assert json.loads(feed.first_page(db, 2)[0])[1]["comment"] == "Modifié"
+    delete_review(db, created.id)
+    assert first_page(1)[0] == [ids[2]]
+    assert first_page(2) is None
+
+    # Review écrite par un autre worker : détectée par le comptage, buffer rechargé
+    elsewhere = Review(user_id=user.id, movie_id=movie.id, rating=3, comment="Ailleurs")
+    db.add(elsewhere)
+    db.commit()
+    assert first_page(1)[0] == [ids[2]]
+    monkeypatch.setattr(review_feed.settings, "REVIEW_FEED_SYNC_SECONDS", 0.0)
+    assert first_page(2)[0] == [elsewhere.id, ids[2]]
+
+
+def test_openapi_schema_cached_on_disk(tmp_path, monkeypatch):
+    """Test que le schéma OpenAPI est généré une fois puis relu depuis le disque tant que l'empreinte correspond"""
+    from fastapi import FastAPI
+    from app.core import openapi
+
+    def build_app():
+        app = FastAPI(title="Cache")
+
+        @app.get("/ping")
+        def ping():
+            return "pong"
+
+        generated = []
+        generate = app.openapi
+        app.openapi = lambda: generated.append(1) or generate()
+        openapi.cache_openapi(app, str(tmp_path / "openapi.json"))
+        return app, generated
+
+    first, generated = build_app()
+    assert "/ping" in first.openapi()["paths"]
+    assert len(generated) == 1
+
+    # Autre processus, même code : schéma relu sans être régénéré
+    second, generated = build_app()
+    assert second.openapi() == first.openapi()
+    assert generated == []
+
+    # Empreinte différente (code modifié) : schéma régénéré
+    monkeypatch.setattr(openapi, "fingerprint", lambda app: "changed")
+    third, generated = build_app()
+    third.openapi()
+    assert len(generated) == 1
@@ -4,6 +4,9 @@ import axios from 'axios';
 const axiosInstance = axios.create({
   baseURL: import.meta.env.VITE_API_URL || 'http://localhost:8000/api/v1',
   timeout: 10000,
+  // Envoie et conserve le cookie cineverse_primary (lecture de ses propres écritures
+  // sur le primaire) quand l'API est sur une autre origine : CORS allow_credentials côté backend
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
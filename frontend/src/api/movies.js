@@ -1,8 +1,14 @@
 import axios from './axios';
 
-// Récupérer tous les films
-export const getAllMovies = async () => {
-  const response = await axios.get('/movies?limit=100');  
+// Films en tendance (reviews récentes), première page du classement
+export const getTrendingMovies = async (limit = 24) => {
+  const response = await axios.get('/movies/trending', { params: { limit } });
+  return response.data;
+};
+
+// Films les mieux notés (moyenne bayésienne), avec un nombre minimum de reviews
+export const getTopRatedMovies = async (limit = 24, minReviews = 0) => {
+  const response = await axios.get('/movies/top-rated', { params: { limit, min_reviews: minReviews } });
   return response.data;
 };
 
@@ -16,4 +22,9 @@ export const getMovieById = async (id) => {
 export const getMovieReviews = async (movieId) => {
   const response = await axios.get(`/movies/${movieId}/reviews`);
   return response.data;
-};
\ No newline at end of file
+};
+// Rechercher des films (titre et description, mots en préfixe)
+export const searchMovies = async (query) => {
+  const response = await axios.get('/movies/search', { params: { q: query } });
+  return response.data;
+};
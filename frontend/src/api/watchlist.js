@@ -25,4 +25,18 @@ export const removeFromWatchlist = async (userId, movieId) => {
 export const checkInWatchlist = async (userId, movieId) => {
   const response = await axios.get(`/watchlist/${userId}/${movieId}`);
   return response.data;
-};
\ No newline at end of file
+};
+// Films d'une liste présents dans la watchlist (requêtes groupées par 100 ids)
+const BATCH_MAX_IDS = 100;
+
+export const checkManyInWatchlist = async (userId, movieIds) => {
+  const present = new Set();
+  for (let start = 0; start < movieIds.length; start += BATCH_MAX_IDS) {
+    const batch = movieIds.slice(start, start + BATCH_MAX_IDS);
+    const response = await axios.post(`/watchlist/${userId}/contains`, { movie_ids: batch });
+    response.data.in_watchlist.forEach((inWatchlist, i) => {
+      if (inWatchlist) present.add(batch[i]);
+    });
+  }
+  return present;
+};
@@ -1,6 +1,6 @@
 import { Link } from 'react-router-dom';
 
-function MovieCard({ movie }) {
+function MovieCard({ movie, inWatchlist = false }) {
   return (
     <Link to={`/movies/${movie.id}`} style={{ textDecoration: 'none' }}>
       <div style={{
@@ -22,6 +22,12 @@ function MovieCard({ movie }) {
         <p style={{ color: '#888', fontSize: '14px', marginBottom: '10px' }}>
           📅 {movie.release_year}
         </p>
+
+        {inWatchlist && (
+          <p style={{ color: '#4caf50', fontSize: '12px', marginBottom: '10px' }}>
+            📌 Dans ma watchlist
+          </p>
+        )}
         
         {movie.genre && (
           <p style={{ color: '#999', fontSize: '12px', marginBottom: '10px' }}>
@@ -42,9 +48,9 @@ function MovieCard({ movie }) {
           {movie.description || 'Pas de description disponible'}
         </p>
 
-        {movie.average_rating && (
+        {movie.review_count > 0 && (
           <p style={{ color: '#ffd700', marginTop: '10px', fontSize: '14px' }}>
-            ⭐ {movie.average_rating.toFixed(1)} / 5
+            ⭐ {movie.avg_rating.toFixed(1)} / 5
           </p>
         )}
       </div>
@@ -1,6 +1,29 @@
+import { useContext, useEffect, useState } from 'react';
+import { AuthContext } from '../context/AuthContext';
+import { checkManyInWatchlist } from '../api/watchlist';
 import MovieCard from './MovieCard';
 
-function MovieGrid({ movies }) {
+function MovieGrid({ movies, showWatchlistBadges = false }) {
+  const { user, isAuthenticated } = useContext(AuthContext);
+  const [inWatchlist, setInWatchlist] = useState(new Set());
+
+  // Badges "dans ma watchlist" : un appel groupé pour toute la grille plutôt qu'un par carte
+  useEffect(() => {
+    if (!showWatchlistBadges || !isAuthenticated || !user || movies.length === 0) {
+      setInWatchlist(new Set());
+      return;
+    }
+    let cancelled = false;
+    checkManyInWatchlist(user.id, movies.map((movie) => movie.id))
+      .then((present) => {
+        if (!cancelled) setInWatchlist(present);
+      })
+      .catch((err) => console.log('Erreur check watchlist:', err));
+    return () => {
+      cancelled = true;
+    };
+  }, [movies, showWatchlistBadges, isAuthenticated, user]);
+
   return (
     <div style={{
       display: 'grid',
@@ -11,10 +34,10 @@ function MovieGrid({ movies }) {
       margin: '0 auto'
     }}>
       {movies.map((movie) => (
-        <MovieCard key={movie.id} movie={movie} />
+        <MovieCard key={movie.id} movie={movie} inWatchlist={inWatchlist.has(movie.id)} />
       ))}
     </div>
   );
 }
 
-export default MovieGrid;
\ No newline at end of file
+export default MovieGrid;
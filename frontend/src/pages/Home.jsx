@@ -1,17 +1,26 @@
 import { useState, useEffect } from 'react';
-import { getAllMovies } from '../api/movies';
+import { getTopRatedMovies, getTrendingMovies, searchMovies } from '../api/movies';
 import MovieGrid from '../components/MovieGrid';
 
+// Classements proposés en page d'accueil (première page, calculée côté serveur)
+const RANKINGS = {
+  trending: { label: '🔥 Tendances', fetch: () => getTrendingMovies() },
+  topRated: { label: '⭐ Mieux notés', fetch: () => getTopRatedMovies(24, 3) },
+};
+
 function Home() {
+  const [ranking, setRanking] = useState('trending');
   const [movies, setMovies] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [query, setQuery] = useState('');
+  const [results, setResults] = useState(null);
 
   useEffect(() => {
     const fetchMovies = async () => {
       try {
         setLoading(true);
-        const data = await getAllMovies();
+        const data = await RANKINGS[ranking].fetch();
         setMovies(data);
       } catch (err) {
         setError(err.response?.data?.detail || 'Erreur lors du chargement des films');
@@ -21,7 +30,26 @@ function Home() {
     };
 
     fetchMovies();
-  }, []);
+  }, [ranking]);
+
+  // Recherche côté serveur, déclenchée après une courte pause de frappe
+  useEffect(() => {
+    const trimmed = query.trim();
+    if (!trimmed) {
+      setResults(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        setResults(await searchMovies(trimmed));
+      } catch (err) {
+        setResults([]);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const displayed = results ?? movies;
 
   if (loading) {
     return (
@@ -50,17 +78,52 @@ function Home() {
       }}>
         <h1 style={{ fontSize: '36px', marginBottom: '10px' }}>🎬 Catalogue CineVerse</h1>
         <p style={{ color: '#888', fontSize: '18px' }}>
-          {movies.length} films disponibles
+          {results ? `${results.length} résultat(s)` : RANKINGS[ranking].label}
         </p>
+        <div style={{ display: 'flex', gap: '10px', justifyContent: 'center' }}>
+          {Object.entries(RANKINGS).map(([key, { label }]) => (
+            <button
+              key={key}
+              onClick={() => setRanking(key)}
+              disabled={key === ranking}
+              style={{
+                padding: '8px 15px',
+                borderRadius: '8px',
+                border: '1px solid #444',
+                fontWeight: key === ranking ? 'bold' : 'normal',
+                cursor: key === ranking ? 'default' : 'pointer'
+              }}
+            >
+              {label}
+            </button>
+          ))}
+        </div>
+        <input
+          type="search"
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          placeholder="Rechercher un film..."
+          style={{
+            width: '100%',
+            maxWidth: '500px',
+            padding: '10px 15px',
+            marginTop: '10px',
+            fontSize: '16px',
+            borderRadius: '8px',
+            border: '1px solid #444'
+          }}
+        />
       </div>
 
-      {movies.length === 0 ? (
+      {displayed.length === 0 ? (
         <div style={{ textAlign: 'center', padding: '50px' }}>
-          <h2>📭 Aucun film disponible</h2>
-          <p style={{ color: '#888' }}>La base de données est vide</p>
+          <h2>📭 {results ? 'Aucun résultat' : 'Aucun film disponible'}</h2>
+          <p style={{ color: '#888' }}>
+            {results ? 'Essayez avec d\'autres mots' : 'La base de données est vide'}
+          </p>
         </div>
       ) : (
-        <MovieGrid movies={movies} />
+        <MovieGrid movies={displayed} showWatchlistBadges />
       )}
     </div>
   );
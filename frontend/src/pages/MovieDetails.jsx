@@ -74,8 +74,9 @@ function MovieDetails() {
 
     try {
       await deleteReview(reviewId);
-      // Rafraîchir les reviews
-      const reviewsData = await getMovieReviews(id);
+      // Rafraîchir les reviews et les agrégats du film
+      const [movieData, reviewsData] = await Promise.all([getMovieById(id), getMovieReviews(id)]);
+      setMovie(movieData);
       setReviews(reviewsData);
       toast.success('Review supprimée');
     } catch (err) {
@@ -106,9 +107,9 @@ function MovieDetails() {
     return null;
   }
 
-  // Calculer la moyenne des notes
-  const averageRating = reviews.length > 0
-    ? (reviews.reduce((sum, r) => sum + r.rating, 0) / reviews.length).toFixed(1)
+  // Moyenne des notes calculée côté serveur
+  const averageRating = movie.review_count > 0
+    ? movie.avg_rating.toFixed(1)
     : null;
 
   return (
@@ -146,7 +147,7 @@ function MovieDetails() {
           {averageRating && (
             <span style={{ color: '#ffd700' }}>⭐ {averageRating} / 5</span>
           )}
-          <span style={{ color: '#888' }}>💬 {reviews.length} reviews</span>
+          <span style={{ color: '#888' }}>💬 {movie.review_count} reviews</span>
         </div>
 
         <p style={{ 